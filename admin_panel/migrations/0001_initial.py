@@ -0,0 +1,42 @@
+# Generated by Django 4.2.26 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+                ('method', models.CharField(max_length=10, verbose_name='Método')),
+                ('path', models.CharField(max_length=500, verbose_name='URL')),
+                ('view_name', models.CharField(blank=True, max_length=200, verbose_name='Vista')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='Status')),
+                ('mode', models.CharField(choices=[('sampling', 'Muestreo'), ('cprofile', 'cProfile')], max_length=10, verbose_name='Modo')),
+                ('duration_ms', models.FloatField(verbose_name='Duración (ms)')),
+                ('query_count', models.PositiveIntegerField(verbose_name='Queries')),
+                ('sql_time_ms', models.FloatField(verbose_name='Tiempo en SQL (ms)')),
+                ('sql_log', models.JSONField(default=list, verbose_name='Log de SQL')),
+                ('collapsed_stacks', models.TextField(blank=True, verbose_name='Stacks colapsados')),
+                ('stats', models.TextField(blank=True, verbose_name='Reporte de cProfile')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='request_profiles', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Profile de request',
+                'verbose_name_plural': 'Profiles de requests',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
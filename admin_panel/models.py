@@ -0,0 +1,52 @@
+from django.db import models
+from django.conf import settings
+import uuid
+
+
+class RequestProfile(models.Model):
+    """Profile de un request pedido por staff (ver ctf_platform.profiling)"""
+    MODE_CHOICES = [
+        ('sampling', 'Muestreo'),
+        ('cprofile', 'cProfile'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True,
+                             related_name='request_profiles', verbose_name="Usuario")
+    method = models.CharField(max_length=10, verbose_name="Método")
+    path = models.CharField(max_length=500, verbose_name="URL")
+    view_name = models.CharField(max_length=200, blank=True, verbose_name="Vista")
+    status_code = models.PositiveSmallIntegerField(verbose_name="Status")
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, verbose_name="Modo")
+    duration_ms = models.FloatField(verbose_name="Duración (ms)")
+    query_count = models.PositiveIntegerField(verbose_name="Queries")
+    sql_time_ms = models.FloatField(verbose_name="Tiempo en SQL (ms)")
+    # [{sql, many, ms}] en orden de ejecución, sin los parámetros
+    sql_log = models.JSONField(default=list, verbose_name="Log de SQL")
+    # Stacks en formato collapsed ("a;b;c 12") para flamegraph.pl o speedscope
+    collapsed_stacks = models.TextField(blank=True, verbose_name="Stacks colapsados")
+    stats = models.TextField(blank=True, verbose_name="Reporte de cProfile")
+
+    class Meta:
+        verbose_name = "Profile de request"
+        verbose_name_plural = "Profiles de requests"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+    @classmethod
+    def prune(cls, keep):
+        """Borra los profiles más viejos dejando los ``keep`` más recientes"""
+        stale = cls.objects.order_by('-created_at').values_list('pk', flat=True)[keep:]
+        cls.objects.filter(pk__in=list(stale)).delete()
+
+    def top_stacks(self, limit=25):
+        """Stacks más frecuentes como (muestras, porcentaje, frames)"""
+        rows = []
+        for line in self.collapsed_stacks.splitlines():
+            stack, _, count = line.rpartition(' ')
+            rows.append((int(count), stack.split(';')))
+        total = sum(count for count, _ in rows) or 1
+        return [(count, round(count * 100 / total, 1), frames) for count, frames in rows[:limit]]
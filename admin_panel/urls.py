@@ -39,6 +39,11 @@ urlpatterns = [
     # Submissions
     path('submissions/', views.submissions_list, name='submissions_list'),
     
+    # Profiles de requests
+    path('profiles/', views.profiles_list, name='profiles_list'),
+    path('profiles/<uuid:profile_id>/', views.profile_detail, name='profile_detail'),
+    path('profiles/<uuid:profile_id>/download/', views.profile_download, name='profile_download'),
+    
     # WebSocket Test
     path('test-websocket/', views.test_websocket, name='test_websocket'),
     path('broadcast-test-event/', views.broadcast_test_event, name='broadcast_test_event'),
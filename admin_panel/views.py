@@ -2,12 +2,13 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import user_passes_test
 from django.contrib import messages
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Q
+from django.db.models import Count, F, Q, Sum
 from django.utils import timezone
-from django.http import JsonResponse
-from challenges.models import Challenge, Category, Submission, FirstBlood
+from django.http import HttpResponse, JsonResponse
+from challenges.models import Challenge, Category, Submission, FirstBlood, TeamStats, UserStats
 from teams.models import Team
 from scoreboard.models import CTFConfig
+from .models import RequestProfile
 
 User = get_user_model()
 
@@ -15,6 +16,14 @@ def is_admin(user):
     """Verificar si el usuario es administrador"""
     return user.is_authenticated and (user.is_staff or user.is_superuser)
 
+def _active_challenges_by_category():
+    """Cantidad de challenges activos por categoría, en una query"""
+    return dict(
+        Challenge.objects.filter(is_active=True).order_by().values('category').annotate(
+            total=Count('id')
+        ).values_list('category', 'total')
+    )
+
 @user_passes_test(is_admin)
 def dashboard(request):
     """Dashboard principal del panel de administración"""
@@ -23,8 +32,12 @@ def dashboard(request):
     total_teams = Team.objects.count()
     total_challenges = Challenge.objects.count()
     total_categories = Category.objects.count()
-    total_submissions = Submission.objects.count()
-    correct_submissions = Submission.objects.filter(is_correct=True).count()
+    # Totales de submissions desde las estadísticas por equipo (ver challenges.stats)
+    totals = TeamStats.objects.aggregate(
+        solved=Sum('solved_count', default=0), failed=Sum('failed_count', default=0)
+    )
+    total_submissions = totals['solved'] + totals['failed']
+    correct_submissions = totals['solved']
     total_first_bloods = FirstBlood.objects.count()
     
     # Actividad reciente
@@ -75,20 +88,16 @@ def challenges_list(request):
     # Obtener todas las categorías
     categories = Category.objects.all().order_by('name')
     
-    # Agrupar challenges por categoría
-    challenges_by_category = OrderedDict()
+    # Agrupar challenges por categoría (una query; solve_count es el contador del modelo)
+    first_blood_ids = set(FirstBlood.objects.values_list('challenge_id', flat=True))
+    grouped = {category.id: [] for category in categories}
+    for challenge in Challenge.objects.order_by('points'):
+        challenge.has_first_blood = challenge.id in first_blood_ids
+        grouped[challenge.category_id].append(challenge)
     
-    for category in categories:
-        challenges = Challenge.objects.filter(category=category).annotate(
-            solve_count=Count('submissions', filter=Q(submissions__is_correct=True))
-        ).order_by('points')
-        
-        # Agregar información adicional a cada challenge
-        for challenge in challenges:
-            challenge.has_first_blood = FirstBlood.objects.filter(challenge=challenge).exists()
-        
-        if challenges.exists():
-            challenges_by_category[category] = list(challenges)
+    challenges_by_category = OrderedDict(
+        (category, grouped[category.id]) for category in categories if grouped[category.id]
+    )
     
     # Estadísticas generales
     all_challenges = Challenge.objects.all()
@@ -206,19 +215,15 @@ def categories_list(request):
     """Lista de categorías con estadísticas detalladas"""
     from django.db.models import Sum
     
-    categories = Category.objects.all().order_by('name')
-    
-    # Calcular estadísticas manualmente para cada categoría
-    for category in categories:
-        challenges = category.challenges.all()
-        category.challenge_count = challenges.count()
-        category.active_count = challenges.filter(is_active=True).count()
-        category.total_points = challenges.aggregate(total=Sum('points'))['total'] or 0
-        category.solve_count = Submission.objects.filter(
-            challenge__category=category,
-            is_correct=True
-        ).count()
-        category.fb_count = FirstBlood.objects.filter(challenge__category=category).count()
+    # Estadísticas de todas las categorías en una query: solve_count suma los contadores
+    # de cada challenge y el first blood es uno a uno, así que el join no duplica filas
+    categories = Category.objects.annotate(
+        challenge_count=Count('challenges'),
+        active_count=Count('challenges', filter=Q(challenges__is_active=True)),
+        total_points=Sum('challenges__points', default=0),
+        solve_count=Sum('challenges__solve_count', default=0),
+        fb_count=Count('challenges__first_blood'),
+    ).order_by('name')
     
     context = {'categories': categories}
     return render(request, 'admin_panel/categories/list.html', context)
@@ -330,32 +335,35 @@ def team_detail(request, team_id):
     solved_challenges = Challenge.objects.filter(
         submissions__team=team,
         submissions__is_correct=True
-    ).distinct()
+    ).select_related('category').distinct()
     
     # First bloods challenges
     first_bloods_challenges = [fb.challenge for fb in first_bloods]
     
-    # Estadísticas de miembros
+    # Estadísticas de miembros, agrupadas por miembro en dos queries
+    solves_by_member = {
+        row['submitted_by']: row
+        for row in Submission.objects.filter(team=team, is_correct=True).order_by().values('submitted_by').annotate(
+            solves=Count('challenge', distinct=True), points=Sum('challenge__points')
+        )
+    }
+    first_bloods_by_member = {
+        row['achieved_by']: row
+        for row in FirstBlood.objects.filter(team=team).order_by().values('achieved_by').annotate(
+            count=Count('id'), points=Sum('challenge__points')
+        )
+    }
+    
     member_stats = []
     for member in members:
-        member_submissions = Submission.objects.filter(
-            team=team,
-            submitted_by=member,
-            is_correct=True
-        )
-        member_solves = member_submissions.values('challenge').distinct().count()
-        member_points = member_submissions.aggregate(total=Sum('challenge__points'))['total'] or 0
-        
-        member_first_bloods = first_bloods.filter(achieved_by=member).count()
-        member_fb_points = first_bloods.filter(achieved_by=member).aggregate(
-            total=Sum('challenge__points')
-        )['total'] or 0
+        member_solves = solves_by_member.get(member.id, {})
+        member_first_bloods = first_bloods_by_member.get(member.id, {})
         
         member_stats.append({
             'member': member,
-            'solves': member_solves,
-            'total_points': member_points + member_fb_points,
-            'first_bloods': member_first_bloods,
+            'solves': member_solves.get('solves', 0),
+            'total_points': (member_solves.get('points') or 0) + (member_first_bloods.get('points') or 0),
+            'first_bloods': member_first_bloods.get('count', 0),
         })
     
     # Ordenar por puntos
@@ -363,15 +371,20 @@ def team_detail(request, team_id):
     
     # Progreso por categoría
     categories = Category.objects.all()
+    active_by_category = _active_challenges_by_category()
+    solved_by_category = dict(
+        Submission.objects.filter(team=team, is_correct=True).order_by().values('challenge__category').annotate(
+            total=Count('challenge', distinct=True)
+        ).values_list('challenge__category', 'total')
+    )
     categories_progress = {}
     for category in categories:
-        cat_challenges = Challenge.objects.filter(category=category, is_active=True).count()
-        cat_solved = solved_challenges.filter(category=category).count()
+        cat_challenges = active_by_category.get(category.id, 0)
         
         if cat_challenges > 0:
             categories_progress[category.name] = {
                 'total': cat_challenges,
-                'solved': cat_solved,
+                'solved': solved_by_category.get(category.id, 0),
             }
     
     context = {
@@ -401,9 +414,10 @@ def team_delete(request, team_id):
             messages.error(request, 'El nombre del equipo no coincide')
     
     # Estadísticas para el template
-    submission_count = Submission.objects.filter(team=team).count()
-    first_blood_count = FirstBlood.objects.filter(team=team).count()
-    solved_count = Submission.objects.filter(team=team, is_correct=True).values('challenge').distinct().count()
+    stats = TeamStats.objects.filter(pk=team.pk).first() or TeamStats(team=team)
+    submission_count = stats.solved_count + stats.failed_count
+    first_blood_count = team.first_blood_count
+    solved_count = team.solved_count
     has_first_blood = first_blood_count > 0
     
     context = {
@@ -420,27 +434,15 @@ def team_delete(request, team_id):
 @user_passes_test(is_admin)
 def users_list(request):
     """Lista de usuarios"""
-    from django.db.models import Sum
-    
-    users = User.objects.prefetch_related('teams').order_by('-date_joined')
+    # Estadísticas de cada usuario desde UserStats, en la misma query (ver challenges.stats)
+    users = User.objects.select_related('stats').prefetch_related('teams').order_by('-date_joined')
     
     # Añadir estadísticas a cada usuario
     for user in users:
-        # Puntos totales (submissions correctas)
-        user.get_total_points = Submission.objects.filter(
-            submitted_by=user, is_correct=True
-        ).aggregate(total=Sum('challenge__points'))['total'] or 0
-        
-        # First bloods bonus
-        fb_points = FirstBlood.objects.filter(
-            achieved_by=user
-        ).aggregate(total=Sum('bonus_points'))['total'] or 0
-        user.get_total_points += fb_points
-        
-        # Solves count
-        user.get_solved_count = Submission.objects.filter(
-            submitted_by=user, is_correct=True
-        ).values('challenge').distinct().count()
+        stats = getattr(user, 'stats', None)
+        # Puntos del ledger a su nombre: solves más el bonus de first bloods
+        user.get_total_points = stats.points if stats else 0
+        user.get_solved_count = stats.solved_count if stats else 0
     
     # Estadísticas generales
     admin_count = users.filter(Q(is_staff=True) | Q(is_superuser=True)).count()
@@ -451,7 +453,7 @@ def users_list(request):
     top_users = sorted(users, key=lambda u: u.get_total_points, reverse=True)[:5]
     
     # Usuarios activos (con al menos 1 submission)
-    active_users = User.objects.filter(submissions__isnull=False).distinct().count()
+    active_users = UserStats.objects.filter(Q(solved_count__gt=0) | Q(failed_count__gt=0)).count()
     active_users_percentage = round((active_users / users.count() * 100) if users.count() > 0 else 0, 1)
     
     # Promedio de puntos
@@ -487,48 +489,46 @@ def user_detail(request, user_id):
     ).order_by('-submitted_at')
     
     recent_submissions = all_submissions[:20]
-    total_submissions = all_submissions.count()
+    
+    # Contadores y puntos (solves más bonus de first bloods) desde UserStats
+    stats = UserStats.objects.filter(pk=user.pk).first() or UserStats(user=user)
+    total_submissions = stats.solved_count + stats.failed_count
+    solved_count = stats.solved_count
+    total_points = stats.points
+    first_bloods_count = stats.first_blood_count
     
     # Challenges resueltos
     solved_challenges = Submission.objects.filter(
         submitted_by=user, is_correct=True
     ).select_related('challenge__category').order_by('-submitted_at')
     
-    solved_count = solved_challenges.values('challenge').distinct().count()
-    
-    # Puntos totales
-    total_points = solved_challenges.aggregate(
-        total=Sum('challenge__points')
-    )['total'] or 0
-    
     # First bloods
     first_bloods = FirstBlood.objects.filter(achieved_by=user).select_related(
         'challenge__category'
     )
-    first_bloods_count = first_bloods.count()
-    
-    # Agregar puntos bonus de first bloods
-    fb_bonus = first_bloods.aggregate(total=Sum('bonus_points'))['total'] or 0
-    total_points += fb_bonus
     
     # IDs de challenges con first blood
     first_blood_challenges = list(first_bloods.values_list('challenge__id', flat=True))
     
     # Progreso por categoría
     categories = Category.objects.all()
+    active_by_category = _active_challenges_by_category()
+    solved_by_category = {
+        row['challenge__category']: row
+        for row in solved_challenges.order_by().values('challenge__category').annotate(
+            solved=Count('challenge', distinct=True), points=Sum('challenge__points')
+        )
+    }
     categories_progress = {}
     for category in categories:
-        cat_challenges = Challenge.objects.filter(category=category, is_active=True).count()
-        cat_solved = solved_challenges.filter(challenge__category=category).values('challenge').distinct().count()
-        cat_points = solved_challenges.filter(challenge__category=category).aggregate(
-            total=Sum('challenge__points')
-        )['total'] or 0
+        cat_challenges = active_by_category.get(category.id, 0)
+        cat_solved = solved_by_category.get(category.id, {})
         
         if cat_challenges > 0:
             categories_progress[category.name] = {
                 'total': cat_challenges,
-                'solved': cat_solved,
-                'points': cat_points,
+                'solved': cat_solved.get('solved', 0),
+                'points': cat_solved.get('points') or 0,
             }
     
     context = {
@@ -613,7 +613,9 @@ def ctf_config(request):
     total_challenges = Challenge.objects.count()
     total_teams = Team.objects.count()
     total_users = User.objects.count()
-    total_submissions = Submission.objects.count()
+    total_submissions = TeamStats.objects.aggregate(
+        total=Sum(F('solved_count') + F('failed_count'), default=0)
+    )['total']
     
     context = {
         'config': config,
@@ -720,6 +722,7 @@ def user_edit(request, user_id):
     
     context = {
         'user_obj': user,
+        'user_team': user.teams.first(),
         'teams': teams,
     }
     return render(request, 'admin_panel/users/edit.html', context)
@@ -757,8 +760,9 @@ def user_delete(request, user_id):
         return redirect('admin_panel:users_list')
     
     # Estadísticas del usuario
-    submission_count = Submission.objects.filter(submitted_by=user).count()
-    first_blood_count = FirstBlood.objects.filter(achieved_by=user).count()
+    stats = UserStats.objects.filter(pk=user.pk).first() or UserStats(user=user)
+    submission_count = stats.solved_count + stats.failed_count
+    first_blood_count = stats.first_blood_count
     
     context = {
         'user_obj': user,
@@ -835,11 +839,58 @@ def team_create(request):
     
     return render(request, 'admin_panel/teams/create.html')
 
+# === PROFILES ===
+
+@user_passes_test(is_admin)
+def profiles_list(request):
+    """Profiles de requests capturados con ?_profile=1 (ver ctf_platform.profiling)"""
+    # El log de SQL y los stacks pueden pesar varios MB: no cargarlos en la lista
+    profiles = RequestProfile.objects.select_related('user').defer(
+        'sql_log', 'collapsed_stacks', 'stats'
+    )[:100]
+    return render(request, 'admin_panel/profiles/list.html', {'profiles': profiles})
+
+@user_passes_test(is_admin)
+def profile_detail(request, profile_id):
+    """Detalle de un profile: stacks más frecuentes, reporte de cProfile y log de SQL"""
+    profile = get_object_or_404(RequestProfile.objects.select_related('user'), id=profile_id)
+    context = {
+        'profile': profile,
+        'top_stacks': profile.top_stacks(),
+    }
+    return render(request, 'admin_panel/profiles/detail.html', context)
+
+@user_passes_test(is_admin)
+def profile_download(request, profile_id):
+    """Stacks colapsados para flamegraph.pl o speedscope (o el reporte de cProfile)"""
+    profile = get_object_or_404(RequestProfile, id=profile_id)
+    if profile.mode == 'cprofile':
+        content, extension = profile.stats, 'txt'
+    else:
+        content, extension = profile.collapsed_stacks + '\n', 'folded'
+    response = HttpResponse(content, content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="profile-{profile.id}.{extension}"'
+    return response
+
 @user_passes_test(is_admin)
 def test_websocket(request):
     """Página de prueba para WebSocket con todos los eventos"""
     return render(request, 'admin_panel/test_websocket.html')
 
+# Campos que recibe el socket por cada evento de prueba, en orden, con su valor por
+# defecto (``REQUIRED``: el evento debe traerlo)
+REQUIRED = object()
+TEST_EVENT_FIELDS = {
+    'ctf_time_warning': {'message': REQUIRED, 'minutes_left': REQUIRED},
+    'ctf_ended': {'message': REQUIRED},
+    'notification': {'notification_type': 'info', 'message': REQUIRED},
+    'achievement_unlocked': {'message': REQUIRED, 'achievement': ''},
+    'flag_solved': {'message': REQUIRED, 'team': '', 'challenge': '', 'points': 0},
+    'first_blood': {'message': REQUIRED, 'team': '', 'challenge': ''},
+    'rank_change': {'message': REQUIRED, 'team': '', 'old_rank': 0, 'new_rank': 0},
+    'custom_announcement': {'title': '', 'message': REQUIRED, 'notification_type': 'info'},
+}
+
 @user_passes_test(is_admin)
 def broadcast_test_event(request):
     """Transmitir evento de prueba via WebSocket"""
@@ -847,42 +898,28 @@ def broadcast_test_event(request):
         return JsonResponse({'error': 'Método no permitido'}, status=405)
     
     import json
-    from channels.layers import get_channel_layer
-    from asgiref.sync import async_to_sync
+    from scoreboard.frames import group_send_frame
     
     try:
         data = json.loads(request.body)
-        event_type = data.get('type')
+        event_type = (data.get('type') or '').replace('-', '_')
         
-        channel_layer = get_channel_layer()
+        fields = TEST_EVENT_FIELDS.get(event_type)
+        if fields is None:
+            return JsonResponse({'status': 'error', 'message': f'Tipo de evento no soportado: {event_type}'}, status=400)
         
-        # Preparar el payload copiando los datos
-        payload = {}
-        
-        # Para eventos de notificación, manejar el subtipo correctamente
-        if event_type == 'notification':
-            # Copiar todos los campos excepto 'type'
-            for key, value in data.items():
-                if key != 'type':
-                    payload[key] = value
-            
-            # Establecer el tipo correcto
-            payload['type'] = 'notification'
-            
-            # Si no hay notification_type, buscarlo en los datos originales
-            if 'notification_type' not in payload:
-                # Podría venir como un campo 'type' anidado que no es 'notification'
-                payload['notification_type'] = 'info'
-        else:
-            # Para otros eventos, copiar todo y ajustar el type
-            payload = dict(data)
-            payload['type'] = event_type.replace('-', '_')
+        # El payload se arma igual que lo verá el cliente y se codifica una sola vez
+        payload = {'type': event_type}
+        for key, default in fields.items():
+            if default is REQUIRED:
+                if key not in data:
+                    return JsonResponse({'status': 'error', 'message': f'Falta el campo {key}'}, status=400)
+                payload[key] = data[key]
+            else:
+                payload[key] = data.get(key, default)
         
         # Enviar el evento al grupo de WebSocket
-        async_to_sync(channel_layer.group_send)(
-            'scoreboard',
-            payload
-        )
+        group_send_frame('scoreboard', payload)
         
         return JsonResponse({
             'status': 'success',
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Challenge, Submission, FirstBlood
+from .models import Category, Challenge, Submission, FirstBlood, ScoreEntry
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -8,10 +8,10 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Challenge)
 class ChallengeAdmin(admin.ModelAdmin):
-    list_display = ('title', 'category', 'points', 'is_active', 'get_solve_count')
+    list_display = ('title', 'category', 'points', 'is_active', 'solve_count')
     list_filter = ('category', 'is_active', 'created_at')
     search_fields = ('title', 'description')
-    readonly_fields = ('created_at',)
+    readonly_fields = ('solve_count', 'created_at')
 
 @admin.register(Submission)
 class SubmissionAdmin(admin.ModelAdmin):
@@ -26,3 +26,10 @@ class FirstBloodAdmin(admin.ModelAdmin):
     list_filter = ('achieved_at',)
     search_fields = ('team__name', 'challenge__title')
     readonly_fields = ('achieved_at',)
+
+@admin.register(ScoreEntry)
+class ScoreEntryAdmin(admin.ModelAdmin):
+    list_display = ('team', 'challenge', 'kind', 'points', 'created_at')
+    list_filter = ('kind', 'created_at')
+    search_fields = ('team__name', 'challenge__title')
+    readonly_fields = ('team', 'challenge', 'user', 'kind', 'points', 'created_at')
@@ -5,3 +5,7 @@ class ChallengesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'challenges'
     verbose_name = 'Challenges'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from ctf_platform import sqlite  # noqa: F401  (PRAGMAs de SQLite en cada conexión)
@@ -0,0 +1,88 @@
+"""
+Tablero de challenges por equipo.
+
+El tablero (categorías, challenges activos con su cantidad de solves y cuáles
+resolvió el equipo) se arma con dos queries fijas, sin importar cuántos
+challenges haya, y se guarda en el cache por equipo. Se invalida cuando ese
+equipo resuelve un challenge o cuando un admin edita challenges/categorías
+(ver ``challenges.signals``); la cantidad de solves de otros equipos se
+refresca al vencer ``CHALLENGE_BOARD_TTL``.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from .models import Challenge, Submission
+
+BOARD_VERSION_KEY = 'challenges:board:version'
+TEAM_VERSION_KEY = 'challenges:board:team:{team_id}:version'
+BOARD_CACHE_KEY = 'challenges:board:{team_id}:{version}:{team_version}'
+
+
+def build_board(team=None):
+    """Lista de categorías con sus challenges activos, en dos queries"""
+    challenges = Challenge.objects.filter(is_active=True).select_related('category').order_by(
+        'category__name', 'points', 'title'
+    )
+
+    solved = set()
+    if team is not None:
+        solved = set(
+            Submission.objects.filter(team=team, is_correct=True).values_list('challenge_id', flat=True)
+        )
+
+    categories = {}
+    for challenge in challenges:
+        category = challenge.category
+        if category.id not in categories:
+            categories[category.id] = {
+                'id': category.id,
+                'name': category.name,
+                'icon': category.icon,
+                'color': category.color,
+                'challenges': [],
+            }
+        categories[category.id]['challenges'].append({
+            'id': challenge.id,
+            'title': challenge.title,
+            'points': challenge.points,
+            'solve_count': challenge.solve_count,
+            'solved': challenge.id in solved,
+        })
+
+    return list(categories.values())
+
+
+def _version(key):
+    return cache.get(key, 0)
+
+
+def get_board(team=None):
+    """Tablero del equipo (o sin marcas de resuelto para staff sin equipo) desde el cache"""
+    team_id = team.pk if team is not None else 'none'
+    key = BOARD_CACHE_KEY.format(
+        team_id=team_id,
+        version=_version(BOARD_VERSION_KEY),
+        team_version=_version(TEAM_VERSION_KEY.format(team_id=team_id)),
+    )
+
+    board = cache.get(key)
+    if board is None:
+        board = build_board(team)
+        cache.set(key, board, timeout=getattr(settings, 'CHALLENGE_BOARD_TTL', 15))
+    return board
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def invalidate_board():
+    """Invalida el tablero de todos los equipos (edición de challenges o categorías)"""
+    _bump(BOARD_VERSION_KEY)
+
+
+def invalidate_team_board(team_id):
+    """Invalida solo el tablero de un equipo (tras un solve propio)"""
+    _bump(TEAM_VERSION_KEY.format(team_id=team_id))
@@ -0,0 +1,155 @@
+"""
+Historial exportable de un CTF para reproducirlo con ``replay_ctf``.
+
+``export_history`` toma de la base la configuración, el catálogo, los equipos, los
+usuarios y el historial de ``Submission`` y ``FirstBlood``; ``write_history`` y
+``read_history`` lo guardan y leen como JSON. Las submissions y los first bloods
+se guardan como listas (no dicts) para que un CTF de un millón de intentos quepa
+en un archivo manejable.
+
+``load_catalog`` inserta en una base recién migrada todo menos el historial, con
+los mismos ids, contraseñas y fechas: el historial lo vuelve a generar el replay
+a través del submit real. ``explicit_timestamps`` (que también usa
+``generate_ctf``) permite insertar esas fechas con ``bulk_create``.
+"""
+import json
+from collections import namedtuple
+from contextlib import contextmanager
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from teams.models import Team
+from scoreboard.models import CTFConfig
+from .models import Category, Challenge, Submission, FirstBlood
+
+User = get_user_model()
+
+HISTORY_VERSION = 1
+
+CONFIG_FIELDS = ('name', 'start_time', 'end_time', 'is_active', 'first_blood_points', 'timezone')
+CATEGORY_FIELDS = ('id', 'name', 'description', 'icon', 'color')
+CHALLENGE_FIELDS = ('id', 'title', 'description', 'category_id', 'points', 'flag', 'hints', 'is_active', 'created_at')
+TEAM_FIELDS = ('id', 'name', 'color', 'invite_code', 'created_at', 'total_score')
+USER_FIELDS = ('id', 'username', 'password', 'email', 'is_staff', 'is_superuser', 'is_active', 'date_joined')
+SUBMISSION_FIELDS = ('team_id', 'challenge_id', 'submitted_by_id', 'flag_submitted', 'is_correct', 'submitted_at')
+FIRST_BLOOD_FIELDS = ('team_id', 'challenge_id', 'achieved_by_id', 'bonus_points', 'achieved_at')
+
+SubmissionRow = namedtuple('SubmissionRow', SUBMISSION_FIELDS)
+FirstBloodRow = namedtuple('FirstBloodRow', FIRST_BLOOD_FIELDS)
+
+DATETIME_FIELDS = {'start_time', 'end_time', 'created_at', 'date_joined', 'submitted_at', 'achieved_at'}
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    ``bulk_create`` pisa los campos ``auto_now_add`` con la hora actual: se desactivan
+    mientras se insertan las fechas generadas
+    """
+    fields = [field for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def export_history():
+    """Historial completo del CTF de la base actual, ordenado por fecha de envío"""
+    config = CTFConfig.get_config()
+    return {
+        'version': HISTORY_VERSION,
+        'config': {field: getattr(config, field) for field in CONFIG_FIELDS},
+        'categories': list(Category.objects.order_by('name').values(*CATEGORY_FIELDS)),
+        'challenges': list(Challenge.objects.order_by('created_at', 'id').values(*CHALLENGE_FIELDS)),
+        'teams': list(Team.objects.order_by('created_at', 'id').values(*TEAM_FIELDS)),
+        'users': list(User.objects.order_by('date_joined', 'id').values(*USER_FIELDS)),
+        'memberships': list(Team.members.through.objects.values_list('team_id', 'user_id')),
+        'submissions': list(Submission.objects.order_by('submitted_at', 'id').values_list(*SUBMISSION_FIELDS)),
+        'first_bloods': list(FirstBlood.objects.order_by('achieved_at').values_list(*FIRST_BLOOD_FIELDS)),
+    }
+
+
+def write_history(history, path):
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(history, handle, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def _parse_datetime(value):
+    return parse_datetime(value) if isinstance(value, str) else value
+
+
+def _parse_row(row):
+    """Fila (dict) con las fechas ya convertidas"""
+    return {
+        field: _parse_datetime(value) if field in DATETIME_FIELDS else value
+        for field, value in row.items()
+    }
+
+
+def read_history(path):
+    """Lee un historial exportado (ver ``normalize_history``)"""
+    with open(path, encoding='utf-8') as handle:
+        raw = json.load(handle)
+    if raw.get('version') != HISTORY_VERSION:
+        raise ValueError(f'Versión de historial no soportada: {raw.get("version")}')
+    return normalize_history(raw)
+
+
+def normalize_history(raw):
+    """
+    Convierte un historial (exportado en memoria o leído de JSON) a dicts con fechas;
+    las submissions y los first bloods quedan como ``SubmissionRow``/``FirstBloodRow``
+    """
+    return {
+        'version': raw['version'],
+        'config': _parse_row(raw['config']),
+        'categories': [_parse_row(row) for row in raw['categories']],
+        'challenges': [_parse_row(row) for row in raw['challenges']],
+        'teams': [_parse_row(row) for row in raw['teams']],
+        'users': [_parse_row(row) for row in raw['users']],
+        'memberships': [tuple(row) for row in raw['memberships']],
+        'submissions': [
+            SubmissionRow(*row[:-1], _parse_datetime(row[-1])) for row in raw['submissions']
+        ],
+        'first_bloods': [
+            FirstBloodRow(*row[:-1], _parse_datetime(row[-1])) for row in raw['first_bloods']
+        ],
+    }
+
+
+@transaction.atomic
+def load_catalog(history):
+    """
+    Inserta configuración, categorías, challenges, equipos, usuarios y membresías en
+    una base sin datos del CTF. Los challenges quedan activos para que el replay pueda
+    enviarles flags; ``restore_challenge_state`` devuelve su estado original.
+    """
+    config = CTFConfig.get_config()
+    for field, value in history['config'].items():
+        setattr(config, field, value)
+    config.save()
+
+    with explicit_timestamps(Team, Challenge):
+        Category.objects.bulk_create([Category(**row) for row in history['categories']])
+        Challenge.objects.bulk_create([
+            Challenge(**{**row, 'is_active': True}) for row in history['challenges']
+        ])
+        Team.objects.bulk_create([
+            Team(**{field: value for field, value in row.items() if field != 'total_score'})
+            for row in history['teams']
+        ])
+        User.objects.bulk_create([User(**row) for row in history['users']])
+        Team.members.through.objects.bulk_create([
+            Team.members.through(team_id=team_id, user_id=user_id) for team_id, user_id in history['memberships']
+        ])
+
+
+def restore_challenge_state(history):
+    """Vuelve a desactivar los challenges que estaban inactivos en el CTF original"""
+    inactive = [row['id'] for row in history['challenges'] if not row['is_active']]
+    Challenge.objects.filter(pk__in=inactive).update(is_active=False)
@@ -0,0 +1,153 @@
+import os
+import tempfile
+import threading
+import time
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection, connections
+from django.test.utils import override_settings
+from teams.models import Team
+from challenges.models import Category, Challenge, Submission
+from challenges.scoring import commit_submission
+from ctf_platform.sqlite import run_write
+
+User = get_user_model()
+
+BENCH_CHANNEL_LAYERS = {
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer', 'CONFIG': {'capacity': 100000}},
+}
+
+
+class Command(BaseCommand):
+    help = 'Compara el throughput del submit en SQLite: configuración por defecto vs modo producción (WAL + cola de escritura)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teams', type=int, default=50, help='Equipos enviando flags en paralelo')
+        parser.add_argument('--challenges', type=int, default=10, help='Challenges que resuelve cada equipo')
+        parser.add_argument('--readers', type=int, default=10,
+                            help='Hilos leyendo el ranking mientras se envían flags')
+        parser.add_argument('--dir', default=None,
+                            help='Directorio para la base temporal (usar el mismo disco que producción)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('El benchmark es para SQLite')
+
+        modes = [
+            ('por defecto', {'timeout': 5}, {}, False),
+            ('producción', dict(settings.DATABASES['default'].get('OPTIONS', {})), settings.SQLITE_PRAGMAS, True),
+        ]
+
+        self.stdout.write(
+            f"{options['teams']} equipos x {options['challenges']} challenges (1 flag incorrecta + 1 correcta c/u), "
+            'base de datos temporal'
+        )
+        self.stdout.write(
+            f'{"modo":>12} {"submits":>8} {"errores":>8} {"segundos":>9} {"submits/s":>10} '
+            f'{"lecturas":>9} {"lectura p95 (ms)":>17} {"lectura máx (ms)":>17}'
+        )
+
+        for label, db_options, pragmas, write_queue in modes:
+            with override_settings(SQLITE_PRAGMAS=pragmas, SQLITE_WRITE_QUEUE=write_queue,
+                                   CHANNEL_LAYERS=BENCH_CHANNEL_LAYERS):
+                result = self.run_mode(db_options, options, options['dir'])
+            ok, errors, elapsed, reads = result
+            reads.sort()
+            p95 = reads[int(len(reads) * 0.95)] if reads else 0
+            worst = reads[-1] if reads else 0
+            self.stdout.write(
+                f'{label:>12} {ok:>8} {errors:>8} {elapsed:>9.2f} {ok / elapsed:>10.1f} '
+                f'{len(reads):>9} {p95 * 1000:>17.1f} {worst * 1000:>17.1f}'
+            )
+
+    def run_mode(self, db_options, options, directory=None):
+        """Ejecuta el benchmark sobre una base temporal recién migrada"""
+        db_settings = connections.settings['default']
+        original = (db_settings['NAME'], db_settings.get('OPTIONS', {}))
+        handle, path = tempfile.mkstemp(suffix='.sqlite3', dir=directory)
+        os.close(handle)
+
+        connections.close_all()
+        db_settings['NAME'], db_settings['OPTIONS'] = path, db_options
+        try:
+            call_command('migrate', verbosity=0)
+            players, challenges = self.create_data(options['teams'], options['challenges'])
+            return self.submit_in_parallel(players, challenges, options['readers'])
+        finally:
+            connections.close_all()
+            db_settings['NAME'], db_settings['OPTIONS'] = original
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    def create_data(self, team_count, challenge_count):
+        category = Category.objects.create(name='Bench')
+        challenges = [
+            Challenge.objects.create(title=f'Bench {idx}', description='-', category=category,
+                                     points=100, flag=f'flag{{{idx}}}')
+            for idx in range(challenge_count)
+        ]
+        players = []
+        for idx in range(team_count):
+            team = Team.objects.create(name=f'Bench team {idx}')
+            user = User.objects.create_user(username=f'bench{idx}', password='bench')
+            team.members.add(user)
+            players.append((team, user))
+        return players, challenges
+
+    def submit(self, team, user, challenge, flag):
+        """Mismo camino que submit_flag: verificación de solve previo y escritura"""
+        if Submission.objects.filter(team=team, challenge=challenge, is_correct=True).exists():
+            return
+        run_write(commit_submission, team, challenge, user, flag, flag == challenge.flag, 50)
+
+    def submit_in_parallel(self, players, challenges, reader_count):
+        counts = {'ok': 0, 'errors': 0}
+        read_times = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(players) + reader_count)
+        done = threading.Event()
+
+        def read():
+            """Lecturas del ranking (como el scoreboard) durante la ráfaga de solves"""
+            barrier.wait()
+            while not done.is_set():
+                start = time.perf_counter()
+                try:
+                    list(Team.objects.order_by('-total_score', 'name').values('name', 'total_score')[:50])
+                except OperationalError:
+                    with lock:
+                        counts['errors'] += 1
+                    continue
+                with lock:
+                    read_times.append(time.perf_counter() - start)
+                time.sleep(0.01)
+            connection.close()
+
+        def play(team, user):
+            barrier.wait()
+            for challenge in challenges:
+                for flag in ('flag{nope}', challenge.flag):
+                    try:
+                        self.submit(team, user, challenge, flag)
+                        key = 'ok'
+                    except OperationalError:
+                        key = 'errors'
+                    with lock:
+                        counts[key] += 1
+            connection.close()
+
+        writers = [threading.Thread(target=play, args=player) for player in players]
+        readers = [threading.Thread(target=read) for _ in range(reader_count)]
+        start = time.perf_counter()
+        for thread in writers + readers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        done.set()
+        for thread in readers:
+            thread.join()
+        return counts['ok'], counts['errors'], elapsed, read_times
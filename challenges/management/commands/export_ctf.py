@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from challenges.history import export_history, write_history
+
+
+class Command(BaseCommand):
+    help = 'Exporta el historial del CTF (catálogo, equipos, usuarios, submissions y first bloods) para replay_ctf'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo JSON de salida')
+
+    def handle(self, *args, **options):
+        history = export_history()
+        write_history(history, options['path'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Historial exportado a {options["path"]}: {len(history["teams"])} equipos, '
+            f'{len(history["users"])} usuarios, {len(history["challenges"])} challenges, '
+            f'{len(history["submissions"])} submissions, {len(history["first_bloods"])} first bloods'
+        ))
@@ -0,0 +1,402 @@
+"""
+Genera un CTF sintético de gran tamaño para reproducir problemas de rendimiento en local.
+
+Todo se calcula en memoria a partir de un ``random.Random`` sembrado (incluidos los
+UUID) y se inserta con ``bulk_create`` en lotes dentro de una sola transacción. Los
+contadores, el ledger de puntajes, los first bloods y los logros se derivan de los
+solves generados, así que ``recalculate_scores`` y ``rebuild_counters --check`` no
+encuentran diferencias.
+"""
+import heapq
+import random
+import string
+import time
+import uuid
+from bisect import bisect_right
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import accumulate
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from teams.models import Team
+from challenges.models import Category, Challenge, Submission, FirstBlood, ScoreEntry, UserChallengeStats
+from challenges.history import explicit_timestamps
+from challenges.stats import rebuild_stats
+from scoreboard.models import Achievement, CTFConfig
+
+User = get_user_model()
+
+CATEGORIES = [
+    ('Web', '🌐', '#00ff41'),
+    ('Crypto', '🔐', '#ff00ff'),
+    ('Forensics', '🔍', '#00ffff'),
+    ('Reversing', '⚙️', '#ffff00'),
+    ('Pwn', '💥', '#ff0000'),
+    ('Misc', '🎲', '#ffa500'),
+    ('OSINT', '🛰️', '#4169e1'),
+    ('Stego', '🖼️', '#adff2f'),
+]
+
+CODE_ALPHABET = string.ascii_uppercase + string.digits
+
+
+class Command(BaseCommand):
+    help = 'Genera un CTF sintético grande (equipos, challenges, millones de submissions) reproducible con --seed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teams', type=int, default=5000, help='Cantidad de equipos')
+        parser.add_argument('--members', type=int, default=3, help='Miembros por equipo')
+        parser.add_argument('--categories', type=int, default=6, help='Cantidad de categorías')
+        parser.add_argument('--challenges', type=int, default=8, help='Challenges por categoría')
+        parser.add_argument('--submissions', type=int, default=1_000_000, help='Submissions totales')
+        parser.add_argument('--correct-ratio', type=float, default=0.1,
+                            help='Fracción de submissions correctas (limitada por equipos x challenges)')
+        parser.add_argument('--hours', type=float, default=48, help='Duración del CTF en horas')
+        parser.add_argument('--start', default=None,
+                            help='Inicio del CTF (ISO 8601); por defecto termina ahora. Fijarlo para datos idénticos')
+        parser.add_argument('--seed', type=int, default=1337, help='Semilla: mismos argumentos, mismos datos')
+        parser.add_argument('--prefix', default='gen', help='Prefijo de nombres de equipos, usuarios y categorías')
+        parser.add_argument('--password', default='ctf', help='Contraseña de todos los usuarios generados')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Filas por INSERT')
+
+    def handle(self, *args, **options):
+        if min(options['teams'], options['members'], options['categories'], options['challenges']) < 1:
+            raise CommandError('--teams, --members, --categories y --challenges deben ser al menos 1')
+        if not 0 < options['correct_ratio'] <= 1:
+            raise CommandError('--correct-ratio debe estar entre 0 y 1')
+
+        prefix = options['prefix']
+        if Team.objects.filter(name__startswith=f'{prefix} ').exists():
+            raise CommandError(f'Ya hay equipos con el prefijo "{prefix}": usar otro --prefix o una base vacía')
+
+        duration = timedelta(hours=options['hours'])
+        if options['start']:
+            start = datetime.fromisoformat(options['start'])
+            if timezone.is_naive(start):
+                start = timezone.make_aware(start)
+        else:
+            start = timezone.now().replace(microsecond=0) - duration
+
+        # La semilla incluye el prefijo: dos CTFs generados en la misma base no comparten UUIDs
+        self.rng = random.Random(f'{prefix}:{options["seed"]}')
+        self.batch_size = options['batch_size']
+        self.started = time.perf_counter()
+
+        self.build_catalog(prefix, options['categories'], options['challenges'], start)
+        self.build_teams(prefix, options['teams'], options['members'], options['password'], start)
+        self.build_solves(options['submissions'], options['correct_ratio'], start, duration)
+        self.build_first_bloods(CTFConfig.get_config().first_blood_points)
+        self.build_achievements()
+
+        if connection.vendor == 'sqlite':
+            # Caché de páginas de 256 MB para esta conexión: los UUID se insertan en orden aleatorio
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA cache_size=-262144')
+
+        with explicit_timestamps(Team, Challenge, Submission, FirstBlood, Achievement), transaction.atomic():
+            self.insert(Category, self.categories)
+            self.insert(Challenge, self.challenges)
+            self.insert(Team, self.teams)
+            self.insert(User, self.users)
+            self.insert(Team.members.through, self.memberships)
+            with self.deferred_indexes(Submission):
+                self.insert(Submission, self.iter_submissions(options['submissions'], start, duration))
+            self.insert(FirstBlood, self.first_bloods)
+            self.insert(ScoreEntry, self.score_entries)
+            self.insert(Achievement, self.achievements)
+            self.insert(UserChallengeStats, self.iter_attempt_stats())
+
+            # Las estadísticas de equipos y jugadores se agregan en la base
+            step = time.perf_counter()
+            rows = rebuild_stats(fix=True)
+            self.stdout.write(f'  estadísticas: {len(rows)} filas en {time.perf_counter() - step:.1f} s')
+
+            # bulk_create no dispara señales: invalidar snapshot y tableros explícitamente
+            from scoreboard.snapshot import invalidate_snapshot
+            from challenges.board import invalidate_board
+            transaction.on_commit(invalidate_snapshot)
+            transaction.on_commit(invalidate_board)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'CTF generado en {time.perf_counter() - self.started:.1f} s: {len(self.teams)} equipos, '
+            f'{len(self.users)} usuarios, {len(self.challenges)} challenges, {options["submissions"]} submissions '
+            f'({len(self.solves)} correctas), {len(self.first_bloods)} first bloods, {len(self.achievements)} logros'
+        ))
+
+    def uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    @contextmanager
+    def deferred_indexes(self, model):
+        """
+        Quita los índices de ``Meta.indexes`` durante la carga y los crea al final: construir
+        un índice sobre la tabla llena es mucho más rápido que mantenerlo fila a fila. Se usa
+        dentro de la transacción de la carga: si algo falla, el DDL también se revierte.
+        """
+        # Sin ``with``: en SQLite el editor no se puede abrir dentro de una transacción.
+        # ``deferred_sql`` lo inicializa __enter__ y remove_index lo recorre
+        editor = connection.schema_editor()
+        editor.deferred_sql = []
+        for index in model._meta.indexes:
+            editor.remove_index(model, index)
+        yield
+        step = time.perf_counter()
+        # PostgreSQL no crea índices con chequeos de FK diferidos pendientes: se verifican antes
+        connection.check_constraints(table_names=[model._meta.db_table])
+        for index in model._meta.indexes:
+            editor.add_index(model, index)
+        self.stdout.write(
+            f'  índices de {model._meta.verbose_name_plural}: {len(model._meta.indexes)} en '
+            f'{time.perf_counter() - step:.1f} s'
+        )
+
+    def insert(self, model, objs):
+        """Inserta en lotes; ``objs`` puede ser un generador para no tener todo en memoria"""
+        step = time.perf_counter()
+        if isinstance(objs, list):
+            model.objects.bulk_create(objs, batch_size=self.batch_size)
+            count = len(objs)
+        else:
+            count = 0
+            batch = []
+            for obj in objs:
+                batch.append(obj)
+                if len(batch) == self.batch_size:
+                    model.objects.bulk_create(batch)
+                    count += len(batch)
+                    batch = []
+            model.objects.bulk_create(batch)
+            count += len(batch)
+        self.stdout.write(
+            f'  {model._meta.verbose_name_plural}: {count} en {time.perf_counter() - step:.1f} s'
+        )
+
+    def build_catalog(self, prefix, category_count, per_category, start):
+        """Categorías y challenges; la dificultad crece con el índice dentro de la categoría"""
+        self.categories = []
+        self.challenges = []
+        self.difficulty = []
+        for cat_idx in range(category_count):
+            name, icon, color = CATEGORIES[cat_idx % len(CATEGORIES)]
+            if cat_idx >= len(CATEGORIES):
+                name = f'{name} {cat_idx // len(CATEGORIES) + 1}'
+            category = Category(id=self.uuid(), name=f'{prefix} {name}', icon=icon, color=color)
+            self.categories.append(category)
+
+            for idx in range(per_category):
+                difficulty = min(max((idx + self.rng.random()) / per_category, 0.02), 0.98)
+                self.difficulty.append(difficulty)
+                self.challenges.append(Challenge(
+                    id=self.uuid(),
+                    title=f'{name} {idx + 1}',
+                    description=f'Challenge generado de {name} (dificultad {difficulty:.2f})',
+                    category=category,
+                    points=50 * (1 + round(difficulty * 9)),
+                    flag=f'flag{{{prefix}_{cat_idx}_{idx}_{self.rng.getrandbits(32):08x}}}',
+                    created_at=start - timedelta(days=1),
+                ))
+
+    def build_teams(self, prefix, team_count, members, password, start):
+        """Equipos con una habilidad (pocos equipos fuertes, muchos débiles) y sus miembros"""
+        # Un solo hash para todos: el hasher tarda ~100 ms por llamada a propósito
+        password_hash = make_password(password)
+        codes = set()
+        self.teams = []
+        self.skill = []
+        self.users = []
+        self.memberships = []
+        self.team_users = []
+        for team_idx in range(team_count):
+            code = ''.join(self.rng.choices(CODE_ALPHABET, k=8))
+            while code in codes:
+                code = ''.join(self.rng.choices(CODE_ALPHABET, k=8))
+            codes.add(code)
+
+            joined = start - timedelta(seconds=self.rng.randrange(7 * 86400))
+            team = Team(
+                id=self.uuid(),
+                name=f'{prefix} team {team_idx}',
+                color=f'#{self.rng.getrandbits(24):06X}',
+                invite_code=code,
+                created_at=joined,
+            )
+            self.teams.append(team)
+            self.skill.append(self.rng.betavariate(2, 5))
+
+            users = []
+            for member_idx in range(members):
+                user = User(
+                    id=self.uuid(),
+                    username=f'{prefix}_{team_idx}_{member_idx}',
+                    password=password_hash,
+                    date_joined=joined,
+                )
+                users.append(user)
+                self.memberships.append(Team.members.through(team_id=team.id, user_id=user.id))
+            self.users.extend(users)
+            self.team_users.append(users)
+
+    def build_solves(self, total, correct_ratio, start, duration):
+        """
+        Elige qué equipo resuelve qué challenge (muestreo ponderado por habilidad y
+        facilidad) y cuándo, y actualiza contadores, puntajes y ledger en memoria
+        """
+        pair_count = len(self.teams) * len(self.challenges)
+        solve_count = min(round(total * correct_ratio), pair_count, total)
+        seconds = duration.total_seconds()
+
+        # Peso de los intentos (correctos o no) de cada par equipo-challenge
+        self.pair_weights = []
+        keyed = []
+        for team_idx, skill in enumerate(self.skill):
+            for chall_idx, difficulty in enumerate(self.difficulty):
+                self.pair_weights.append((1 + 6 * difficulty) * (0.3 + skill))
+                # Efraimidis-Spirakis: los K mayores de u^(1/w) son una muestra ponderada sin reemplazo
+                weight = skill * (1 - difficulty) + 0.01
+                keyed.append((self.rng.random() ** (1 / weight), team_idx, chall_idx))
+
+        self.solves = {}
+        self.score_entries = []
+        for _, team_idx, chall_idx in heapq.nlargest(solve_count, keyed):
+            difficulty = self.difficulty[chall_idx]
+            # Los challenges fáciles y los equipos fuertes resuelven antes
+            fraction = self.rng.betavariate(1 + 4 * difficulty, 3 + 4 * self.skill[team_idx])
+            at = start + timedelta(seconds=round(fraction * seconds * 0.999, 3))
+            user = self.rng.choice(self.team_users[team_idx])
+            self.solves[team_idx, chall_idx] = (at, user)
+
+            team = self.teams[team_idx]
+            challenge = self.challenges[chall_idx]
+            team.total_score += challenge.points
+            team.solved_count += 1
+            team.last_solve_at = max(team.last_solve_at or at, at)
+            challenge.solve_count += 1
+            self.score_entries.append(ScoreEntry(
+                id=self.uuid(), team_id=team.id, challenge_id=challenge.id, user_id=user.id,
+                kind='solve', points=challenge.points, created_at=at,
+            ))
+
+    def build_first_bloods(self, bonus_points):
+        """El solve más temprano de cada challenge es su first blood"""
+        first = {}
+        for (team_idx, chall_idx), (at, user) in self.solves.items():
+            if chall_idx not in first or at < first[chall_idx][0]:
+                first[chall_idx] = (at, team_idx, user)
+
+        self.first_bloods = []
+        self.first_blood_teams = defaultdict(int)
+        self.first_blood_users = set()
+        for chall_idx, (at, team_idx, user) in sorted(first.items()):
+            team = self.teams[team_idx]
+            challenge = self.challenges[chall_idx]
+            self.first_bloods.append(FirstBlood(
+                id=self.uuid(), team_id=team.id, challenge_id=challenge.id, achieved_by_id=user.id,
+                bonus_points=bonus_points, achieved_at=at,
+            ))
+            self.score_entries.append(ScoreEntry(
+                id=self.uuid(), team_id=team.id, challenge_id=challenge.id, user_id=user.id,
+                kind='first_blood', points=bonus_points, created_at=at,
+            ))
+            team.total_score += bonus_points
+            team.first_blood_count += 1
+            self.first_blood_teams[team_idx] += 1
+            self.first_blood_users.add(user.id)
+
+    def build_achievements(self):
+        """
+        Logros que se deducen de los solves generados. Los que dependen de los intentos
+        fallidos por jugador o del ranking en vivo (perfectionist, persistent,
+        sharpshooter, comeback_kid, speed_demon) no se generan.
+        """
+        # Misma hora que evalúa night_owl: la de TIME_ZONE, no la configurada en el CTF
+        tz = timezone.get_default_timezone()
+        by_team = defaultdict(list)
+        by_user = defaultdict(list)
+        for (team_idx, chall_idx), (at, user) in self.solves.items():
+            by_team[team_idx].append((at, chall_idx))
+            by_user[user.id].append(at)
+
+        category_of = [challenge.category_id for challenge in self.challenges]
+        category_total = len(self.categories)
+        challenge_total = len(self.challenges)
+        self.achievements = []
+
+        def award(code, at, team=None, user=None):
+            self.achievements.append(Achievement(
+                code=code, team=team, user=user, category='individual' if user else 'team', earned_at=at,
+            ))
+
+        for team_idx, solves in sorted(by_team.items()):
+            solves.sort()
+            team = self.teams[team_idx]
+            if self.first_blood_teams[team_idx]:
+                award('first_blood', solves[0][0], team=team)
+            if self.first_blood_teams[team_idx] >= 3:
+                award('blood_thirsty', solves[-1][0], team=team)
+            if len({category_of[chall_idx] for _, chall_idx in solves}) >= category_total:
+                award('jack_of_all_trades', solves[-1][0], team=team)
+            if len(solves) >= challenge_total / 2:
+                award('half_way', solves[(challenge_total + 1) // 2 - 1][0], team=team)
+            if len(solves) >= challenge_total:
+                award('completionist', solves[-1][0], team=team)
+            if len(solves) >= 3 and (solves[2][0] - solves[0][0]).total_seconds() <= 1800:
+                award('unstoppable', solves[2][0], team=team)
+            night = [at for at, _ in solves if 2 <= at.astimezone(tz).hour < 6]
+            if night:
+                award('night_owl', night[0], team=team)
+
+        for users in self.team_users:
+            for user in users:
+                solves = sorted(by_user.get(user.id, []))
+                if len(solves) >= 10:
+                    award('solo_warrior', solves[9], user=user)
+                if user.id in self.first_blood_users:
+                    award('early_bird', solves[0], user=user)
+
+    def iter_submissions(self, total, start, duration):
+        """
+        Los solves y, hasta completar ``total``, intentos fallidos: antes del solve si
+        el equipo lo resolvió, y con más actividad al inicio del CTF si no
+        """
+        seconds = duration.total_seconds()
+        # Intentos por (jugador, challenge) para UserChallengeStats: [fallos, resuelto]
+        self.attempts = defaultdict(lambda: [0, None])
+        for (team_idx, chall_idx), (at, user) in self.solves.items():
+            challenge = self.challenges[chall_idx]
+            self.attempts[user.id, chall_idx][1] = at
+            yield Submission(
+                id=self.uuid(), team_id=self.teams[team_idx].id, challenge_id=challenge.id,
+                submitted_by_id=user.id, flag_submitted=challenge.flag, is_correct=True, submitted_at=at,
+            )
+
+        challenge_count = len(self.challenges)
+        cum_weights = list(accumulate(self.pair_weights))
+        pair_total = cum_weights[-1]
+        for _ in range(total - len(self.solves)):
+            pair = bisect_right(cum_weights, self.rng.random() * pair_total)
+            team_idx, chall_idx = divmod(min(pair, len(cum_weights) - 1), challenge_count)
+            solve = self.solves.get((team_idx, chall_idx))
+            if solve:
+                # Los fallos se concentran poco antes del solve
+                before = (solve[0] - start).total_seconds() * self.rng.random() ** 3
+                at = solve[0] - timedelta(seconds=round(max(before, 0.001), 3))
+            else:
+                at = start + timedelta(seconds=round(self.rng.betavariate(1.3, 2.5) * seconds, 3))
+            submission = Submission(
+                id=self.uuid(), team_id=self.teams[team_idx].id, challenge_id=self.challenges[chall_idx].id,
+                submitted_by_id=self.rng.choice(self.team_users[team_idx]).id,
+                flag_submitted=f'flag{{{self.rng.getrandbits(40):010x}}}', is_correct=False, submitted_at=at,
+            )
+            self.attempts[submission.submitted_by_id, chall_idx][0] += 1
+            yield submission
+
+    def iter_attempt_stats(self):
+        """Intentos por (jugador, challenge) contados al generar las submissions"""
+        for (user_id, chall_idx), (failed, solved_at) in self.attempts.items():
+            yield UserChallengeStats(
+                user_id=user_id, challenge_id=self.challenges[chall_idx].id, failed_count=failed, solved_at=solved_at,
+            )
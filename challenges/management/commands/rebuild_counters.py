@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from challenges.scoring import rebuild_counters
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de challenges y equipos y las estadísticas de logros desde las submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Solo reportar contadores inconsistentes, sin corregirlos',
+        )
+
+    def handle(self, *args, **options):
+        fix = not options['check']
+
+        self.stdout.write(self.style.WARNING('Recalculando contadores desde las submissions...'))
+
+        stale = rebuild_counters(fix=fix)
+
+        for obj in stale:
+            style = self.style.SUCCESS if fix else self.style.ERROR
+            mark = '✓' if fix else '✗'
+            self.stdout.write(style(f'{mark} {obj._meta.verbose_name}: {obj}'))
+
+        if not stale:
+            self.stdout.write(self.style.SUCCESS('\n¡Todos los contadores son consistentes!'))
+        elif fix:
+            self.stdout.write(self.style.SUCCESS(f'\n¡{len(stale)} contadores corregidos exitosamente!'))
+        else:
+            self.stdout.write(self.style.ERROR(f'\n{len(stale)} contadores inconsistentes'))
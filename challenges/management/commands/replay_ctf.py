@@ -0,0 +1,369 @@
+"""
+Reproduce el historial de un CTF terminado, acelerado, sobre una base nueva.
+
+Cada submission del historial (``export_ctf`` o la base configurada) se envía por
+``submit_flag`` con el mismo usuario: middleware, vista, cola de escritura, ledger
+y first blood. El post-solve (logros, ranking y broadcast al display) se procesa en
+este proceso (``SCOREBOARD_EVENTS_INLINE``) sobre el channel layer configurado, así
+que un display conectado al mismo Redis ve el replay en vivo.
+
+Mientras se procesa cada submission ``timezone.now()`` devuelve la fecha original del
+intento: submissions, first bloods, ledger y logros quedan con las fechas del CTF y
+los logros que dependen de la hora se evalúan como en el evento real.
+
+Mide por submission la latencia del submit y el tiempo y cantidad de queries (todas
+las conexiones, incluido el hilo escritor), y por broadcast los bytes enviados por
+grupo, el tiempo de armado del display y la demora desde el commit.
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, suppress
+from unittest import mock
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from teams.models import Team
+from challenges.board import invalidate_board
+from challenges.history import export_history, load_catalog, normalize_history, read_history, restore_challenge_state
+from challenges.models import Challenge, FirstBlood, Submission
+from scoreboard.broadcaster import broadcaster
+from scoreboard.display import DISPLAY_STATE_KEY
+from scoreboard.frames import FRAME_MESSAGE_TYPE
+from scoreboard.loadtest import OperationStats, percentile
+from scoreboard.models import CTFConfig
+from scoreboard.snapshot import invalidate_snapshot
+
+User = get_user_model()
+
+
+class ReplayClock:
+    """Reloj virtual: ``now`` retorna la fecha de la submission que se está reproduciendo"""
+
+    def __init__(self, current):
+        self.current = current
+
+    def now(self):
+        return self.current
+
+
+class QueryTimer:
+    """``execute_wrapper`` que acumula cantidad y tiempo de queries de todas las conexiones"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.seconds = 0.0
+        self.active = True
+
+    def __call__(self, execute, sql, params, many, context):
+        if not self.active:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.count += 1
+                self.seconds += elapsed
+
+    def snapshot(self):
+        with self.lock:
+            return self.count, self.seconds
+
+    def on_connection_created(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self)
+
+    @contextmanager
+    def installed(self):
+        # Las conexiones de otros hilos (escritor de SQLite, timer del broadcaster) se
+        # crean durante el replay: el wrapper se agrega al abrirse cada una
+        connection_created.connect(self.on_connection_created)
+        connection.execute_wrappers.append(self)
+        try:
+            yield self
+        finally:
+            connection_created.disconnect(self.on_connection_created)
+            connection.execute_wrappers.remove(self)
+            self.active = False
+
+
+class BroadcastRecorder:
+    """Envuelve ``group_send`` del channel layer para medir los frames y su demora desde el commit"""
+
+    def __init__(self):
+        self.sizes = defaultdict(list)
+        self.delays = []
+
+    @contextmanager
+    def installed(self):
+        layer = get_channel_layer()
+        original = layer.group_send
+
+        async def group_send(group, message):
+            if message.get('type') == FRAME_MESSAGE_TYPE:
+                self.record(group, message['text'])
+            await original(group, message)
+
+        layer.group_send = group_send
+        try:
+            yield self
+        finally:
+            del layer.group_send
+
+    def record(self, group, text):
+        sent_at = time.time()
+        self.sizes[group].append(len(text.encode('utf-8')))
+        if '"committed_at"' in text:
+            for event in json.loads(text).get('events', []):
+                if event.get('committed_at'):
+                    self.delays.append(sent_at - event['committed_at'])
+
+
+class Command(BaseCommand):
+    help = 'Reproduce un CTF terminado a velocidad acelerada por el submit y el broadcast reales, midiendo cada evento'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dump', default=None,
+                            help='Historial exportado con export_ctf (por defecto se lee de la base configurada)')
+        parser.add_argument('--sqlite', default=None,
+                            help='Archivo SQLite nuevo donde reproducir (por defecto la base configurada, que debe estar vacía)')
+        parser.add_argument('--speed', type=float, default=10,
+                            help='Aceleración respecto del CTF original (0 = lo más rápido posible)')
+        parser.add_argument('--limit', type=int, default=None, help='Reproducir solo las primeras N submissions')
+
+    def handle(self, *args, **options):
+        if options['speed'] < 0:
+            raise CommandError('--speed no puede ser negativo')
+
+        if options['dump']:
+            try:
+                history = read_history(options['dump'])
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f'No se pudo leer el historial: {exc}')
+        elif options['sqlite']:
+            history = normalize_history(export_history())
+        else:
+            raise CommandError('Sin --dump el historial se lee de la base configurada: indicar --sqlite para el replay')
+
+        submissions = history['submissions'][:options['limit']]
+        if not submissions:
+            raise CommandError('El historial no tiene submissions')
+
+        if options['sqlite']:
+            with self.sqlite_database(options['sqlite']):
+                self.replay(history, submissions, options)
+        else:
+            self.replay(history, submissions, options)
+
+    @contextmanager
+    def sqlite_database(self, path):
+        """Cambia la conexión por defecto a un archivo SQLite nuevo y migrado"""
+        if os.path.exists(path):
+            raise CommandError(f'{path} ya existe: el replay necesita una base nueva')
+
+        db_settings = connections.settings['default']
+        original = dict(db_settings)
+        self.discard_connection()
+        db_settings.update(ENGINE='django.db.backends.sqlite3', NAME=path, OPTIONS={}, CONN_MAX_AGE=0)
+        try:
+            call_command('migrate', verbosity=0)
+            yield
+        finally:
+            self.discard_connection()
+            db_settings.clear()
+            db_settings.update(original)
+
+    def discard_connection(self):
+        """Cierra las conexiones y descarta la de este hilo, que conserva el motor con que se creó"""
+        connections.close_all()
+        with suppress(AttributeError):
+            del connections['default']
+
+    def replay(self, history, submissions, options):
+        if Team.objects.exists() or Challenge.objects.exists() or User.objects.exists():
+            raise CommandError('La base del replay debe estar recién migrada (sin usuarios, equipos ni challenges)')
+
+        load_catalog(history)
+        # Un display o servidor conectado al mismo cache no debe ver el estado del CTF anterior
+        CTFConfig.clear_cache()
+        invalidate_snapshot()
+        invalidate_board()
+        cache.delete(DISPLAY_STATE_KEY)
+
+        # Los ids del historial leído de JSON son texto: indexar por texto
+        users = {str(user.pk): user for user in User.objects.all()}
+        self.clients = {}
+        self.stats = {'solve': OperationStats(), 'fallo': OperationStats()}
+        self.queries = []
+        self.db_times = []
+        self.flush_times = []
+        outcomes = Counter()
+        mismatches = 0
+        max_lag = 0
+
+        first_at = submissions[0].submitted_at
+        span = (submissions[-1].submitted_at - first_at).total_seconds()
+        pace = f'{options["speed"]:g}x' if options['speed'] else 'máxima velocidad'
+        self.stdout.write(
+            f'Replay de {len(submissions)} submissions ({span / 3600:.1f} h de CTF) a {pace}, base: {connection.vendor}'
+        )
+
+        clock = ReplayClock(first_at)
+        timer = QueryTimer()
+        recorder = BroadcastRecorder()
+        original_flush = broadcaster.flush
+
+        def timed_flush():
+            start = time.perf_counter()
+            try:
+                return original_flush()
+            finally:
+                self.flush_times.append(time.perf_counter() - start)
+
+        broadcaster.flush = timed_flush
+        try:
+            with mock.patch('django.utils.timezone.now', clock.now), \
+                    override_settings(SCOREBOARD_EVENTS_INLINE=True, ALLOWED_HOSTS=['testserver']), \
+                    timer.installed(), recorder.installed():
+                started = time.perf_counter()
+                for row in submissions:
+                    if options['speed']:
+                        target = (row.submitted_at - first_at).total_seconds() / options['speed']
+                        ahead = target - (time.perf_counter() - started)
+                        if ahead > 0:
+                            time.sleep(ahead)
+                        else:
+                            max_lag = max(max_lag, -ahead)
+
+                    user = users.get(str(row.submitted_by_id))
+                    if user is None:
+                        outcomes['sin usuario'] += 1
+                        continue
+
+                    clock.current = row.submitted_at
+                    outcome = self.submit(timer, user, row)
+                    outcomes[outcome] += 1
+                    if outcome in ('correct', 'wrong') and (outcome == 'correct') != row.is_correct:
+                        mismatches += 1
+
+                # Publicar lo que quedó pendiente en la ventana del broadcaster
+                broadcaster.flush()
+                elapsed = time.perf_counter() - started
+        finally:
+            del broadcaster.flush
+
+        restore_challenge_state(history)
+        self.report(elapsed, max_lag, outcomes, mismatches, timer, recorder)
+        if options['limit'] is None:
+            self.verify(history)
+
+    def client_for(self, user):
+        """Cliente con la sesión del usuario (se crea una vez, fuera de la medición)"""
+        client = self.clients.get(user.pk)
+        if client is None:
+            client = self.clients[user.pk] = Client()
+            client.force_login(user)
+        return client
+
+    def submit(self, timer, user, row):
+        """Envía una submission por la vista real y registra latencia y queries; retorna el resultado"""
+        client = self.client_for(user)
+        queries_before, db_before = timer.snapshot()
+        start = time.perf_counter()
+        response = client.post(reverse('challenges:submit', args=[row.challenge_id]), {'flag': row.flag_submitted})
+        elapsed = time.perf_counter() - start
+        queries_after, db_after = timer.snapshot()
+
+        stats = self.stats['solve' if row.is_correct else 'fallo']
+        if response.status_code >= 500:
+            stats.error()
+            return f'http_{response.status_code}'
+        stats.ok(elapsed)
+        self.queries.append(queries_after - queries_before)
+        self.db_times.append(db_after - db_before)
+
+        if response.status_code == 200:
+            return 'correct' if response.json().get('success') else 'wrong'
+        return {400: 'already_solved', 403: 'ctf_ended', 404: 'not_found'}.get(
+            response.status_code, f'http_{response.status_code}'
+        )
+
+    def report(self, elapsed, max_lag, outcomes, mismatches, timer, recorder):
+        replayed = sum(outcomes.values())
+        self.stdout.write(
+            f'\n{replayed} submissions en {elapsed:.1f} s ({replayed / elapsed:.1f}/s), '
+            f'atraso máximo respecto del ritmo original: {max_lag:.2f} s'
+        )
+        self.stdout.write(
+            f'{"submit":>7} {"total":>7} {"errores":>8} {"p50 (ms)":>9} {"p95 (ms)":>9} {"p99 (ms)":>9} {"máx (ms)":>9}'
+        )
+        for name, stats in self.stats.items():
+            summary = stats.summary()
+            self.stdout.write(
+                f'{name:>7} {summary["count"]:>7} {summary["errors"]:>8} {summary["p50"]:>9.1f} '
+                f'{summary["p95"]:>9.1f} {summary["p99"]:>9.1f} {summary["max"]:>9.1f}'
+            )
+
+        queries = sorted(self.queries)
+        db_times = sorted(self.db_times)
+        self.stdout.write(
+            f'\nBase por submission: queries p50 {percentile(queries, 0.5)}, p95 {percentile(queries, 0.95)}, '
+            f'máx {queries[-1] if queries else 0}; tiempo p50 {percentile(db_times, 0.5) * 1000:.1f} ms, '
+            f'p95 {percentile(db_times, 0.95) * 1000:.1f} ms; total {timer.seconds:.1f} s en {timer.count} queries'
+        )
+
+        self.stdout.write(f'\n{"grupo":>20} {"broadcasts":>11} {"bytes p50":>10} {"bytes p95":>10} {"bytes máx":>10} {"total KB":>9}')
+        for group, sizes in sorted(recorder.sizes.items()):
+            sizes = sorted(sizes)
+            self.stdout.write(
+                f'{group:>20} {len(sizes):>11} {percentile(sizes, 0.5):>10} {percentile(sizes, 0.95):>10} '
+                f'{sizes[-1]:>10} {sum(sizes) / 1024:>9.0f}'
+            )
+
+        flush_times = sorted(self.flush_times)
+        delays = sorted(recorder.delays)
+        self.stdout.write(
+            f'Armado del display: {len(flush_times)} veces, p50 {percentile(flush_times, 0.5) * 1000:.1f} ms, '
+            f'p95 {percentile(flush_times, 0.95) * 1000:.1f} ms; commit -> broadcast: '
+            f'p50 {percentile(delays, 0.5) * 1000:.0f} ms, p95 {percentile(delays, 0.95) * 1000:.0f} ms, '
+            f'máx {(delays[-1] if delays else 0) * 1000:.0f} ms'
+        )
+
+        self.stdout.write('\nResultados: ' + ', '.join(f'{name}={count}' for name, count in outcomes.most_common()))
+        if mismatches:
+            self.stdout.write(self.style.WARNING(
+                f'{mismatches} submissions con un resultado distinto al original (¿flags modificadas?)'
+            ))
+
+    def verify(self, history):
+        """Compara first bloods y puntajes del replay con los del CTF original"""
+        original_bloods = {str(row.challenge_id): str(row.team_id) for row in history['first_bloods']}
+        replayed_bloods = {
+            str(challenge_id): str(team_id)
+            for challenge_id, team_id in FirstBlood.objects.values_list('challenge_id', 'team_id')
+        }
+        original_scores = {str(row['id']): row['total_score'] for row in history['teams']}
+        replayed_scores = {str(team_id): score for team_id, score in Team.objects.values_list('id', 'total_score')}
+
+        blood_diffs = sum(
+            1 for challenge_id in set(original_bloods) | set(replayed_bloods)
+            if original_bloods.get(challenge_id) != replayed_bloods.get(challenge_id)
+        )
+        score_diffs = sum(1 for team_id, score in original_scores.items() if replayed_scores.get(team_id) != score)
+        solves = Submission.objects.filter(is_correct=True).count()
+        style = self.style.SUCCESS if not blood_diffs and not score_diffs else self.style.WARNING
+        self.stdout.write(style(
+            f'Verificación: {solves} solves, {blood_diffs} first bloods y {score_diffs} puntajes distintos al original'
+        ))
+
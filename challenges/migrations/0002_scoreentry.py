@@ -0,0 +1,74 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+def backfill_ledger(apps, schema_editor):
+    """Crea las entradas del ledger para los solves y first bloods existentes"""
+    Submission = apps.get_model('challenges', 'Submission')
+    FirstBlood = apps.get_model('challenges', 'FirstBlood')
+    ScoreEntry = apps.get_model('challenges', 'ScoreEntry')
+
+    entries = []
+    solved = set()
+    solves = Submission.objects.filter(is_correct=True).select_related('challenge').order_by('submitted_at')
+    for submission in solves:
+        key = (submission.team_id, submission.challenge_id)
+        if key in solved:
+            continue
+        solved.add(key)
+        entries.append(ScoreEntry(
+            team_id=submission.team_id,
+            challenge_id=submission.challenge_id,
+            user_id=submission.submitted_by_id,
+            kind='solve',
+            points=submission.challenge.points,
+            created_at=submission.submitted_at,
+        ))
+
+    for first_blood in FirstBlood.objects.all():
+        entries.append(ScoreEntry(
+            team_id=first_blood.team_id,
+            challenge_id=first_blood.challenge_id,
+            user_id=first_blood.achieved_by_id,
+            kind='first_blood',
+            points=first_blood.bonus_points,
+            created_at=first_blood.achieved_at,
+        ))
+
+    ScoreEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0002_team_invite_code'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('challenges', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreEntry',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('solve', 'Solve'), ('first_blood', 'First Blood')], max_length=20, verbose_name='Tipo')),
+                ('points', models.IntegerField(verbose_name='Puntos')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha')),
+                ('challenge', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_entries', to='challenges.challenge', verbose_name='Challenge')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_entries', to='teams.team', verbose_name='Equipo')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='score_entries', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Entrada de puntaje',
+                'verbose_name_plural': 'Entradas de puntaje',
+                'ordering': ['created_at'],
+                'unique_together': {('team', 'challenge', 'kind')},
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:07
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def backfill_counters(apps, schema_editor):
+    """Calcula los contadores de challenges y equipos para los datos existentes"""
+    Challenge = apps.get_model('challenges', 'Challenge')
+    Submission = apps.get_model('challenges', 'Submission')
+    FirstBlood = apps.get_model('challenges', 'FirstBlood')
+    Team = apps.get_model('teams', 'Team')
+
+    solves = Submission.objects.filter(is_correct=True)
+
+    for row in solves.values('challenge_id').annotate(total=Count('team_id', distinct=True)):
+        Challenge.objects.filter(pk=row['challenge_id']).update(solve_count=row['total'])
+
+    for row in solves.values('team_id').annotate(solved=Count('challenge_id', distinct=True), last=Max('submitted_at')):
+        Team.objects.filter(pk=row['team_id']).update(solved_count=row['solved'], last_solve_at=row['last'])
+
+    for row in FirstBlood.objects.values('team_id').annotate(total=Count('id')):
+        Team.objects.filter(pk=row['team_id']).update(first_blood_count=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0003_team_counters'),
+        ('challenges', '0002_scoreentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='challenge',
+            name='solve_count',
+            field=models.IntegerField(default=0, verbose_name='Solves'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+
+def remove_duplicate_solves(apps, schema_editor):
+    """Deja solo el primer solve correcto de cada equipo por challenge (el ledger ya contaba uno)"""
+    Submission = apps.get_model('challenges', 'Submission')
+
+    seen = set()
+    duplicates = []
+    solves = Submission.objects.filter(is_correct=True).order_by('submitted_at').values_list(
+        'id', 'team_id', 'challenge_id'
+    )
+    for submission_id, team_id, challenge_id in solves:
+        key = (team_id, challenge_id)
+        if key in seen:
+            duplicates.append(submission_id)
+        else:
+            seen.add(key)
+
+    Submission.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('challenges', '0003_challenge_solve_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_solves, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='submission',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_correct', True)), fields=('team', 'challenge'), name='unique_correct_submission'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0003_team_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('challenges', '0004_unique_correct_submission'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='submission',
+            name='challenge',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='challenges.challenge', verbose_name='Challenge'),
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='submitted_by',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submissions', to=settings.AUTH_USER_MODEL, verbose_name='Enviado por'),
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='team',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='teams.team', verbose_name='Equipo'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['team', '-submitted_at'], name='submission_team_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['challenge', '-submitted_at'], name='submission_chall_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['submitted_by', '-submitted_at'], name='submission_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['-submitted_at'], name='submission_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(condition=models.Q(('is_correct', True)), fields=['challenge', 'submitted_at'], name='submission_chall_solves_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(condition=models.Q(('is_correct', True)), fields=['submitted_by'], name='submission_user_solves_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(condition=models.Q(('is_correct', True)), fields=['-submitted_at'], name='submission_solves_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q
+
+
+def backfill_stats(apps, schema_editor):
+    """Calcula las estadísticas de equipos y jugadores para los datos existentes"""
+    Submission = apps.get_model('challenges', 'Submission')
+    ScoreEntry = apps.get_model('challenges', 'ScoreEntry')
+    TeamStats = apps.get_model('challenges', 'TeamStats')
+    UserStats = apps.get_model('challenges', 'UserStats')
+
+    teams = {}
+    for row in Submission.objects.order_by().values('team_id').annotate(
+        solved=Count('challenge_id', filter=Q(is_correct=True), distinct=True),
+        failed=Count('id', filter=Q(is_correct=False)),
+        categories=Count('challenge__category_id', filter=Q(is_correct=True), distinct=True),
+    ):
+        teams[row['team_id']] = TeamStats(
+            team_id=row['team_id'], solved_count=row['solved'], failed_count=row['failed'],
+            solved_category_count=row['categories'],
+        )
+
+    solve_times = {}
+    for team_id, submitted_at in Submission.objects.filter(is_correct=True).order_by(
+        'team_id', 'submitted_at'
+    ).values_list('team_id', 'submitted_at'):
+        solve_times.setdefault(team_id, []).append(submitted_at)
+    for team_id, times in solve_times.items():
+        teams[team_id].first_solve_at = times[0]
+        teams[team_id].third_solve_at = times[2] if len(times) >= 3 else None
+
+    # Por jugador, a partir de sus intentos en cada challenge
+    users = {}
+    for row in Submission.objects.filter(submitted_by__isnull=False).order_by().values(
+        'submitted_by_id', 'challenge_id'
+    ).annotate(
+        failed=Count('id', filter=Q(is_correct=False)),
+        solved=Count('id', filter=Q(is_correct=True)),
+    ):
+        stats = users.setdefault(row['submitted_by_id'], UserStats(user_id=row['submitted_by_id']))
+        stats.failed_count += row['failed']
+        if row['solved']:
+            stats.solved_count += 1
+            stats.first_try_solve_count += 0 if row['failed'] else 1
+            stats.max_failures_before_solve = max(stats.max_failures_before_solve, row['failed'])
+
+    for row in ScoreEntry.objects.filter(user__isnull=False, kind='first_blood').order_by().values(
+        'user_id'
+    ).annotate(total=Count('id')):
+        users.setdefault(row['user_id'], UserStats(user_id=row['user_id'])).first_blood_count = row['total']
+
+    TeamStats.objects.bulk_create(teams.values(), batch_size=1000)
+    UserStats.objects.bulk_create(users.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0003_team_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('challenges', '0005_submission_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamStats',
+            fields=[
+                ('team', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='teams.team', verbose_name='Equipo')),
+                ('solved_count', models.IntegerField(default=0, verbose_name='Solves')),
+                ('failed_count', models.IntegerField(default=0, verbose_name='Intentos fallidos')),
+                ('solved_category_count', models.IntegerField(default=0, verbose_name='Categorías con solves')),
+                ('first_solve_at', models.DateTimeField(blank=True, null=True, verbose_name='Primer solve')),
+                ('third_solve_at', models.DateTimeField(blank=True, null=True, verbose_name='Tercer solve')),
+            ],
+            options={
+                'verbose_name': 'Estadísticas de equipo',
+                'verbose_name_plural': 'Estadísticas de equipos',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('solved_count', models.IntegerField(default=0, verbose_name='Solves')),
+                ('failed_count', models.IntegerField(default=0, verbose_name='Intentos fallidos')),
+                ('first_blood_count', models.IntegerField(default=0, verbose_name='First bloods')),
+                ('first_try_solve_count', models.IntegerField(default=0, verbose_name='Solves al primer intento')),
+                ('max_failures_before_solve', models.IntegerField(default=0, verbose_name='Máximo de fallos antes de un solve')),
+            ],
+            options={
+                'verbose_name': 'Estadísticas de jugador',
+                'verbose_name_plural': 'Estadísticas de jugadores',
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
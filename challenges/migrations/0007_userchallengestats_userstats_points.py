@@ -0,0 +1,80 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Max, Q, Sum
+
+
+def backfill_stats(apps, schema_editor):
+    """Calcula los puntos y el último solve de cada jugador y sus intentos por challenge"""
+    Submission = apps.get_model('challenges', 'Submission')
+    ScoreEntry = apps.get_model('challenges', 'ScoreEntry')
+    UserStats = apps.get_model('challenges', 'UserStats')
+    UserChallengeStats = apps.get_model('challenges', 'UserChallengeStats')
+
+    pairs = []
+    last_solves = {}
+    for row in Submission.objects.filter(submitted_by__isnull=False).order_by().values(
+        'submitted_by_id', 'challenge_id'
+    ).annotate(
+        failed=Count('id', filter=Q(is_correct=False)),
+        solved_at=Max('submitted_at', filter=Q(is_correct=True)),
+    ):
+        user_id = row['submitted_by_id']
+        pairs.append(UserChallengeStats(
+            user_id=user_id, challenge_id=row['challenge_id'], failed_count=row['failed'], solved_at=row['solved_at'],
+        ))
+        if row['solved_at'] and (user_id not in last_solves or row['solved_at'] > last_solves[user_id]):
+            last_solves[user_id] = row['solved_at']
+    UserChallengeStats.objects.bulk_create(pairs, batch_size=1000)
+
+    points = dict(ScoreEntry.objects.filter(user__isnull=False).order_by().values('user_id').annotate(
+        total=Sum('points')
+    ).values_list('user_id', 'total'))
+    stats = {row.user_id: row for row in UserStats.objects.filter(user_id__in=points.keys() | last_solves.keys())}
+    for user_id in points.keys() | last_solves.keys():
+        # La fila existe si el jugador tiene intentos (ver 0006); se crea si falta
+        row = stats.setdefault(user_id, UserStats(user_id=user_id))
+        row.points = points.get(user_id) or 0
+        row.last_solve_at = last_solves.get(user_id)
+    missing = [row for row in stats.values() if row._state.adding]
+    UserStats.objects.bulk_update([row for row in stats.values() if not row._state.adding],
+                                  ['points', 'last_solve_at'], batch_size=1000)
+    UserStats.objects.bulk_create(missing, batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('challenges', '0006_teamstats_userstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='last_solve_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Último solve'),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='points',
+            field=models.IntegerField(default=0, verbose_name='Puntos'),
+        ),
+        migrations.CreateModel(
+            name='UserChallengeStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('failed_count', models.IntegerField(default=0, verbose_name='Intentos fallidos')),
+                ('solved_at', models.DateTimeField(blank=True, null=True, verbose_name='Resuelto')),
+                ('challenge', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_stats', to='challenges.challenge', verbose_name='Challenge')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='challenge_stats', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Estadísticas de jugador por challenge',
+                'verbose_name_plural': 'Estadísticas de jugadores por challenge',
+                'unique_together': {('user', 'challenge')},
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -30,6 +30,8 @@ class Challenge(models.Model):
     hints = models.TextField(blank=True, verbose_name="Pistas")
     is_active = models.BooleanField(default=True, verbose_name="Activo")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+    # Equipos que lo resolvieron, mantenido en la transacción del solve
+    solve_count = models.IntegerField(default=0, verbose_name="Solves")
     
     class Meta:
         verbose_name = "Challenge"
@@ -41,22 +43,50 @@ class Challenge(models.Model):
     
     def get_solve_count(self):
         """Retorna el número de equipos que han resuelto este challenge"""
-        return Submission.objects.filter(challenge=self, is_correct=True).values('team').distinct().count()
+        return self.solve_count
 
 class Submission(models.Model):
     """Modelo para los intentos de resolver challenges"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='submissions', verbose_name="Equipo")
-    challenge = models.ForeignKey(Challenge, on_delete=models.CASCADE, related_name='submissions', verbose_name="Challenge")
+    # Los FK no llevan índice propio: los índices compuestos de Meta empiezan por ellos
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='submissions', verbose_name="Equipo", db_index=False)
+    challenge = models.ForeignKey(Challenge, on_delete=models.CASCADE, related_name='submissions', verbose_name="Challenge", db_index=False)
     flag_submitted = models.CharField(max_length=200, verbose_name="Flag enviada")
     is_correct = models.BooleanField(default=False, verbose_name="¿Es correcta?")
     submitted_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de envío")
-    submitted_by = models.ForeignKey('users.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='submissions', verbose_name="Enviado por")
+    submitted_by = models.ForeignKey('users.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='submissions', verbose_name="Enviado por", db_index=False)
     
     class Meta:
         verbose_name = "Submission"
         verbose_name_plural = "Submissions"
         ordering = ['-submitted_at']
+        constraints = [
+            # Un solo solve correcto por equipo y challenge (los intentos incorrectos no se limitan)
+            models.UniqueConstraint(
+                fields=['team', 'challenge'],
+                condition=models.Q(is_correct=True),
+                name='unique_correct_submission',
+            ),
+        ]
+        # Índices de las consultas frecuentes (ver SubmissionQueryPlanTests). Los solves
+        # (is_correct=True) usan índices parciales: el filtro se compila como "is_correct"
+        # a secas y no sirve como columna de un índice compuesto. Los de (equipo, challenge)
+        # y (equipo) sobre solves los cubre unique_correct_submission
+        indexes = [
+            # Historial de intentos por equipo, challenge y usuario, más reciente primero
+            models.Index(fields=['team', '-submitted_at'], name='submission_team_recent_idx'),
+            models.Index(fields=['challenge', '-submitted_at'], name='submission_chall_recent_idx'),
+            models.Index(fields=['submitted_by', '-submitted_at'], name='submission_user_recent_idx'),
+            # Últimos intentos (inicio y panel de admin)
+            models.Index(fields=['-submitted_at'], name='submission_recent_idx'),
+            # Solves por challenge, por usuario y feed de solves recientes
+            models.Index(fields=['challenge', 'submitted_at'], condition=models.Q(is_correct=True),
+                         name='submission_chall_solves_idx'),
+            models.Index(fields=['submitted_by'], condition=models.Q(is_correct=True),
+                         name='submission_user_solves_idx'),
+            models.Index(fields=['-submitted_at'], condition=models.Q(is_correct=True),
+                         name='submission_solves_recent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.team.name} - {self.challenge.title} ({'✓' if self.is_correct else '✗'})"
@@ -77,3 +107,77 @@ class FirstBlood(models.Model):
     
     def __str__(self):
         return f"🩸 {self.team.name} - {self.challenge.title}"
+
+class ScoreEntry(models.Model):
+    """Ledger de puntajes: cada solve o first blood registra los puntos otorgados al equipo"""
+    KIND_CHOICES = [
+        ('solve', 'Solve'),
+        ('first_blood', 'First Blood'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='score_entries', verbose_name="Equipo")
+    challenge = models.ForeignKey(Challenge, on_delete=models.CASCADE, related_name='score_entries', verbose_name="Challenge")
+    user = models.ForeignKey('users.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='score_entries', verbose_name="Usuario")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="Tipo")
+    points = models.IntegerField(verbose_name="Puntos")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Fecha")
+    
+    class Meta:
+        verbose_name = "Entrada de puntaje"
+        verbose_name_plural = "Entradas de puntaje"
+        ordering = ['created_at']
+        unique_together = [['team', 'challenge', 'kind']]
+    
+    def __str__(self):
+        return f"{self.team.name} +{self.points} ({self.get_kind_display()} - {self.challenge.title})"
+
+class TeamStats(models.Model):
+    """Contadores de un equipo mantenidos en cada submission (ver challenges.stats)"""
+    team = models.OneToOneField(Team, on_delete=models.CASCADE, primary_key=True, related_name='stats', verbose_name="Equipo")
+    solved_count = models.IntegerField(default=0, verbose_name="Solves")
+    failed_count = models.IntegerField(default=0, verbose_name="Intentos fallidos")
+    solved_category_count = models.IntegerField(default=0, verbose_name="Categorías con solves")
+    first_solve_at = models.DateTimeField(null=True, blank=True, verbose_name="Primer solve")
+    third_solve_at = models.DateTimeField(null=True, blank=True, verbose_name="Tercer solve")
+    
+    class Meta:
+        verbose_name = "Estadísticas de equipo"
+        verbose_name_plural = "Estadísticas de equipos"
+    
+    def __str__(self):
+        return f"{self.team_id}: {self.solved_count} solves, {self.failed_count} fallos"
+
+class UserStats(models.Model):
+    """Contadores de un jugador mantenidos en cada submission (ver challenges.stats)"""
+    user = models.OneToOneField('users.User', on_delete=models.CASCADE, primary_key=True, related_name='stats', verbose_name="Usuario")
+    solved_count = models.IntegerField(default=0, verbose_name="Solves")
+    failed_count = models.IntegerField(default=0, verbose_name="Intentos fallidos")
+    first_blood_count = models.IntegerField(default=0, verbose_name="First bloods")
+    first_try_solve_count = models.IntegerField(default=0, verbose_name="Solves al primer intento")
+    max_failures_before_solve = models.IntegerField(default=0, verbose_name="Máximo de fallos antes de un solve")
+    # Puntos del ledger (solves y first bloods) a nombre del jugador
+    points = models.IntegerField(default=0, verbose_name="Puntos")
+    last_solve_at = models.DateTimeField(null=True, blank=True, verbose_name="Último solve")
+    
+    class Meta:
+        verbose_name = "Estadísticas de jugador"
+        verbose_name_plural = "Estadísticas de jugadores"
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.solved_count} solves, {self.failed_count} fallos"
+
+class UserChallengeStats(models.Model):
+    """Intentos de un jugador en un challenge, mantenidos en cada submission (ver challenges.stats)"""
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='challenge_stats', verbose_name="Usuario")
+    challenge = models.ForeignKey(Challenge, on_delete=models.CASCADE, related_name='user_stats', verbose_name="Challenge")
+    failed_count = models.IntegerField(default=0, verbose_name="Intentos fallidos")
+    solved_at = models.DateTimeField(null=True, blank=True, verbose_name="Resuelto")
+    
+    class Meta:
+        verbose_name = "Estadísticas de jugador por challenge"
+        verbose_name_plural = "Estadísticas de jugadores por challenge"
+        unique_together = [['user', 'challenge']]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.challenge_id}: {self.failed_count} fallos"
@@ -0,0 +1,293 @@
+"""
+Ledger de puntajes de equipos.
+
+Cada solve y cada first blood agregan una entrada a ``ScoreEntry`` y aplican un
+delta atómico (``F()``) sobre ``Team.total_score`` dentro de la misma transacción.
+La reconciliación contra ``Submission``/``FirstBlood`` queda como herramienta de
+auditoría (ver ``reconcile_scores`` y el comando ``recalculate_scores``).
+
+En la misma transacción se mantienen los contadores desnormalizados
+(``Challenge.solve_count``, ``Team.solved_count``, ``Team.first_blood_count`` y
+``Team.last_solve_at``) y las estadísticas de ``challenges.stats``;
+``rebuild_counters`` los recalcula desde los datos crudos.
+"""
+from collections import defaultdict
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Sum
+from ctf_platform.tracing import span
+from teams.models import Team
+from .models import Challenge, Submission, FirstBlood, ScoreEntry
+from .stats import rebuild_stats, record_failure, record_solve_stats
+
+
+def claim_first_blood(submission, bonus_points):
+    """
+    Intenta registrar el first blood del challenge para el equipo del solve
+    (insert-or-ignore sobre la constraint única por challenge). Retorna el
+    FirstBlood creado, o None si otro equipo ya lo tenía.
+    """
+    try:
+        with transaction.atomic():
+            return FirstBlood.objects.create(
+                team_id=submission.team_id,
+                challenge_id=submission.challenge_id,
+                achieved_by_id=submission.submitted_by_id,
+                bonus_points=bonus_points,
+            )
+    except IntegrityError:
+        return None
+
+
+def record_solve(submission, first_blood=None):
+    """
+    Registra en el ledger los puntos de un solve (y de su first blood si existe)
+    y suma el total y los contadores al equipo y al challenge con UPDATEs atómicos.
+    Retorna los puntos otorgados.
+    """
+    challenge = submission.challenge
+    entries = [
+        ScoreEntry(
+            team_id=submission.team_id,
+            challenge=challenge,
+            user_id=submission.submitted_by_id,
+            kind='solve',
+            points=challenge.points,
+            created_at=submission.submitted_at,
+        )
+    ]
+
+    if first_blood:
+        entries.append(ScoreEntry(
+            team_id=first_blood.team_id,
+            challenge=challenge,
+            user_id=first_blood.achieved_by_id,
+            kind='first_blood',
+            points=first_blood.bonus_points,
+            created_at=first_blood.achieved_at,
+        ))
+
+    points = sum(entry.points for entry in entries)
+
+    with transaction.atomic():
+        ScoreEntry.objects.bulk_create(entries)
+        Team.objects.filter(pk=submission.team_id).update(
+            total_score=F('total_score') + points,
+            solved_count=F('solved_count') + 1,
+            first_blood_count=F('first_blood_count') + (1 if first_blood else 0),
+            last_solve_at=submission.submitted_at,
+        )
+        Challenge.objects.filter(pk=challenge.pk).update(solve_count=F('solve_count') + 1)
+
+    return points
+
+
+def commit_submission(team, challenge, user, flag, is_correct, first_blood_points):
+    """
+    Registra un intento en una sola transacción: la submission y, si es correcta,
+    el first blood, las entradas del ledger y el evento para el worker.
+    Las carreras entre solves simultáneos las resuelven las constraints de la base:
+    un solo solve correcto por equipo y challenge, un solo first blood por challenge.
+    Retorna ``(submission, is_first_blood)``; ``submission`` es None si otro miembro
+    del equipo resolvió el challenge en paralelo.
+    """
+    from scoreboard.events import publish_failure, publish_solve, team_rank
+
+    with transaction.atomic():
+        try:
+            with span('insert'), transaction.atomic():
+                submission = Submission.objects.create(
+                    team=team,
+                    challenge=challenge,
+                    flag_submitted=flag,
+                    is_correct=is_correct,
+                    submitted_by=user,
+                )
+        except IntegrityError:
+            return None, False
+
+        is_first_blood = False
+        if not is_correct:
+            with span('stats'):
+                record_failure(submission)
+            publish_failure(submission)
+        else:
+            with span('first_blood'):
+                first_blood = claim_first_blood(submission, first_blood_points)
+            is_first_blood = first_blood is not None
+
+            # Sumar los puntos al equipo de forma incremental
+            with span('score_update'):
+                points = record_solve(submission, first_blood)
+
+            # Contadores por equipo y jugador que leen los logros (ver challenges.stats)
+            with span('stats'):
+                record_solve_stats(submission, first_blood)
+
+            # Posición antes y después del solve, leída en la transacción: cuando el
+            # worker procesa el evento otros solves ya pueden haber movido el ranking
+            with span('rank'):
+                score = Team.objects.values_list('total_score', flat=True).get(pk=team.pk)
+                ranks = (team_rank(team, score - points), team_rank(team, score))
+
+            # Logros, ranking y broadcast se procesan en el worker tras el commit
+            publish_solve(submission, is_first_blood, points, ranks)
+
+    return submission, is_first_blood
+
+
+def _sum_by_team(queryset, field):
+    """Suma un campo agrupando por equipo"""
+    return {
+        row['team_id']: row['total'] or 0
+        for row in queryset.values('team_id').annotate(total=Sum(field))
+    }
+
+
+def expected_scores():
+    """
+    Calcula el puntaje esperado de cada equipo a partir de Submission y FirstBlood.
+    Cada challenge cuenta una sola vez por equipo aunque existan submissions duplicadas.
+    """
+    expected = defaultdict(int)
+
+    solves = Submission.objects.filter(is_correct=True).values_list(
+        'team_id', 'challenge_id', 'challenge__points'
+    ).order_by().distinct()
+    for team_id, challenge_id, points in solves:
+        expected[team_id] += points
+
+    for team_id, total in _sum_by_team(FirstBlood.objects.all(), 'bonus_points').items():
+        expected[team_id] += total
+
+    return expected
+
+
+def reconcile_scores(fix=False):
+    """
+    Compara el puntaje guardado, el ledger y los datos crudos de cada equipo.
+    Retorna una lista con los equipos inconsistentes. Con ``fix=True`` reconstruye
+    el ledger de esos equipos y corrige ``total_score``.
+    """
+    expected = expected_scores()
+    ledger = _sum_by_team(ScoreEntry.objects.all(), 'points')
+
+    discrepancies = []
+    for team in Team.objects.only('id', 'name', 'total_score'):
+        expected_score = expected.get(team.id, 0)
+        ledger_score = ledger.get(team.id, 0)
+        if team.total_score == ledger_score == expected_score:
+            continue
+
+        discrepancies.append({
+            'team': team,
+            'stored': team.total_score,
+            'ledger': ledger_score,
+            'expected': expected_score,
+        })
+
+        if fix:
+            rebuild_ledger(team)
+
+    return discrepancies
+
+
+@transaction.atomic
+def rebuild_ledger(team):
+    """Reconstruye el ledger de un equipo desde Submission/FirstBlood y fija su puntaje"""
+    ScoreEntry.objects.filter(team=team).delete()
+
+    entries = []
+    solved = set()
+    solves = Submission.objects.filter(team=team, is_correct=True).select_related(
+        'challenge'
+    ).order_by('submitted_at')
+
+    for submission in solves:
+        if submission.challenge_id in solved:
+            continue
+        solved.add(submission.challenge_id)
+        entries.append(ScoreEntry(
+            team=team,
+            challenge_id=submission.challenge_id,
+            user_id=submission.submitted_by_id,
+            kind='solve',
+            points=submission.challenge.points,
+            created_at=submission.submitted_at,
+        ))
+
+    for first_blood in FirstBlood.objects.filter(team=team):
+        entries.append(ScoreEntry(
+            team=team,
+            challenge_id=first_blood.challenge_id,
+            user_id=first_blood.achieved_by_id,
+            kind='first_blood',
+            points=first_blood.bonus_points,
+            created_at=first_blood.achieved_at,
+        ))
+
+    ScoreEntry.objects.bulk_create(entries)
+
+    total = sum(entry.points for entry in entries)
+    Team.objects.filter(pk=team.pk).update(total_score=total)
+    team.total_score = total
+
+    # El UPDATE no dispara señales: invalidar el snapshot del scoreboard explícitamente
+    from scoreboard.snapshot import invalidate_snapshot
+    transaction.on_commit(invalidate_snapshot)
+    return total
+
+
+def expected_counters():
+    """Contadores de challenges y equipos calculados desde Submission/FirstBlood"""
+    solves = Submission.objects.filter(is_correct=True)
+
+    challenge_counts = dict(
+        solves.values('challenge_id').annotate(total=Count('team_id', distinct=True)).values_list('challenge_id', 'total')
+    )
+    team_rows = {
+        row['team_id']: row
+        for row in solves.values('team_id').annotate(
+            solved=Count('challenge_id', distinct=True), last=Max('submitted_at')
+        )
+    }
+    first_blood_counts = dict(
+        FirstBlood.objects.values('team_id').annotate(total=Count('id')).values_list('team_id', 'total')
+    )
+    return challenge_counts, team_rows, first_blood_counts
+
+
+@transaction.atomic
+def rebuild_counters(fix=True):
+    """
+    Recalcula los contadores desnormalizados desde los datos crudos.
+    Retorna los objetos (challenges, equipos y filas de estadísticas) cuyos
+    contadores no coincidían; con ``fix=True`` los corrige.
+    """
+    challenge_counts, team_rows, first_blood_counts = expected_counters()
+
+    challenges = []
+    for challenge in Challenge.objects.only('id', 'title', 'solve_count'):
+        expected = challenge_counts.get(challenge.id, 0)
+        if challenge.solve_count != expected:
+            challenge.solve_count = expected
+            challenges.append(challenge)
+
+    teams = []
+    for team in Team.objects.only('id', 'name', 'solved_count', 'first_blood_count', 'last_solve_at'):
+        row = team_rows.get(team.id, {})
+        expected = (row.get('solved', 0), first_blood_counts.get(team.id, 0), row.get('last'))
+        if (team.solved_count, team.first_blood_count, team.last_solve_at) != expected:
+            team.solved_count, team.first_blood_count, team.last_solve_at = expected
+            teams.append(team)
+
+    if fix:
+        Challenge.objects.bulk_update(challenges, ['solve_count'], batch_size=500)
+        Team.objects.bulk_update(teams, ['solved_count', 'first_blood_count', 'last_solve_at'], batch_size=500)
+        if challenges or teams:
+            # bulk_update no dispara señales: invalidar snapshot y tableros explícitamente
+            from scoreboard.snapshot import invalidate_snapshot
+            from .board import invalidate_board
+            transaction.on_commit(invalidate_snapshot)
+            transaction.on_commit(invalidate_board)
+
+    return challenges + teams + rebuild_stats(fix=fix)
@@ -0,0 +1,18 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Category, Challenge, Submission
+from .board import invalidate_board, invalidate_team_board
+
+@receiver(post_save, sender=Submission)
+def submission_saved(sender, instance, created, **kwargs):
+    """Un solve invalida solo el tablero del equipo que lo resolvió"""
+    if instance.is_correct:
+        team_id = instance.team_id
+        transaction.on_commit(lambda: invalidate_team_board(team_id))
+
+@receiver([post_save, post_delete], sender=Challenge)
+@receiver([post_save, post_delete], sender=Category)
+def board_changed(sender, **kwargs):
+    """Editar challenges o categorías invalida el tablero de todos los equipos"""
+    transaction.on_commit(invalidate_board)
@@ -0,0 +1,186 @@
+"""
+Estadísticas incrementales por equipo, por jugador y por (jugador, challenge).
+
+``commit_submission`` las actualiza en la misma transacción que la submission con
+UPDATEs atómicos (``F()``), de modo que los logros y las vistas leen contadores por
+primary key en vez de recorrer el historial de ``Submission``. Las filas se crean
+al primer intento del equipo o jugador.
+
+``rebuild_stats`` las recalcula desde los datos crudos; la llama
+``rebuild_counters`` (cargas masivas y el comando ``rebuild_counters --check``).
+"""
+from collections import defaultdict
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DateTimeField, F, Max, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from .models import Submission, ScoreEntry, TeamStats, UserStats, UserChallengeStats
+
+TEAM_STATS_FIELDS = ('solved_count', 'failed_count', 'solved_category_count', 'first_solve_at', 'third_solve_at')
+USER_STATS_FIELDS = ('solved_count', 'failed_count', 'first_blood_count', 'first_try_solve_count',
+                     'max_failures_before_solve', 'points', 'last_solve_at')
+USER_CHALLENGE_STATS_FIELDS = ('failed_count', 'solved_at')
+
+# (modelo, campos que identifican la fila, campos de contadores)
+STATS_MODELS = (
+    (TeamStats, ('team_id',), TEAM_STATS_FIELDS),
+    (UserStats, ('user_id',), USER_STATS_FIELDS),
+    (UserChallengeStats, ('user_id', 'challenge_id'), USER_CHALLENGE_STATS_FIELDS),
+)
+
+
+def _bump(model, key, **updates):
+    """Aplica el UPDATE sobre la fila de ``key`` (lookup por campos únicos); la crea si no existe"""
+    if model.objects.filter(**key).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key)
+    except IntegrityError:
+        # Otra transacción la creó en paralelo
+        pass
+    model.objects.filter(**key).update(**updates)
+
+
+def record_failure(submission):
+    """Cuenta un intento fallido para el equipo, el jugador y el par (jugador, challenge)"""
+    _bump(TeamStats, {'pk': submission.team_id}, failed_count=F('failed_count') + 1)
+    if submission.submitted_by_id:
+        _bump(UserStats, {'pk': submission.submitted_by_id}, failed_count=F('failed_count') + 1)
+        _bump(UserChallengeStats, {'user_id': submission.submitted_by_id, 'challenge_id': submission.challenge_id},
+              failed_count=F('failed_count') + 1)
+
+
+def record_solve_stats(submission, first_blood=None):
+    """
+    Cuenta un solve: categorías nuevas y primeros solves del equipo; first-try,
+    first blood, puntos y fallos previos del jugador en el challenge
+    """
+    challenge = submission.challenge
+    at = Value(submission.submitted_at, output_field=DateTimeField())
+
+    new_category = not Submission.objects.filter(
+        team_id=submission.team_id, is_correct=True, challenge__category_id=challenge.category_id
+    ).exclude(pk=submission.pk).exists()
+
+    # Los UPDATE leen los valores previos de la fila: solved_count=2 es el tercer solve
+    _bump(
+        TeamStats, {'pk': submission.team_id},
+        solved_count=F('solved_count') + 1,
+        solved_category_count=F('solved_category_count') + (1 if new_category else 0),
+        first_solve_at=Coalesce(F('first_solve_at'), at),
+        third_solve_at=Case(When(solved_count=2, then=at), default=F('third_solve_at')),
+    )
+
+    if not submission.submitted_by_id:
+        return
+
+    key = {'user_id': submission.submitted_by_id, 'challenge_id': challenge.pk}
+    failures = UserChallengeStats.objects.filter(**key).values_list('failed_count', flat=True).first() or 0
+    _bump(UserChallengeStats, key, solved_at=submission.submitted_at)
+
+    # Mismos puntos que las entradas del ledger a nombre del jugador (ver record_solve)
+    points = challenge.points + (first_blood.bonus_points if first_blood else 0)
+    _bump(
+        UserStats, {'pk': submission.submitted_by_id},
+        solved_count=F('solved_count') + 1,
+        first_blood_count=F('first_blood_count') + (1 if first_blood else 0),
+        first_try_solve_count=F('first_try_solve_count') + (0 if failures else 1),
+        max_failures_before_solve=Greatest(F('max_failures_before_solve'), Value(failures)),
+        points=F('points') + points,
+        last_solve_at=submission.submitted_at,
+    )
+
+
+def expected_stats():
+    """
+    Estadísticas calculadas desde Submission y el ledger (sin guardar): por modelo,
+    ``{clave: {campo: valor}}`` con la clave según ``STATS_MODELS``
+    """
+    teams = defaultdict(dict)
+    users = defaultdict(dict)
+    pairs = {}
+
+    team_rows = Submission.objects.values('team_id').annotate(
+        solved=Count('challenge_id', filter=Q(is_correct=True), distinct=True),
+        failed=Count('id', filter=Q(is_correct=False)),
+        categories=Count('challenge__category_id', filter=Q(is_correct=True), distinct=True),
+    )
+    for row in team_rows:
+        teams[(row['team_id'],)].update(
+            solved_count=row['solved'], failed_count=row['failed'], solved_category_count=row['categories'],
+        )
+
+    solve_times = defaultdict(list)
+    for team_id, submitted_at in Submission.objects.filter(is_correct=True).order_by(
+        'team_id', 'submitted_at'
+    ).values_list('team_id', 'submitted_at'):
+        solve_times[team_id].append(submitted_at)
+    for team_id, times in solve_times.items():
+        teams[(team_id,)].update(first_solve_at=times[0], third_solve_at=times[2] if len(times) >= 3 else None)
+
+    # Por (jugador, challenge): los fallos cuentan como previos al solve (tras el solve no se aceptan más)
+    pair_rows = Submission.objects.filter(submitted_by__isnull=False).values('submitted_by_id', 'challenge_id').annotate(
+        failed=Count('id', filter=Q(is_correct=False)),
+        solved_at=Max('submitted_at', filter=Q(is_correct=True)),
+    )
+    for row in pair_rows:
+        user_id = row['submitted_by_id']
+        pairs[user_id, row['challenge_id']] = {'failed_count': row['failed'], 'solved_at': row['solved_at']}
+        stats = users[(user_id,)]
+        stats['failed_count'] = stats.get('failed_count', 0) + row['failed']
+        if row['solved_at']:
+            stats['solved_count'] = stats.get('solved_count', 0) + 1
+            if not row['failed']:
+                stats['first_try_solve_count'] = stats.get('first_try_solve_count', 0) + 1
+            stats['max_failures_before_solve'] = max(stats.get('max_failures_before_solve', 0), row['failed'])
+            stats['last_solve_at'] = max(stats.get('last_solve_at') or row['solved_at'], row['solved_at'])
+
+    ledger = ScoreEntry.objects.filter(user__isnull=False).values('user_id').annotate(
+        total=Sum('points'), first_bloods=Count('id', filter=Q(kind='first_blood')),
+    )
+    for row in ledger:
+        users[(row['user_id'],)].update(points=row['total'], first_blood_count=row['first_bloods'])
+
+    return {TeamStats: teams, UserStats: users, UserChallengeStats: pairs}
+
+
+def _diff(model, key_fields, fields, expected):
+    """
+    Filas guardadas que no coinciden con lo esperado y filas faltantes. Se comparan
+    tuplas y solo se instancian las filas a escribir.
+    """
+    defaults = tuple(model._meta.get_field(field).get_default() for field in fields)
+    stored = {}
+    for row in model.objects.values_list('pk', *key_fields, *fields).iterator(chunk_size=2000):
+        stored[row[1:1 + len(key_fields)]] = (row[0], row[1 + len(key_fields):])
+
+    stale, missing = [], []
+    for key in stored.keys() | expected.keys():
+        values = expected.get(key, {})
+        values = tuple(values.get(field, default) for field, default in zip(fields, defaults))
+        pk, current = stored.get(key, (None, None))
+        if current == values or (current is None and not any(values)):
+            continue
+        row = model(**dict(zip(key_fields, key)), **dict(zip(fields, values)))
+        if current is None:
+            missing.append(row)
+        else:
+            row.pk = pk
+            stale.append(row)
+    return stale, missing
+
+
+def rebuild_stats(fix=True):
+    """
+    Compara las estadísticas guardadas con las calculadas desde los datos crudos.
+    Retorna las filas inconsistentes o faltantes; con ``fix=True`` las corrige.
+    """
+    expected = expected_stats()
+    result = []
+    for model, key_fields, fields in STATS_MODELS:
+        stale, missing = _diff(model, key_fields, fields, expected[model])
+        if fix:
+            model.objects.bulk_update(stale, fields, batch_size=500)
+            model.objects.bulk_create(missing, batch_size=500)
+        result.extend(stale + missing)
+    return result
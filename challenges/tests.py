@@ -1,2 +1,552 @@
-# Archivo de inicialización de la app challenges
-default_app_config = 'challenges.apps.ChallengesConfig'
+import os
+import re
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from io import StringIO
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from teams.models import Team
+from scoreboard.models import Achievement, CTFConfig
+from .models import Category, Challenge, Submission, FirstBlood, ScoreEntry, TeamStats, UserStats, UserChallengeStats
+from .scoring import claim_first_blood, expected_scores, reconcile_scores, rebuild_counters
+from .board import get_board
+
+User = get_user_model()
+
+IN_MEMORY_CHANNEL_LAYERS = {
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'},
+}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ScoreLedgerTests(TestCase):
+    """Tests del ledger incremental de puntajes"""
+
+    def setUp(self):
+        CTFConfig.clear_cache()
+        self.category = Category.objects.create(name='Web')
+        self.challenge = Challenge.objects.create(
+            title='SQLi', description='-', category=self.category, points=100, flag='flag{ok}'
+        )
+        self.other_challenge = Challenge.objects.create(
+            title='XSS', description='-', category=self.category, points=200, flag='flag{xss}'
+        )
+        self.team = Team.objects.create(name='Alpha')
+        self.rival = Team.objects.create(name='Beta')
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.rival_user = User.objects.create_user(username='bob', password='pass')
+        self.team.members.add(self.user)
+        self.rival.members.add(self.rival_user)
+
+    def submit(self, user, challenge, flag):
+        self.client.force_login(user)
+        return self.client.post(reverse('challenges:submit', args=[challenge.id]), {'flag': flag})
+
+    def test_correct_flag_appends_ledger_entries(self):
+        response = self.submit(self.user, self.challenge, 'flag{ok}')
+
+        self.assertTrue(response.json()['is_first_blood'])
+        kinds = sorted(ScoreEntry.objects.filter(team=self.team).values_list('kind', flat=True))
+        self.assertEqual(kinds, ['first_blood', 'solve'])
+
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.total_score, 150)
+
+    def test_second_solver_gets_no_bonus(self):
+        self.submit(self.user, self.challenge, 'flag{ok}')
+        self.submit(self.rival_user, self.challenge, 'flag{ok}')
+
+        self.rival.refresh_from_db()
+        self.assertEqual(self.rival.total_score, 100)
+        self.assertEqual(ScoreEntry.objects.filter(team=self.rival).count(), 1)
+
+    def test_wrong_flag_does_not_touch_ledger(self):
+        self.submit(self.user, self.challenge, 'flag{nope}')
+
+        self.assertFalse(ScoreEntry.objects.exists())
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.total_score, 0)
+
+    def test_scores_are_consistent_after_solves(self):
+        self.submit(self.user, self.challenge, 'flag{ok}')
+        self.submit(self.user, self.other_challenge, 'flag{xss}')
+        self.submit(self.rival_user, self.challenge, 'flag{ok}')
+
+        self.assertEqual(reconcile_scores(), [])
+
+    def test_expected_scores_distinct_ignores_default_ordering(self):
+        self.submit(self.user, self.challenge, 'flag{ok}')
+
+        with CaptureQueriesContext(connection) as queries:
+            expected = expected_scores()
+
+        # Con el ordering del modelo, submitted_at entraría al SELECT DISTINCT y no colapsaría duplicados
+        distinct = next(query['sql'] for query in queries.captured_queries if 'DISTINCT' in query['sql'])
+        self.assertNotIn('submitted_at', distinct)
+        self.assertEqual(expected[self.team.pk], 150)
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        self.submit(self.user, self.challenge, 'flag{ok}')
+        Team.objects.filter(pk=self.team.pk).update(total_score=999)
+
+        discrepancies = reconcile_scores()
+        self.assertEqual(len(discrepancies), 1)
+        self.assertEqual(discrepancies[0]['stored'], 999)
+        self.assertEqual(discrepancies[0]['expected'], 150)
+
+        reconcile_scores(fix=True)
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.total_score, 150)
+        self.assertEqual(reconcile_scores(), [])
+
+    def test_update_score_rebuilds_from_raw_data(self):
+        Submission.objects.create(
+            team=self.team, challenge=self.challenge, flag_submitted='flag{ok}',
+            is_correct=True, submitted_by=self.user
+        )
+        FirstBlood.objects.create(team=self.team, challenge=self.challenge, achieved_by=self.user, bonus_points=50)
+
+        self.assertEqual(self.team.update_score(), 150)
+        self.assertEqual(ScoreEntry.objects.filter(team=self.team).count(), 2)
+
+
+    def test_solve_updates_counters(self):
+        self.submit(self.user, self.challenge, 'flag{ok}')
+        self.submit(self.rival_user, self.challenge, 'flag{ok}')
+        self.submit(self.user, self.other_challenge, 'flag{nope}')
+
+        self.challenge.refresh_from_db()
+        self.team.refresh_from_db()
+        self.rival.refresh_from_db()
+        self.assertEqual(self.challenge.get_solve_count(), 2)
+        self.assertEqual((self.team.get_solved_challenges_count(), self.team.get_first_bloods_count()), (1, 1))
+        self.assertEqual((self.rival.solved_count, self.rival.first_blood_count), (1, 0))
+        self.assertEqual(
+            self.rival.last_solve_at,
+            Submission.objects.get(team=self.rival, is_correct=True).submitted_at,
+        )
+
+    def test_rebuild_counters_fixes_drift(self):
+        self.submit(self.user, self.challenge, 'flag{ok}')
+        Team.objects.filter(pk=self.team.pk).update(solved_count=7, first_blood_count=0)
+        Challenge.objects.filter(pk=self.challenge.pk).update(solve_count=3)
+
+        self.assertEqual(len(rebuild_counters(fix=False)), 2)
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.solved_count, 7)
+
+        out = StringIO()
+        call_command('rebuild_counters', stdout=out)
+
+        self.team.refresh_from_db()
+        self.challenge.refresh_from_db()
+        self.assertEqual((self.team.solved_count, self.team.first_blood_count), (1, 1))
+        self.assertEqual(self.challenge.solve_count, 1)
+        self.assertEqual(rebuild_counters(fix=False), [])
+        self.assertIn('2 contadores corregidos', out.getvalue())
+
+    def test_submissions_update_stats(self):
+        self.submit(self.user, self.challenge, 'flag{nope}')
+        self.submit(self.user, self.challenge, 'flag{otra}')
+        self.submit(self.user, self.challenge, 'flag{ok}')
+        self.submit(self.user, self.other_challenge, 'flag{xss}')
+
+        team_stats = TeamStats.objects.get(team=self.team)
+        self.assertEqual((team_stats.solved_count, team_stats.failed_count, team_stats.solved_category_count), (2, 2, 1))
+        self.assertEqual(team_stats.first_solve_at, Submission.objects.get(team=self.team, challenge=self.challenge,
+                                                                           is_correct=True).submitted_at)
+        self.assertIsNone(team_stats.third_solve_at)
+
+        user_stats = UserStats.objects.get(user=self.user)
+        self.assertEqual(
+            (user_stats.solved_count, user_stats.failed_count, user_stats.first_blood_count,
+             user_stats.first_try_solve_count, user_stats.max_failures_before_solve, user_stats.points),
+            (2, 2, 2, 1, 2, 400),
+        )
+        self.assertEqual(user_stats.last_solve_at, self.team.submissions.filter(is_correct=True).latest('submitted_at').submitted_at)
+
+        attempts = UserChallengeStats.objects.get(user=self.user, challenge=self.challenge)
+        self.assertEqual(attempts.failed_count, 2)
+        self.assertIsNotNone(attempts.solved_at)
+        self.assertEqual(UserChallengeStats.objects.get(user=self.user, challenge=self.other_challenge).failed_count, 0)
+        self.assertEqual(rebuild_counters(fix=False), [])
+
+    def test_rebuild_counters_restores_stats(self):
+        self.submit(self.user, self.challenge, 'flag{nope}')
+        self.submit(self.user, self.challenge, 'flag{ok}')
+        TeamStats.objects.all().delete()
+        UserStats.objects.filter(user=self.user).update(failed_count=9)
+        UserChallengeStats.objects.all().delete()
+
+        self.assertEqual(len(rebuild_counters(fix=False)), 3)
+        rebuild_counters(fix=True)
+
+        self.assertEqual(TeamStats.objects.get(team=self.team).solved_count, 1)
+        self.assertEqual(UserStats.objects.get(user=self.user).failed_count, 1)
+        self.assertEqual(UserChallengeStats.objects.get(user=self.user, challenge=self.challenge).failed_count, 1)
+        self.assertEqual(rebuild_counters(fix=False), [])
+
+    def test_second_correct_submission_violates_constraint(self):
+        self.submit(self.user, self.challenge, 'flag{ok}')
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Submission.objects.create(team=self.team, challenge=self.challenge, flag_submitted='flag{ok}', is_correct=True)
+
+        # Los intentos incorrectos no están limitados
+        Submission.objects.create(team=self.team, challenge=self.challenge, flag_submitted='x', is_correct=False)
+        Submission.objects.create(team=self.team, challenge=self.challenge, flag_submitted='y', is_correct=False)
+
+    def test_first_blood_is_claimed_only_once(self):
+        first = Submission.objects.create(team=self.team, challenge=self.challenge, flag_submitted='flag{ok}',
+                                          is_correct=True, submitted_by=self.user)
+        second = Submission.objects.create(team=self.rival, challenge=self.challenge, flag_submitted='flag{ok}',
+                                           is_correct=True, submitted_by=self.rival_user)
+
+        self.assertIsNotNone(claim_first_blood(first, 50))
+        self.assertIsNone(claim_first_blood(second, 50))
+        self.assertEqual(FirstBlood.objects.get(challenge=self.challenge).team, self.team)
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ChallengeBoardTests(TestCase):
+    """Tablero de challenges por equipo, con queries constantes y cacheado"""
+
+    def setUp(self):
+        cache.clear()
+        CTFConfig.clear_cache()
+        self.category = Category.objects.create(name='Web')
+        self.challenge = Challenge.objects.create(
+            title='SQLi', description='-', category=self.category, points=100, flag='flag{ok}'
+        )
+        self.team = Team.objects.create(name='Alpha')
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.team.members.add(self.user)
+        self.client.force_login(self.user)
+
+    def create_challenges(self, count):
+        Challenge.objects.bulk_create([
+            Challenge(title=f'Challenge {idx}', description='-', category=self.category, points=idx, flag='flag')
+            for idx in range(count)
+        ])
+
+    def list_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('challenges:list'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_challenges(self):
+        # Primer request: crea la configuración del CTF y deja la sesión lista
+        self.list_queries()
+        few = self.list_queries()
+        self.create_challenges(50)
+        many = self.list_queries()
+
+        self.assertEqual(few, many)
+
+    def test_board_has_solve_counts_and_solved_flags(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('challenges:submit', args=[self.challenge.id]), {'flag': 'flag{ok}'})
+
+        board = get_board(self.team)
+
+        self.assertEqual(board[0]['name'], 'Web')
+        self.assertEqual(board[0]['challenges'][0]['solve_count'], 1)
+        self.assertTrue(board[0]['challenges'][0]['solved'])
+
+    def test_board_is_served_from_cache(self):
+        get_board(self.team)
+
+        with self.assertNumQueries(0):
+            get_board(self.team)
+
+    def test_admin_edit_invalidates_every_board(self):
+        get_board(self.team)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.challenge.title = 'Blind SQLi'
+            self.challenge.save()
+
+        self.assertEqual(get_board(self.team)[0]['challenges'][0]['title'], 'Blind SQLi')
+
+    def test_inactive_challenges_are_hidden(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.challenge.is_active = False
+            self.challenge.save()
+
+        response = self.client.get(reverse('challenges:list'))
+
+        self.assertTemplateUsed(response, 'challenges/no_challenges.html')
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN es de SQLite')
+class SubmissionQueryPlanTests(TestCase):
+    """Las consultas frecuentes sobre Submission usan índices y no recorren la tabla completa"""
+
+    TABLE_SCAN = re.compile(r'^SCAN (?:TABLE )?challenges_submission(?! USING)')
+    INDEX_SCAN = re.compile(r'^SCAN (?:TABLE )?challenges_submission USING (?:COVERING )?INDEX (\w+)')
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Web')
+        cls.challenge = Challenge.objects.create(
+            title='SQLi', description='-', category=category, points=100, flag='flag{ok}'
+        )
+        cls.team = Team.objects.create(name='Alpha')
+        cls.user = User.objects.create_user(username='alice', password='pass')
+
+    def plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[3] for row in cursor.fetchall()]
+
+    def assertNoScan(self, queryset):
+        """Filtros: la tabla (ni un índice completo) se recorre entera"""
+        plan = self.plan(queryset)
+        scans = [detail for detail in plan if self.TABLE_SCAN.match(detail) or self.INDEX_SCAN.match(detail)]
+        self.assertEqual(scans, [], f'{queryset.query}\n' + '\n'.join(plan))
+
+    def assertIndexOrder(self, queryset, index):
+        """Feeds con LIMIT: se leen del índice en orden, sin ordenar la tabla"""
+        plan = self.plan(queryset)
+        scans = [self.INDEX_SCAN.match(detail) for detail in plan if detail.startswith('SCAN')]
+        self.assertTrue(scans and all(match and match.group(1) == index for match in scans), '\n'.join(plan))
+        self.assertFalse([detail for detail in plan if 'TEMP B-TREE FOR ORDER BY' in detail], '\n'.join(plan))
+
+    def test_team_queries(self):
+        # Tablero, submit, detalle de equipo y logros de equipo
+        team_solves = Submission.objects.filter(team=self.team, is_correct=True)
+        self.assertNoScan(team_solves.values_list('challenge_id', flat=True))
+        self.assertNoScan(team_solves.filter(challenge=self.challenge))
+        self.assertNoScan(team_solves.order_by('submitted_at')[:3])
+        self.assertNoScan(team_solves.values('challenge__category').distinct().order_by())
+        self.assertNoScan(Submission.objects.filter(team=self.team, is_correct=False).order_by())
+        self.assertNoScan(Submission.objects.filter(team=self.team).order_by('-submitted_at')[:50])
+
+    def test_challenge_queries(self):
+        # Estadísticas del challenge y de la categoría en el panel de admin
+        challenge_solves = Submission.objects.filter(challenge=self.challenge, is_correct=True)
+        self.assertNoScan(challenge_solves.values('submitted_by').distinct().order_by())
+        self.assertNoScan(challenge_solves.order_by())
+        self.assertNoScan(Submission.objects.filter(challenge=self.challenge).order_by())
+        self.assertNoScan(Submission.objects.filter(challenge__category=self.challenge.category,
+                                                    is_correct=True).order_by())
+
+    def test_user_queries(self):
+        # Logros individuales y panel de admin de usuarios
+        user_solves = Submission.objects.filter(submitted_by=self.user, is_correct=True)
+        self.assertNoScan(user_solves.order_by())
+        self.assertNoScan(user_solves.values_list('challenge_id', flat=True))
+        self.assertNoScan(Submission.objects.filter(submitted_by=self.user, challenge=self.challenge).order_by())
+        self.assertNoScan(Submission.objects.filter(submitted_by=self.user).order_by('-submitted_at'))
+
+    def test_recent_queries(self):
+        # Dashboard: solves de las últimas 24 horas
+        self.assertNoScan(Submission.objects.filter(
+            is_correct=True, submitted_at__gte=timezone.now() - timedelta(hours=24)
+        ).order_by())
+        # Feed del snapshot y últimos intentos en inicio/panel de admin
+        self.assertIndexOrder(Submission.objects.filter(is_correct=True).order_by('-submitted_at')[:20],
+                              'submission_solves_recent_idx')
+        self.assertIndexOrder(Submission.objects.order_by('-submitted_at')[:10], 'submission_recent_idx')
+
+
+def in_memory_test_db():
+    """SQLite sin ``TEST['NAME']`` (o ``:memory:``): la base de memoria compartida se bloquea entre hilos"""
+    db = settings.DATABASES['default']
+    return db['ENGINE'].endswith('sqlite3') and str(db.get('TEST', {}).get('NAME') or ':memory:') == ':memory:'
+
+
+@unittest.skipIf(in_memory_test_db(), 'requiere una base de tests en archivo (SQLite en memoria bloquea tablas entre hilos)')
+# Sin la cola de escritura de SQLite: las transacciones compiten de verdad y las
+# constraints (un solve por equipo, un first blood por challenge) resuelven la carrera
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, SQLITE_WRITE_QUEUE=False)
+class ConcurrentSolveTests(TransactionTestCase):
+    """Solves simultáneos: un solo first blood y un solo solve por equipo"""
+
+    TEAMS = 10
+    SUBMISSIONS_PER_TEAM = 3
+
+    def setUp(self):
+        cache.clear()
+        CTFConfig.clear_cache()
+        CTFConfig.get_config()
+        category = Category.objects.create(name='Web')
+        self.challenge = Challenge.objects.create(
+            title='SQLi', description='-', category=category, points=100, flag='flag{ok}'
+        )
+        self.users = []
+        for idx in range(self.TEAMS):
+            team = Team.objects.create(name=f'Team {idx}')
+            for member in range(self.SUBMISSIONS_PER_TEAM):
+                user = User.objects.create_user(username=f'user{idx}-{member}', password='pass')
+                team.members.add(user)
+                self.users.append(user)
+
+    def test_parallel_correct_submissions(self):
+        barrier = threading.Barrier(len(self.users), timeout=30)
+        errors = []
+
+        def solve(user):
+            client = Client()
+            try:
+                client.force_login(user)
+                # Como entre dos requests: no retener la conexión (ni su lugar en el pool) en la barrera
+                connection.close()
+                barrier.wait()
+                response = client.post(reverse('challenges:submit', args=[self.challenge.id]), {'flag': 'flag{ok}'})
+                if response.status_code not in (200, 400):
+                    errors.append(response.status_code)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=solve, args=(user,)) for user in self.users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(FirstBlood.objects.filter(challenge=self.challenge).count(), 1)
+        self.assertEqual(Submission.objects.filter(challenge=self.challenge, is_correct=True).count(), self.TEAMS)
+        for team in Team.objects.all():
+            self.assertEqual(team.solved_count, 1)
+            self.assertEqual(ScoreEntry.objects.filter(team=team, kind='solve').count(), 1)
+        self.assertEqual(sum(Team.objects.values_list('first_blood_count', flat=True)), 1)
+        self.challenge.refresh_from_db()
+        self.assertEqual(self.challenge.solve_count, self.TEAMS)
+
+
+class GenerateCtfCommandTests(TestCase):
+    """El generador de CTFs sintéticos produce datos consistentes y reproducibles"""
+
+    OPTIONS = {'teams': 12, 'members': 2, 'categories': 3, 'challenges': 4, 'submissions': 400,
+               'correct_ratio': 0.1, 'hours': 12, 'start': '2026-01-10T00:00:00+00:00', 'batch_size': 50}
+
+    def generate(self, **options):
+        call_command('generate_ctf', stdout=StringIO(), **{**self.OPTIONS, **options})
+
+    def dataset(self):
+        """Resumen comparable de todo lo generado"""
+        return (
+            list(Team.objects.order_by('name').values_list('id', 'name', 'total_score', 'invite_code')),
+            list(Submission.objects.order_by('id').values_list(
+                'id', 'team__name', 'challenge__title', 'submitted_by__username', 'is_correct', 'submitted_at'
+            )),
+            list(FirstBlood.objects.order_by('challenge__title').values_list('team__name', 'achieved_at')),
+            list(Achievement.objects.order_by('code', 'team__name', 'user__username').values_list(
+                'code', 'team__name', 'user__username', 'earned_at'
+            )),
+        )
+
+    def test_generated_ctf_is_consistent(self):
+        self.generate()
+
+        start = datetime.fromisoformat(self.OPTIONS['start'])
+        self.assertEqual(Submission.objects.count(), 400)
+        self.assertEqual(Submission.objects.filter(is_correct=True).count(), 40)
+        self.assertEqual(User.objects.count(), 24)
+        self.assertFalse(Submission.objects.filter(submitted_at__lt=start).exists())
+        self.assertFalse(Submission.objects.filter(submitted_at__gt=start + timedelta(hours=12)).exists())
+
+        # Ledger, puntajes y contadores coinciden con los datos crudos
+        self.assertEqual(reconcile_scores(), [])
+        self.assertEqual(rebuild_counters(fix=False), [])
+
+        # Un first blood por challenge resuelto, en el solve más temprano
+        for challenge in Challenge.objects.filter(solve_count__gt=0):
+            first_solve = challenge.submissions.filter(is_correct=True).order_by('submitted_at').first()
+            self.assertEqual(
+                (challenge.first_blood.team_id, challenge.first_blood.achieved_at),
+                (first_solve.team_id, first_solve.submitted_at),
+            )
+        self.assertEqual(FirstBlood.objects.count(), Challenge.objects.filter(solve_count__gt=0).count())
+
+        # Los intentos fallidos de un challenge resuelto son anteriores al solve
+        for solve in Submission.objects.filter(is_correct=True):
+            self.assertFalse(Submission.objects.filter(
+                team=solve.team_id, challenge=solve.challenge_id, submitted_at__gt=solve.submitted_at
+            ).exists())
+
+        # Un solo hash de contraseña para todos los usuarios
+        self.assertEqual(User.objects.values('password').distinct().count(), 1)
+        self.assertTrue(User.objects.first().check_password('ctf'))
+
+    def test_same_seed_generates_same_data(self):
+        self.generate(seed=7)
+        first = self.dataset()
+
+        Team.objects.all().delete()
+        User.objects.all().delete()
+        Category.objects.all().delete()
+        self.generate(seed=7)
+        self.assertEqual(self.dataset(), first)
+
+        self.generate(seed=8, prefix='other')
+        other = Team.objects.filter(name__startswith='other ').order_by('name')
+        self.assertNotEqual(list(other.values_list('total_score', flat=True)), [row[2] for row in first[0]])
+
+    def test_existing_prefix_is_rejected(self):
+        self.generate(submissions=50)
+
+        with self.assertRaises(CommandError):
+            self.generate(submissions=50)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, SCOREBOARD_DISPLAY_COALESCE_WINDOW=0)
+class ReplayCtfCommandTests(TransactionTestCase):
+    """Un CTF exportado se reproduce por el submit real con las fechas y resultados originales"""
+
+    def history(self):
+        return (
+            list(Submission.objects.order_by('submitted_at', 'team_id', 'challenge_id', 'is_correct').values_list(
+                'team_id', 'challenge_id', 'submitted_by_id', 'is_correct', 'submitted_at'
+            )),
+            list(FirstBlood.objects.order_by('challenge_id').values_list('challenge_id', 'team_id', 'achieved_at')),
+            list(Team.objects.order_by('id').values_list('id', 'total_score', 'solved_count', 'first_blood_count')),
+        )
+
+    def test_replay_reproduces_exported_ctf(self):
+        call_command('generate_ctf', stdout=StringIO(), teams=5, members=2, categories=2, challenges=3,
+                     submissions=60, correct_ratio=0.2, hours=6, start='2026-01-10T00:00:00+00:00')
+        original = self.history()
+
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        call_command('export_ctf', path, stdout=StringIO())
+
+        Team.objects.all().delete()
+        User.objects.all().delete()
+        Category.objects.all().delete()
+
+        output = StringIO()
+        call_command('replay_ctf', dump=path, speed=0, stdout=output)
+
+        self.assertEqual(self.history(), original)
+        self.assertEqual(reconcile_scores(), [])
+        self.assertIn('0 first bloods y 0 puntajes distintos', output.getvalue())
+        self.assertIn('scoreboard-display', output.getvalue())
+
+    def test_replay_requires_empty_database(self):
+        call_command('generate_ctf', stdout=StringIO(), teams=2, members=1, categories=1, challenges=1,
+                     submissions=4, hours=1)
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        call_command('export_ctf', path, stdout=StringIO())
+
+        with self.assertRaises(CommandError):
+            call_command('replay_ctf', dump=path, stdout=StringIO())
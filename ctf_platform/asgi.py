@@ -4,7 +4,7 @@ ASGI config for ctf_platform project.
 
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.routing import ChannelNameRouter, ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 from channels.security.websocket import AllowedHostsOriginValidator
 
@@ -13,6 +13,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ctf_platform.settings')
 django_asgi_app = get_asgi_application()
 
 from scoreboard import routing
+from scoreboard.events import EVENTS_CHANNEL
+from scoreboard.workers import ScoreboardEventConsumer
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
@@ -23,4 +25,7 @@ application = ProtocolTypeRouter({
             )
         )
     ),
+    "channel": ChannelNameRouter({
+        EVENTS_CHANNEL: ScoreboardEventConsumer.as_asgi(),
+    }),
 })
@@ -0,0 +1,222 @@
+"""
+Métricas de la plataforma en formato de texto de Prometheus (``/metrics``).
+
+Cada proceso (Daphne, worker de eventos) acumula los incrementos en memoria y los
+vuelca al cache cada ``METRICS_FLUSH_INTERVAL`` segundos con ``incr`` atómicos,
+igual que los contadores del broadcaster: con ``CACHE_BACKEND=redis`` todos los
+procesos suman sobre las mismas claves y ``/metrics`` reporta el total del
+despliegue desde cualquiera de ellos. Registrar una medición no hace I/O, así que
+se puede llamar desde código async (consumers) y desde el hot path del submit.
+
+Los valores de las etiquetas se declaran junto con la métrica: así ``/metrics``
+conoce todas las series y las lee con un solo ``get_many``. Las sumas de los
+histogramas se guardan como enteros (microsegundos o bytes) para poder usar
+``incr``.
+
+El gauge de sockets conectados se mantiene con +1/-1; si un proceso muere con
+sockets abiertos el valor queda alto hasta reiniciar los contadores
+(``reset_metrics``).
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+KEY_PREFIX = 'metrics:'
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Metric:
+    """Definición de una métrica: tipo, etiquetas con sus valores posibles y buckets"""
+
+    def __init__(self, name, kind, help, labels=None, buckets=None, scale=1):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.labels = labels or {}
+        self.buckets = buckets
+        # Factor para guardar la suma del histograma como entero (1e6: microsegundos)
+        self.scale = scale
+
+    def series(self):
+        """Combinaciones de valores de etiquetas (una sola serie si no tiene etiquetas)"""
+        combos = [()]
+        for values in self.labels.values():
+            combos = [combo + (value,) for combo in combos for value in values]
+        return combos
+
+    def key(self, values, suffix):
+        return f'{KEY_PREFIX}{self.name}|{"|".join(values)}|{suffix}'
+
+    def label_values(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f'{self.name} usa las etiquetas {sorted(self.labels)}')
+        values = tuple(str(labels[name]) for name in self.labels)
+        for name, value in zip(self.labels, values):
+            if value not in self.labels[name]:
+                raise ValueError(f'{self.name}: valor "{value}" no declarado para la etiqueta {name}')
+        return values
+
+
+SUBMIT_OUTCOMES = ('correct', 'wrong', 'already_solved', 'ctf_ended', 'no_team')
+SUBMIT_STAGES = ('config', 'lookup', 'duplicate_check', 'commit', 'insert', 'first_blood', 'score_update', 'stats', 'rank', 'total')
+SOLVE_EVENT_STAGES = ('load', 'achievements', 'rank', 'broadcast', 'total')
+
+METRICS = {metric.name: metric for metric in [
+    Metric('ctf_submissions_total', 'counter', 'Submissions por resultado',
+           labels={'outcome': SUBMIT_OUTCOMES}),
+    Metric('ctf_submit_stage_seconds', 'histogram', 'Duración de cada etapa de submit_flag',
+           labels={'stage': SUBMIT_STAGES}, buckets=SECONDS_BUCKETS, scale=1_000_000),
+    Metric('ctf_solve_event_stage_seconds', 'histogram', 'Duración de cada etapa del evento de solve en el worker',
+           labels={'stage': SOLVE_EVENT_STAGES}, buckets=SECONDS_BUCKETS, scale=1_000_000),
+    Metric('ctf_solve_broadcast_delay_seconds', 'histogram',
+           'Demora desde el commit del solve hasta su broadcast al display',
+           buckets=SECONDS_BUCKETS, scale=1_000_000),
+    Metric('ctf_display_build_seconds', 'histogram', 'Armado del snapshot y delta en broadcast_display_update',
+           buckets=SECONDS_BUCKETS, scale=1_000_000),
+    Metric('ctf_display_payload_bytes', 'histogram', 'Bytes del frame enviado al display',
+           buckets=BYTES_BUCKETS),
+    Metric('ctf_websocket_connections', 'gauge', 'Sockets de ScoreboardConsumer conectados'),
+    Metric('ctf_channel_layer_send_seconds', 'histogram', 'Latencia de envío al channel layer',
+           labels={'kind': ('send', 'group_send')}, buckets=SECONDS_BUCKETS, scale=1_000_000),
+]}
+
+
+class MetricsBuffer:
+    """Incrementos pendientes del proceso; se vuelcan al cache en un solo lote por intervalo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._timer = None
+
+    @property
+    def interval(self):
+        return getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0)
+
+    def add(self, deltas):
+        with self._lock:
+            for key, delta in deltas:
+                self._pending[key] += delta
+            if self.interval > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.interval, self._flush_from_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        """Suma los incrementos pendientes a los contadores compartidos"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._pending = self._pending, defaultdict(int)
+
+        for key, delta in pending.items():
+            if not delta:
+                continue
+            if not cache.add(key, delta, timeout=None):
+                try:
+                    cache.incr(key, delta)
+                except ValueError:
+                    cache.set(key, delta, timeout=None)
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # El cache de base de datos abriría una conexión en este hilo
+            connections.close_all()
+
+
+buffer = MetricsBuffer()
+
+
+def inc(name, amount=1, **labels):
+    """Suma ``amount`` a un counter o gauge (negativo para bajar un gauge)"""
+    metric = METRICS[name]
+    buffer.add([(metric.key(metric.label_values(labels), 'value'), amount)])
+
+
+def observe(name, value, **labels):
+    """Registra una observación en un histograma"""
+    metric = METRICS[name]
+    values = metric.label_values(labels)
+    bucket = next((idx for idx, bound in enumerate(metric.buckets) if value <= bound), len(metric.buckets))
+    buffer.add([
+        (metric.key(values, f'b{bucket}'), 1),
+        (metric.key(values, 'sum'), round(value * metric.scale)),
+        (metric.key(values, 'count'), 1),
+    ])
+
+
+@contextmanager
+def timer(name, **labels):
+    """Observa en el histograma la duración (segundos) del bloque"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def _all_keys():
+    for metric in METRICS.values():
+        suffixes = ['value'] if metric.kind != 'histogram' else (
+            [f'b{idx}' for idx in range(len(metric.buckets) + 1)] + ['sum', 'count']
+        )
+        for values in metric.series():
+            for suffix in suffixes:
+                yield metric.key(values, suffix)
+
+
+def reset_metrics():
+    """Borra los contadores compartidos y los pendientes de este proceso"""
+    with buffer._lock:
+        buffer._pending.clear()
+    cache.delete_many(list(_all_keys()))
+
+
+def _format_labels(metric, values, extra=None):
+    pairs = [f'{name}="{value}"' for name, value in zip(metric.labels, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    return f'{value:g}' if isinstance(value, float) else str(value)
+
+
+def render_metrics():
+    """Todas las métricas en formato de texto de Prometheus (0.0.4)"""
+    buffer.flush()
+    stored = cache.get_many(list(_all_keys()))
+
+    lines = []
+    for metric in METRICS.values():
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for values in metric.series():
+            if metric.kind != 'histogram':
+                value = stored.get(metric.key(values, 'value'), 0)
+                lines.append(f'{metric.name}{_format_labels(metric, values)} {value}')
+                continue
+
+            cumulative = 0
+            for idx, bound in enumerate(list(metric.buckets) + ['+Inf']):
+                cumulative += stored.get(metric.key(values, f'b{idx}'), 0)
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f'{metric.name}_bucket{_format_labels(metric, values, le)} {cumulative}')
+            total = stored.get(metric.key(values, 'sum'), 0) / metric.scale
+            lines.append(f'{metric.name}_sum{_format_labels(metric, values)} {_format_number(total)}')
+            lines.append(f'{metric.name}_count{_format_labels(metric, values)} '
+                         f'{stored.get(metric.key(values, "count"), 0)}')
+    return '\n'.join(lines) + '\n'
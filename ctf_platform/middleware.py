@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib.auth import logout, get_user_model
@@ -31,28 +32,47 @@ class CheckBannedUserMiddleware:
         response = self.get_response(request)
         return response
 
+BOOTSTRAPPED_CACHE_KEY = 'platform:bootstrapped'
+
 class QuickStartMiddleware:
-    """Middleware para redirigir al quick start si no hay usuarios"""
+    """
+    Middleware para redirigir al quick start si no hay usuarios.
+    Una vez creado el primer usuario la plataforma queda inicializada para
+    siempre: se recuerda en el proceso y en el cache compartido, y desde ahí
+    el middleware no hace queries.
+    """
     
     def __init__(self, get_response):
         self.get_response = get_response
-    
-    def __call__(self, request):
-        # URLs que no requieren el quick start
-        exempt_urls = [
+        self.bootstrapped = False
+        
+        # URLs que no requieren el quick start (se resuelven una sola vez)
+        self.exempt_prefixes = (
             reverse('quickstart:welcome'),
             reverse('quickstart:create_admin'),
             reverse('quickstart:configure_ctf'),
             reverse('quickstart:complete'),
+            # Prometheus scrapea desde el primer arranque, antes de crear usuarios
+            reverse('metrics'),
             '/static/',
             '/media/',
-        ]
+        )
+    
+    def is_bootstrapped(self):
+        """Verifica si ya existe algún usuario (solo consulta la base mientras no lo haya)"""
+        if self.bootstrapped:
+            return True
         
+        if cache.get(BOOTSTRAPPED_CACHE_KEY) or User.objects.exists():
+            cache.set(BOOTSTRAPPED_CACHE_KEY, True, timeout=None)
+            self.bootstrapped = True
+        
+        return self.bootstrapped
+    
+    def __call__(self, request):
         # Si no hay usuarios y no estamos en una URL exenta o ruta estática, redirigir al quick start
-        if not User.objects.exists():
-            # Verificar si es una ruta exenta
-            is_exempt = any(request.path.startswith(url) if url.startswith('/') else request.path == url for url in exempt_urls)
-            if not is_exempt:
+        if not self.bootstrapped and not request.path.startswith(self.exempt_prefixes):
+            if not self.is_bootstrapped():
                 return redirect('quickstart:welcome')
         
         response = self.get_response(request)
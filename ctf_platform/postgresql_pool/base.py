@@ -0,0 +1,110 @@
+"""
+Backend PostgreSQL con pool de conexiones en el proceso (psycopg_pool).
+
+Bajo Daphne cada request síncrono corre en su propio contexto, así que las
+conexiones persistentes de Django (``CONN_MAX_AGE``) no se reutilizan entre
+requests: cada uno abre una conexión nueva. Con este backend la conexión se toma
+de un pool compartido por el proceso al primer query y se devuelve al cerrarse
+al final del request.
+
+Se configura con ``OPTIONS['pool']`` (``min_size``, ``max_size``, ``timeout`` y
+demás argumentos de ``psycopg_pool.ConnectionPool``) y requiere
+``CONN_MAX_AGE=0``. Con ``CONN_HEALTH_CHECKS`` el pool verifica cada conexión
+antes de entregarla.
+"""
+import threading
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import DatabaseCreation as BaseDatabaseCreation
+
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    ConnectionPool = None
+
+# Django usa este alias para conectarse a la base "postgres" (crear/borrar la base de tests)
+NO_DB_ALIAS = '__no_db__'
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class DatabaseCreation(BaseDatabaseCreation):
+
+    def destroy_test_db(self, old_database_name=None, verbosity=1, keepdb=False, suffix=None):
+        # Las conexiones del pool mantendrían abierta la base de tests e impedirían borrarla
+        self.connection.close()
+        self.connection.close_pool()
+        super().destroy_test_db(old_database_name, verbosity, keepdb, suffix)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    @property
+    def pool(self):
+        """Pool del proceso para este alias y base (None sin pool configurado)"""
+        pool_options = self.settings_dict['OPTIONS'].get('pool')
+        if self.alias == NO_DB_ALIAS or not pool_options:
+            return None
+
+        # La base de tests cambia el NAME del alias: cada base tiene su propio pool
+        key = (self.alias, self.settings_dict['NAME'])
+        pool = _pools.get(key)
+        if pool is None:
+            with _pools_lock:
+                pool = _pools.get(key)
+                if pool is None:
+                    pool = self.create_pool(pool_options)
+                    _pools[key] = pool
+        return pool
+
+    def create_pool(self, pool_options):
+        if ConnectionPool is None:
+            raise ImproperlyConfigured('El pool de conexiones requiere el paquete psycopg_pool')
+        if self.settings_dict['CONN_MAX_AGE'] != 0:
+            raise ImproperlyConfigured('El pool de conexiones requiere CONN_MAX_AGE=0')
+
+        connect_kwargs = self.get_connection_params()
+        # Django activa autocommit al tomar la conexión; en el pool quedan en ese estado
+        connect_kwargs['autocommit'] = True
+        check = ConnectionPool.check_connection if self.settings_dict['CONN_HEALTH_CHECKS'] else None
+        return ConnectionPool(kwargs=connect_kwargs, check=check, open=True,
+                              name=f'ctf-{self.alias}', **pool_options)
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        connection = pool.getconn()
+        options = self.settings_dict['OPTIONS']
+        if 'isolation_level' in options:
+            self.isolation_level = base.IsolationLevel(options['isolation_level'])
+            connection.isolation_level = self.isolation_level
+        else:
+            self.isolation_level = base.IsolationLevel.READ_COMMITTED
+        return connection
+
+    def _close(self):
+        if self.connection is None or self.pool is None:
+            return super()._close()
+
+        with self.wrap_database_errors:
+            # Se devuelve al pool del que salió (la base de tests cambia el NAME del alias);
+            # putconn hace rollback de una transacción abierta antes de reutilizarla
+            self.connection._pool.putconn(self.connection)
+            self.connection = None
+
+    def close_pool(self):
+        """Cierra el pool de este alias (por ejemplo al terminar un proceso)"""
+        key = (self.alias, self.settings_dict['NAME'])
+        with _pools_lock:
+            pool = _pools.pop(key, None)
+        if pool is not None:
+            pool.close()
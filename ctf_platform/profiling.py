@@ -0,0 +1,192 @@
+"""
+Profiler de requests a pedido del staff.
+
+Un usuario staff agrega ``?_profile=1`` (o el header ``X-Profile: 1``) a cualquier
+URL y ``RequestProfilerMiddleware`` perfila ese request con los datos reales, sin
+DEBUG ni reinicios. Se guarda como ``admin_panel.RequestProfile`` con el log
+completo de SQL (consulta y duración) y se ve en el panel de administración
+(Herramientas → Profiles). La respuesta lleva el id en ``X-Profile-Id``.
+
+Los parámetros de las consultas no se guardan: un request perfilado incluye la
+lectura de la sesión y, según la vista, hashes de contraseñas o flags, y el
+profile queda en la base y a la vista en el panel.
+
+Modos (valor del parámetro o del header):
+
+- ``sampling`` (por defecto, también ``1``): un hilo toma el stack del hilo del
+  request cada ``PROFILER_SAMPLE_INTERVAL`` segundos y cuenta los stacks en formato
+  "collapsed" (``a;b;c 12``), el que leen flamegraph.pl y speedscope. Casi no
+  altera los tiempos medidos.
+- ``cprofile``: ``cProfile`` determinista; se guarda el reporte de pstats ordenado
+  por tiempo acumulado. Mide cada llamada, así que infla las funciones chicas.
+
+Para los demás usuarios el parámetro se ignora; sin el parámetro el middleware
+solo mira ``request.GET`` y un header.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from functools import lru_cache
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_MODES = ('sampling', 'cprofile')
+
+# Tope de consultas guardadas por profile (el conteo y el tiempo total siguen completos)
+MAX_SQL_LOG = 2000
+
+
+class SqlLog:
+    """``execute_wrapper`` que registra cada consulta (sin sus parámetros) y su duración"""
+
+    def __init__(self):
+        self.entries = []
+        self.count = 0
+        self.total_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.total_time += duration
+            if len(self.entries) < MAX_SQL_LOG:
+                self.entries.append({
+                    'sql': sql,
+                    'many': many,
+                    'ms': round(duration * 1000, 3),
+                })
+
+
+@lru_cache(maxsize=None)
+def _path_roots():
+    """Raíces a recortar de las rutas, la más larga primero (site-packages antes que lib)"""
+    roots = {str(root) for root in [settings.BASE_DIR, *sys.path] if root}
+    return sorted((root + os.sep for root in roots), key=len, reverse=True)
+
+
+@lru_cache(maxsize=8192)
+def _frame_label(code):
+    """``archivo:función`` con la ruta relativa al proyecto o a site-packages"""
+    filename = code.co_filename
+    for root in _path_roots():
+        if filename.startswith(root):
+            filename = filename[len(root):]
+            break
+    return f'{filename}:{code.co_name}'
+
+
+class StackSampler:
+    """Muestrea el stack de un hilo a intervalo fijo y acumula stacks colapsados"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        """Stacks en formato collapsed, los más frecuentes primero"""
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+
+
+def cprofile_report(profiler, limit=80):
+    """Reporte de pstats ordenado por tiempo acumulado"""
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
+
+
+def requested_mode(request):
+    """Modo pedido en el parámetro o el header, o None si no se pidió un profile"""
+    value = request.GET.get(PROFILE_PARAM) or request.META.get(PROFILE_HEADER)
+    if not value:
+        return None
+    return value if value in PROFILE_MODES else 'sampling'
+
+
+class RequestProfilerMiddleware:
+    """Perfila los requests de staff que lo piden (ver el docstring del módulo)"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILER', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = requested_mode(request)
+        if mode is None or not request.user.is_staff:
+            return self.get_response(request)
+
+        sql_log = SqlLog()
+        sampler = profiler = None
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(sql_log))
+            if mode == 'cprofile':
+                profiler = cProfile.Profile()
+                response = profiler.runcall(self.get_response, request)
+            else:
+                interval = getattr(settings, 'PROFILER_SAMPLE_INTERVAL', 0.001)
+                with StackSampler(threading.get_ident(), interval) as sampler:
+                    response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        profile = self.save(request, response, mode, duration, sql_log,
+                            collapsed=sampler.collapsed() if sampler else '',
+                            stats=cprofile_report(profiler) if profiler else '')
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
+
+    def save(self, request, response, mode, duration, sql_log, collapsed, stats):
+        from admin_panel.models import RequestProfile
+
+        match = request.resolver_match
+        profile = RequestProfile.objects.create(
+            user=request.user,
+            method=request.method,
+            path=request.get_full_path()[:500],
+            view_name=match.view_name if match else '',
+            status_code=response.status_code,
+            mode=mode,
+            duration_ms=round(duration * 1000, 2),
+            query_count=sql_log.count,
+            sql_time_ms=round(sql_log.total_time * 1000, 2),
+            sql_log=sql_log.entries,
+            collapsed_stacks=collapsed,
+            stats=stats,
+        )
+        RequestProfile.prune(getattr(settings, 'PROFILER_KEEP', 200))
+        return profile
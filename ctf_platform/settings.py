@@ -41,12 +41,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero para medir el request completo; se descarta si REQUEST_TIMING=False
+    'ctf_platform.timing.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Profiles a pedido del staff con ?_profile=1 (ver ctf_platform/profiling.py)
+    'ctf_platform.profiling.RequestProfilerMiddleware',
     'ctf_platform.middleware.CheckBannedUserMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -76,12 +80,72 @@ WSGI_APPLICATION = 'ctf_platform.wsgi.application'
 ASGI_APPLICATION = 'ctf_platform.asgi.application'
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DATABASE_ENGINE=sqlite (por defecto) o postgresql. Ver "Base de datos" en el README
+DATABASE_ENGINE = os.getenv('DATABASE_ENGINE', 'sqlite')
+
+# Daphne ejecuta el código síncrono en un pool de ASGI_THREADS hilos (lee la misma
+# variable de entorno); el pool de conexiones se dimensiona igual por defecto
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', min(32, (os.cpu_count() or 1) + 4)))
+
+if DATABASE_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DATABASE_NAME', 'ctf_db'),
+            'USER': os.getenv('DATABASE_USER', 'ctf_user'),
+            'PASSWORD': os.getenv('DATABASE_PASSWORD', ''),
+            'HOST': os.getenv('DATABASE_HOST', 'localhost'),
+            'PORT': os.getenv('DATABASE_PORT', '5432'),
+            # Segundos que se reutiliza una conexión entre requests (0 = una por request)
+            'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE', 60)),
+            # Verifica una conexión reutilizada antes del primer query del request
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DATABASE_CONNECT_TIMEOUT', 5)),
+            },
+        }
+    }
+
+    # Pool de conexiones en el proceso (ver ctf_platform/postgresql_pool). Cada request
+    # toma una conexión del pool y la devuelve al terminar, así que no usa CONN_MAX_AGE
+    if os.getenv('DATABASE_POOL', 'False') == 'True':
+        DATABASES['default'].update({
+            'ENGINE': 'ctf_platform.postgresql_pool',
+            'CONN_MAX_AGE': 0,
+        })
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DATABASE_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DATABASE_POOL_MAX_SIZE', ASGI_THREADS)),
+            # Segundos que un request espera una conexión libre antes de fallar
+            'timeout': int(os.getenv('DATABASE_POOL_TIMEOUT', 10)),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE', 0)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Segundos que una conexión espera el lock de escritura antes de fallar
+                'timeout': int(os.getenv('SQLITE_TIMEOUT', 20)),
+            },
+            # Los tests usan un archivo (no memoria compartida) para tener WAL y busy_timeout como en producción
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
+        }
     }
+
+# Modo producción de SQLite (ver ctf_platform/sqlite.py): PRAGMAs aplicados a cada
+# conexión y cola de un solo escritor para las escrituras del submit
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.getenv('SQLITE_TIMEOUT', 20)) * 1000,
+    'mmap_size': 256 * 1024 * 1024,
 }
+SQLITE_WRITE_QUEUE = os.getenv('SQLITE_WRITE_QUEUE', 'True') == 'True'
 
 # Channels
 CHANNEL_LAYERS = {
@@ -93,6 +157,71 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Cache
+# En despliegues con varios procesos (web + worker) usar CACHE_BACKEND=redis
+# para que la invalidación del snapshot del scoreboard sea compartida
+if os.getenv('CACHE_BACKEND', 'locmem') == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': f"redis://{os.getenv('REDIS_HOST', 'localhost')}:{int(os.getenv('REDIS_PORT', 6379))}/1",
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'ctf-platform',
+        },
+    }
+
+# Segundos que cada proceso mantiene en memoria la configuración del CTF
+# (al guardarla se invalida en todos los procesos; ver scoreboard.models.CTFConfig.get_config)
+CTF_CONFIG_CACHE_TTL = int(os.getenv('CTF_CONFIG_CACHE_TTL', 30))
+# Cada cuántos segundos un proceso compara su copia con la versión del cache
+# compartido (una lectura de Redis por intervalo, no por lectura de la configuración)
+CTF_CONFIG_VERSION_CHECK_INTERVAL = float(os.getenv('CTF_CONFIG_VERSION_CHECK_INTERVAL', 1))
+
+# Segundos que se cachea el tablero de challenges de cada equipo; acota cuánto
+# tarda en verse la cantidad de solves de otros equipos (ver challenges/board.py)
+CHALLENGE_BOARD_TTL = int(os.getenv('CHALLENGE_BOARD_TTL', 15))
+
+# Snapshot del scoreboard: segundos máximos antes de reconstruirlo aunque no haya eventos
+SCOREBOARD_SNAPSHOT_TTL = int(os.getenv('SCOREBOARD_SNAPSHOT_TTL', 300))
+# Segundos que el broadcaster del display espera a que otro proceso termine de
+# reconstruir el snapshot antes de reconstruirlo él mismo
+SCOREBOARD_SNAPSHOT_LOCK_WAIT = float(os.getenv('SCOREBOARD_SNAPSHOT_LOCK_WAIT', 2))
+
+# Pipeline de eventos del scoreboard (ver scoreboard/events.py)
+# El worker se levanta con: python manage.py runworker scoreboard-events
+SCOREBOARD_EVENTS_CHANNEL = 'scoreboard-events'
+SCOREBOARD_EVENTS_INLINE = os.getenv('SCOREBOARD_EVENTS_INLINE', 'False') == 'True'
+
+# Ventana (segundos) en que se agrupan los solves en un solo broadcast al display
+# (ver scoreboard/broadcaster.py). 0 publica cada solve de inmediato
+SCOREBOARD_DISPLAY_COALESCE_WINDOW = float(os.getenv('SCOREBOARD_DISPLAY_COALESCE_WINDOW', 0.5))
+
+# Instrumentación por request (ver ctf_platform/timing.py): header Server-Timing e
+# histogramas por ruta en /api/request-timing/ con las últimas REQUEST_TIMING_WINDOW muestras
+REQUEST_TIMING = os.getenv('REQUEST_TIMING', 'False') == 'True'
+REQUEST_TIMING_WINDOW = int(os.getenv('REQUEST_TIMING_WINDOW', 1000))
+
+# Trazas por etapa del submit y de su evento (ver ctf_platform/tracing.py): las que
+# superan este umbral se registran con su desglose en el log ctf_platform.tracing. 0 desactiva
+TRACE_SLOW_THRESHOLD_MS = float(os.getenv('TRACE_SLOW_THRESHOLD_MS', 250))
+
+# Profiler a pedido del staff (?_profile=1 o header X-Profile): intervalo de muestreo
+# en segundos y cantidad de profiles que se conservan en el panel de administración
+REQUEST_PROFILER = os.getenv('REQUEST_PROFILER', 'True') == 'True'
+PROFILER_SAMPLE_INTERVAL = float(os.getenv('PROFILER_SAMPLE_INTERVAL', 0.001))
+PROFILER_KEEP = int(os.getenv('PROFILER_KEEP', 200))
+
+# Métricas Prometheus en /metrics (ver ctf_platform/metrics.py). Cada proceso vuelca sus
+# contadores al cache cada METRICS_FLUSH_INTERVAL segundos (con CACHE_BACKEND=redis se
+# suman los de todos los workers). Sin login solo se sirven a METRICS_ALLOWED_IPS
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1.0))
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -0,0 +1,107 @@
+"""
+Modo producción para SQLite.
+
+- Cada conexión nueva aplica los PRAGMAs de ``SQLITE_PRAGMAS`` (WAL,
+  ``synchronous=NORMAL``, ``busy_timeout`` y ``mmap_size``). Con WAL los lectores
+  no bloquean al escritor ni al revés.
+- SQLite admite un solo escritor a la vez. Con ``SQLITE_WRITE_QUEUE=True`` las
+  escrituras del submit pasan por ``run_write``, que las ejecuta en un único
+  hilo escritor: en vez de competir por el lock (y fallar con "database is
+  locked") esperan su turno en la cola del proceso. El hilo escritor solo
+  confirma la transacción; sus ``on_commit`` corren después en el hilo que
+  pidió la escritura.
+
+Con otros motores de base de datos ``run_write`` ejecuta la función en línea.
+"""
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """Aplica los PRAGMAs configurados a cada conexión SQLite nueva"""
+    if connection.vendor != 'sqlite':
+        return
+
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+
+
+_writer = None
+_writer_lock = threading.Lock()
+_local = threading.local()
+
+
+def _get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-writer')
+    return _writer
+
+
+def _run_in_writer(func, args, kwargs):
+    """
+    Ejecuta la escritura en una transacción propia y retorna ``(resultado, callbacks)``:
+    los ``on_commit`` registrados (envío de eventos al worker o su procesamiento en
+    línea, ver ``scoreboard.events``) no se ejecutan en este hilo sino en el que
+    pidió la escritura, para no retrasar las escrituras encoladas detrás
+    """
+    _local.is_writer = True
+    # Igual que en un request: la conexión del hilo escritor se reutiliza según CONN_MAX_AGE
+    close_old_connections()
+    try:
+        with transaction.atomic():
+            result = func(*args, **kwargs)
+            callbacks, connection.run_on_commit = connection.run_on_commit, []
+        # Solo llega acá si el commit se confirmó
+        return result, [(callback, robust) for _sids, callback, robust in callbacks]
+    finally:
+        close_old_connections()
+
+
+def _run_callbacks(callbacks):
+    """Ejecuta los on_commit devueltos por el hilo escritor, como lo haría Django tras el commit"""
+    for callback, robust in callbacks:
+        if not robust:
+            callback()
+            continue
+        try:
+            callback()
+        except Exception:
+            logger.exception('Error en un callback on_commit de la cola de escritura')
+
+
+def write_queue_enabled():
+    """La cola se usa solo con SQLite y si está habilitada en settings"""
+    return connection.vendor == 'sqlite' and getattr(settings, 'SQLITE_WRITE_QUEUE', False)
+
+
+def run_write(func, *args, **kwargs):
+    """
+    Ejecuta una función que escribe en la base a través del hilo escritor y
+    retorna su resultado (o relanza su excepción).
+
+    Si ya hay una transacción abierta en este hilo se ejecuta en línea: el hilo
+    escritor no vería los datos sin confirmar y esperaría el lock que tenemos.
+    Lo mismo si ya estamos en el hilo escritor (por ejemplo en un on_commit).
+    """
+    if not write_queue_enabled() or connection.in_atomic_block or getattr(_local, 'is_writer', False):
+        return func(*args, **kwargs)
+
+    # El contexto del request (traza en curso, ver ctf_platform.tracing) viaja al hilo escritor
+    context = contextvars.copy_context()
+    result, callbacks = _get_writer().submit(context.run, _run_in_writer, func, args, kwargs).result()
+    _run_callbacks(callbacks)
+    return result
@@ -0,0 +1,576 @@
+import json
+import re
+import threading
+import unittest
+from unittest import mock
+from collections import Counter
+from datetime import timedelta
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.template import engines
+from django.test import Client, TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from admin_panel.models import RequestProfile
+from challenges.models import Category, Challenge, Submission, FirstBlood
+from challenges.scoring import rebuild_counters, reconcile_scores
+from scoreboard.achievements import ACHIEVEMENTS
+from scoreboard.models import Achievement, CTFConfig
+from teams.models import Team
+from .middleware import QuickStartMiddleware, BOOTSTRAPPED_CACHE_KEY
+from .timing import RequestTimingMiddleware, route_stats
+from . import metrics, tracing
+from .sqlite import run_write
+
+User = get_user_model()
+
+
+class QuickStartMiddlewareTests(TestCase):
+    """El estado "plataforma inicializada" se recuerda y deja de consultar la base"""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = QuickStartMiddleware(lambda request: HttpResponse('ok'))
+
+    def test_redirects_to_quickstart_without_users(self):
+        response = self.middleware(self.factory.get('/challenges/'))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(self.middleware.bootstrapped)
+
+    def test_exempt_paths_do_not_query(self):
+        with self.assertNumQueries(0):
+            response = self.middleware(self.factory.get('/static/css/app.css'))
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_metrics_is_not_redirected_before_bootstrap(self):
+        response = self.middleware(self.factory.get(reverse('metrics')))
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_no_queries_once_bootstrapped(self):
+        User.objects.create_user(username='admin', password='pass')
+        self.middleware(self.factory.get('/'))
+
+        with self.assertNumQueries(0):
+            response = self.middleware(self.factory.get('/challenges/'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(cache.get(BOOTSTRAPPED_CACHE_KEY))
+
+    def test_shared_cache_skips_user_query_in_new_process(self):
+        cache.set(BOOTSTRAPPED_CACHE_KEY, True)
+
+        with self.assertNumQueries(0):
+            response = self.middleware(self.factory.get('/'))
+
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(METRICS_FLUSH_INTERVAL=0,
+                   CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class MetricsTests(TestCase):
+    """/metrics expone en formato Prometheus lo acumulado en el cache compartido"""
+
+    def setUp(self):
+        cache.clear()
+        CTFConfig.clear_cache()
+        metrics.reset_metrics()
+        User.objects.create_user(username='admin', password='pass')
+
+    def sample(self, text, series):
+        match = re.search(rf'^{re.escape(series)} (\S+)$', text, re.MULTILINE)
+        self.assertIsNotNone(match, series)
+        return float(match.group(1))
+
+    def test_counters_and_cumulative_histograms(self):
+        metrics.inc('ctf_submissions_total', outcome='correct')
+        metrics.inc('ctf_submissions_total', 2, outcome='correct')
+        metrics.observe('ctf_display_payload_bytes', 100)
+        metrics.observe('ctf_display_payload_bytes', 2000)
+
+        text = metrics.render_metrics()
+
+        self.assertIn('# TYPE ctf_display_payload_bytes histogram', text)
+        self.assertEqual(self.sample(text, 'ctf_submissions_total{outcome="correct"}'), 3)
+        self.assertEqual(self.sample(text, 'ctf_submissions_total{outcome="wrong"}'), 0)
+        self.assertEqual(self.sample(text, 'ctf_display_payload_bytes_bucket{le="256"}'), 1)
+        self.assertEqual(self.sample(text, 'ctf_display_payload_bytes_bucket{le="4096"}'), 2)
+        self.assertEqual(self.sample(text, 'ctf_display_payload_bytes_bucket{le="+Inf"}'), 2)
+        self.assertEqual(self.sample(text, 'ctf_display_payload_bytes_sum'), 2100)
+
+    def test_undeclared_label_value_is_rejected(self):
+        with self.assertRaises(ValueError):
+            metrics.inc('ctf_submissions_total', outcome='otro')
+
+    def test_submit_flag_records_outcome_and_stages(self):
+        category = Category.objects.create(name='Web')
+        challenge = Challenge.objects.create(title='Intro', description='-', category=category,
+                                             points=100, flag='flag{ok}')
+        player = User.objects.create_user(username='player', password='pass')
+        Team.objects.create(name='Alpha').members.add(player)
+        client = Client()
+        client.force_login(player)
+
+        url = reverse('challenges:submit', kwargs={'challenge_id': challenge.pk})
+        client.post(url, {'flag': 'flag{nope}'})
+        client.post(url, {'flag': 'flag{ok}'})
+        client.post(url, {'flag': 'flag{ok}'})
+
+        text = client.get(reverse('metrics')).content.decode()
+        for outcome in ('wrong', 'correct', 'already_solved'):
+            self.assertEqual(self.sample(text, f'ctf_submissions_total{{outcome="{outcome}"}}'), 1)
+        self.assertEqual(self.sample(text, 'ctf_submit_stage_seconds_count{stage="total"}'), 3)
+        self.assertEqual(self.sample(text, 'ctf_submit_stage_seconds_count{stage="commit"}'), 2)
+
+    def test_access_limited_to_allowed_ips_or_staff(self):
+        remote = {'REMOTE_ADDR': '203.0.113.5'}
+        self.assertEqual(Client().get(reverse('metrics'), **remote).status_code, 403)
+
+        staff = Client()
+        staff.force_login(User.objects.create_user(username='staff', password='pass', is_staff=True))
+        response = staff.get(reverse('metrics'), **remote)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class SubmitTracingTests(TestCase):
+    """Las etapas del submit quedan como spans y las trazas lentas se registran en el log"""
+
+    def setUp(self):
+        CTFConfig.clear_cache()
+        category = Category.objects.create(name='Web')
+        self.challenge = Challenge.objects.create(title='Intro', description='-', category=category,
+                                                  points=100, flag='flag{ok}')
+        self.player = User.objects.create_user(username='player', password='pass')
+        Team.objects.create(name='Alpha').members.add(self.player)
+        self.client.force_login(self.player)
+        self.url = reverse('challenges:submit', kwargs={'challenge_id': self.challenge.pk})
+
+    @override_settings(TRACE_SLOW_THRESHOLD_MS=0.001)
+    def test_slow_submit_logs_span_breakdown(self):
+        with self.assertLogs('ctf_platform.tracing', 'WARNING') as logs:
+            response = self.client.post(self.url, {'flag': 'flag{ok}'})
+
+        output = '\n'.join(logs.output)
+        self.assertIn(f'trace={response.json()["trace_id"]}', output)
+        for stage in ('config', 'lookup', 'duplicate_check', 'commit'):
+            self.assertRegex(output, rf'\n  {stage}: [\d.]+ms')
+        for stage in ('insert', 'first_blood', 'score_update'):
+            self.assertRegex(output, rf'\n    {stage}: [\d.]+ms')
+
+    @override_settings(TRACE_SLOW_THRESHOLD_MS=60_000)
+    def test_fast_submit_is_not_logged(self):
+        with self.assertNoLogs('ctf_platform.tracing', 'WARNING'):
+            response = self.client.post(self.url, {'flag': 'flag{nope}'})
+        self.assertEqual(len(response.json()['trace_id']), 16)
+
+    def test_undeclared_span_does_not_fail_the_request(self):
+        original = tracing.span
+
+        def renamed(name):
+            return original('no_declarada' if name == 'score_update' else name)
+
+        with mock.patch('challenges.scoring.span', renamed), self.assertLogs('ctf_platform.tracing', 'WARNING'):
+            response = self.client.post(self.url, {'flag': 'flag{ok}'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['success'])
+
+    def test_span_without_trace_records_nothing(self):
+        with tracing.span('commit'):
+            pass
+        self.assertIsNone(tracing.current_trace_id())
+
+
+@override_settings(PROFILER_SAMPLE_INTERVAL=0.0005)
+class RequestProfilerTests(TestCase):
+    """El staff perfila cualquier request con ?_profile y lo ve en el panel"""
+
+    def setUp(self):
+        cache.clear()
+        CTFConfig.clear_cache()
+        self.staff = Client()
+        self.staff.force_login(User.objects.create_user(username='staff', password='pass', is_staff=True))
+        self.url = reverse('scoreboard:api_scoreboard')
+
+    def test_sampling_profile_with_sql_log(self):
+        response = self.staff.get(self.url, {'_profile': '1'})
+
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual(profile.mode, 'sampling')
+        self.assertEqual(profile.view_name, 'scoreboard:api_scoreboard')
+        self.assertEqual(profile.status_code, 200)
+        self.assertGreater(profile.query_count, 0)
+        self.assertEqual(len(profile.sql_log), profile.query_count)
+        # Sin parámetros: la clave de sesión de la consulta de la sesión no se guarda
+        self.assertNotIn(self.staff.cookies['sessionid'].value, json.dumps(profile.sql_log))
+        for line in profile.collapsed_stacks.splitlines():
+            self.assertRegex(line, r'^\S.*;.* \d+$')
+
+        download = self.staff.get(reverse('admin_panel:profile_download', kwargs={'profile_id': profile.pk}))
+        self.assertIn('.folded', download['Content-Disposition'])
+        detail = self.staff.get(reverse('admin_panel:profile_detail', kwargs={'profile_id': profile.pk}))
+        self.assertContains(detail, 'Log de SQL')
+
+    def test_cprofile_mode_via_header(self):
+        response = self.staff.get(self.url, HTTP_X_PROFILE='cprofile')
+
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual(profile.mode, 'cprofile')
+        self.assertIn('Ordered by: cumulative time', profile.stats)
+
+    def test_flag_is_ignored_for_players(self):
+        player = Client()
+        player.force_login(User.objects.create_user(username='player', password='pass'))
+
+        response = player.get(self.url, {'_profile': '1'})
+
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    @override_settings(PROFILER_KEEP=2)
+    def test_old_profiles_are_pruned(self):
+        for _ in range(3):
+            self.staff.get(self.url, {'_profile': '1'})
+        self.assertEqual(RequestProfile.objects.count(), 2)
+
+
+try:
+    from .postgresql_pool.base import DatabaseWrapper as PoolDatabaseWrapper
+except (ImportError, ImproperlyConfigured):
+    # Sin psycopg el backend de PostgreSQL de Django falla con ImproperlyConfigured
+    PoolDatabaseWrapper = None
+
+
+class RequestTimingMiddlewareTests(TestCase):
+    """La instrumentación por request es opt-in y reporta base, cache y templates"""
+
+    def setUp(self):
+        cache.clear()
+        route_stats.reset()
+        self.factory = RequestFactory()
+        # Con un usuario creado QuickStart deja pasar los requests a las vistas
+        User.objects.create_user(username='admin', password='pass')
+
+    def test_disabled_middleware_is_not_used(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            RequestTimingMiddleware(lambda request: HttpResponse('ok'))
+
+    @override_settings(REQUEST_TIMING=True)
+    def test_reports_queries_cache_and_templates(self):
+        cache.set('timing:hit', 'value')
+
+        def view(request):
+            User.objects.count()
+            User.objects.exists()
+            cache.get('timing:hit')
+            cache.get('timing:miss')
+            cache.get_many(['timing:hit', 'timing:other'])
+            template = engines['django'].from_string('{% for i in items %}{{ i }}{% endfor %}')
+            return HttpResponse(template.render({'items': range(3)}))
+
+        response = RequestTimingMiddleware(view)(self.factory.get('/'))
+
+        header = response['Server-Timing']
+        self.assertIn('desc="2 queries"', header)
+        self.assertIn('desc="2 hits 2 misses"', header)
+        self.assertRegex(header, r'^total;dur=[\d.]+, db;dur=[\d.]+;.*, tpl;dur=[\d.]+$')
+        self.assertEqual(response.content, b'012')
+
+    @override_settings(REQUEST_TIMING=True)
+    def test_route_histograms(self):
+        client = Client()
+        for _ in range(3):
+            response = client.get(reverse('scoreboard:api_scoreboard'))
+            self.assertIn('Server-Timing', response)
+
+        summary = route_stats.summary()['scoreboard:api_scoreboard']
+        self.assertEqual((summary['requests'], summary['window']), (3, 3))
+        self.assertLessEqual(summary['p50_ms'], summary['max_ms'])
+
+
+@unittest.skipIf(PoolDatabaseWrapper is None, 'requiere psycopg')
+class PostgresPoolTests(TestCase):
+    """Backend PostgreSQL con pool: cada request toma y devuelve una conexión"""
+
+    def pool_settings(self, **overrides):
+        settings_dict = {
+            'NAME': 'ctf_db', 'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '',
+            'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True, 'TIME_ZONE': None,
+            'OPTIONS': {'pool': {'min_size': 1, 'max_size': 2}},
+        }
+        settings_dict.update(overrides)
+        return settings_dict
+
+    def test_pool_requires_conn_max_age_zero(self):
+        wrapper = PoolDatabaseWrapper(self.pool_settings(CONN_MAX_AGE=60), alias='pool-test')
+
+        with self.assertRaises(ImproperlyConfigured):
+            wrapper.pool
+
+    def test_pool_options_are_not_connection_params(self):
+        wrapper = PoolDatabaseWrapper(self.pool_settings(), alias='pool-test')
+
+        self.assertNotIn('pool', wrapper.get_connection_params())
+
+    @unittest.skipUnless(connection.vendor == 'postgresql' and 'pool' in connection.settings_dict['OPTIONS'],
+                         'requiere DATABASE_ENGINE=postgresql y DATABASE_POOL=True')
+    def test_close_returns_connection_to_pool(self):
+        # Wrapper propio (con su pool) para no cerrar la conexión de la transacción del test
+        wrapper = PoolDatabaseWrapper({**connection.settings_dict}, alias='pool-test')
+        try:
+            # Espera a que el pool abra sus min_size conexiones para que el conteo sea estable
+            wrapper.pool.wait()
+            wrapper.ensure_connection()
+            available = wrapper.pool.get_stats().get('pool_available', 0)
+            wrapper.close()
+
+            self.assertIsNone(wrapper.connection)
+            self.assertEqual(wrapper.pool.get_stats()['pool_available'], available + 1)
+        finally:
+            wrapper.close_pool()
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'la cola de escritura es solo para SQLite')
+@override_settings(SQLITE_WRITE_QUEUE=True)
+class SqliteWriteQueueTests(TransactionTestCase):
+    """Las escrituras corren en el hilo escritor y sus on_commit en el hilo que las pidió"""
+
+    def test_on_commit_runs_on_caller_thread(self):
+        calls = []
+
+        def write():
+            writer = threading.get_ident()
+            user = User.objects.create_user(username='queued', password='pass')
+            transaction.on_commit(lambda: calls.append((threading.get_ident(), User.objects.filter(pk=user.pk).exists())))
+            return writer
+
+        writer = run_write(write)
+
+        self.assertNotEqual(writer, threading.get_ident())
+        # El callback ya corrió al volver, en este hilo y con la escritura confirmada
+        self.assertEqual(calls, [(threading.get_ident(), True)])
+
+    def test_failed_write_discards_on_commit(self):
+        calls = []
+
+        def write():
+            transaction.on_commit(lambda: calls.append(True))
+            raise ValueError('falla')
+
+        with self.assertRaises(ValueError):
+            run_write(write)
+        self.assertEqual(calls, [])
+
+
+def build_ctf(prefix, teams, members, categories, challenges_per_category):
+    """
+    CTF sintético con bulk_create: cada equipo resuelve la mitad de los challenges
+    (con intentos fallidos antes), hay un first blood por challenge resuelto y logros
+    de equipo e individuales. Retorna los objetos que usan las URLs con parámetros.
+    """
+    start = timezone.now() - timedelta(hours=12)
+    team_codes = [code for code, info in ACHIEVEMENTS.items() if info.category == 'team']
+    user_codes = [code for code, info in ACHIEVEMENTS.items() if info.category == 'individual']
+
+    category_objs = Category.objects.bulk_create(
+        Category(name=f'{prefix} cat {idx}') for idx in range(categories)
+    )
+    challenge_objs = Challenge.objects.bulk_create(
+        Challenge(title=f'{prefix} chall {cat}-{idx}', description='-', category=category,
+                  points=100 * (idx + 1), flag=f'flag{{{prefix}-{cat}-{idx}}}')
+        for cat, category in enumerate(category_objs) for idx in range(challenges_per_category)
+    )
+    team_objs = Team.objects.bulk_create(
+        Team(name=f'{prefix} team {idx}', invite_code=f'{prefix[:3]}{idx:05d}'.upper()) for idx in range(teams)
+    )
+    user_objs = User.objects.bulk_create(
+        User(username=f'{prefix}-user-{team}-{idx}', password='!')
+        for team in range(teams) for idx in range(members)
+    )
+    Team.members.through.objects.bulk_create(
+        Team.members.through(team=team_objs[idx // members], user=user)
+        for idx, user in enumerate(user_objs)
+    )
+
+    submissions = []
+    first_bloods = {}
+    for team_idx, team in enumerate(team_objs):
+        team_users = user_objs[team_idx * members:(team_idx + 1) * members]
+        for chall_idx, challenge in enumerate(challenge_objs):
+            if (team_idx + chall_idx) % 2:
+                continue
+            user = team_users[chall_idx % members]
+            at = start + timedelta(minutes=chall_idx * 10 + team_idx)
+            submissions.append(Submission(team=team, challenge=challenge, submitted_by=user,
+                                          flag_submitted='flag{nope}', is_correct=False,
+                                          submitted_at=at - timedelta(minutes=1)))
+            submissions.append(Submission(team=team, challenge=challenge, submitted_by=user,
+                                          flag_submitted=challenge.flag, is_correct=True, submitted_at=at))
+            first_bloods.setdefault(challenge.pk, FirstBlood(
+                challenge=challenge, team=team, achieved_by=user, bonus_points=50, achieved_at=at
+            ))
+    Submission.objects.bulk_create(submissions, batch_size=500)
+    FirstBlood.objects.bulk_create(first_bloods.values())
+    Achievement.objects.bulk_create(
+        [Achievement(code=team_codes[idx % len(team_codes)], team=team, category='team')
+         for idx, team in enumerate(team_objs)] +
+        [Achievement(code=user_codes[idx % len(user_codes)], user=user, category='individual')
+         for idx, user in enumerate(user_objs)]
+    )
+
+    # bulk_create no pasa por record_solve: reconstruir contadores, ledger y puntajes
+    rebuild_counters(fix=True)
+    reconcile_scores(fix=True)
+
+    profile = RequestProfile.objects.create(
+        method='GET', path='/', status_code=200, mode='sampling', duration_ms=12.5, query_count=1,
+        sql_time_ms=0.5, sql_log=[{'sql': 'SELECT 1', 'many': False, 'ms': 0.5}],
+        collapsed_stacks='manage.py:<module>;views.py:index 3',
+    )
+
+    return {
+        'team': team_objs[0],
+        'player': user_objs[0],
+        'category': category_objs[0],
+        'challenge': challenge_objs[0],
+        'profile': profile,
+    }
+
+
+# (nombre de la URL, parámetros, usuario, método, presupuesto de queries)
+# Usuarios: None (anónimo), 'player' (miembro de un equipo) o 'admin'
+QUERY_BUDGETS = [
+    ('quickstart:welcome', {}, None, 'get', 1),
+    ('quickstart:create_admin', {}, None, 'get', 1),
+    ('quickstart:configure_ctf', {}, 'admin', 'get', 4),
+    ('quickstart:complete', {}, 'admin', 'get', 3),
+    ('admin_panel:dashboard', {}, 'admin', 'get', 19),
+    ('admin_panel:challenges_list', {}, 'admin', 'get', 11),
+    ('admin_panel:challenge_create', {}, 'admin', 'get', 5),
+    ('admin_panel:challenge_edit', {'challenge_id': 'challenge'}, 'admin', 'get', 10),
+    ('admin_panel:challenge_delete', {'challenge_id': 'challenge'}, 'admin', 'get', 8),
+    ('admin_panel:categories_list', {}, 'admin', 'get', 5),
+    ('admin_panel:category_create', {}, 'admin', 'get', 4),
+    ('admin_panel:category_edit', {'category_id': 'category'}, 'admin', 'get', 7),
+    ('admin_panel:category_delete', {'category_id': 'category'}, 'admin', 'get', 5),
+    ('admin_panel:teams_list', {}, 'admin', 'get', 10),
+    ('admin_panel:team_create', {}, 'admin', 'get', 4),
+    ('admin_panel:team_detail', {'team_id': 'team'}, 'admin', 'get', 16),
+    ('admin_panel:team_edit', {'team_id': 'team'}, 'admin', 'get', 9),
+    ('admin_panel:team_delete', {'team_id': 'team'}, 'admin', 'get', 10),
+    ('admin_panel:users_list', {}, 'admin', 'get', 12),
+    ('admin_panel:user_detail', {'user_id': 'player'}, 'admin', 'get', 20),
+    ('admin_panel:user_edit', {'user_id': 'player'}, 'admin', 'get', 7),
+    ('admin_panel:user_ban', {'user_id': 'player'}, 'admin', 'get', 5),
+    ('admin_panel:user_delete', {'user_id': 'player'}, 'admin', 'get', 7),
+    ('admin_panel:ctf_config', {}, 'admin', 'get', 8),
+    ('admin_panel:submissions_list', {}, 'admin', 'get', 8),
+    ('admin_panel:profiles_list', {}, 'admin', 'get', 5),
+    ('admin_panel:profile_detail', {'profile_id': 'profile'}, 'admin', 'get', 5),
+    ('admin_panel:profile_download', {'profile_id': 'profile'}, 'admin', 'get', 4),
+    ('admin_panel:test_websocket', {}, 'admin', 'get', 4),
+    ('admin_panel:broadcast_test_event', {}, 'admin', 'get', 3),
+    ('login', {}, None, 'get', 2),
+    ('metrics', {}, None, 'get', 1),
+    ('request_timing', {}, 'admin', 'get', 3),
+    ('logout', {}, 'player', 'get', 5),
+    ('register', {}, None, 'get', 2),
+    ('users:profile', {}, 'player', 'get', 9),
+    ('scoreboard:dashboard', {}, 'player', 'get', 12),
+    ('scoreboard:public_display', {}, 'admin', 'get', 9),
+    ('scoreboard:achievements', {}, 'player', 'get', 9),
+    ('scoreboard:api_scoreboard', {}, None, 'get', 7),
+    ('scoreboard:api_display', {}, 'admin', 'get', 9),
+    ('scoreboard:api_display_metrics', {}, 'admin', 'get', 3),
+    ('challenges:list', {}, 'player', 'get', 9),
+    ('challenges:detail', {'challenge_id': 'challenge'}, 'player', 'get', 8),
+    ('challenges:submit', {'challenge_id': 'challenge'}, 'player', 'post', 10),
+    ('teams:team_list', {}, 'player', 'get', 4),
+    ('teams:list', {}, 'player', 'get', 9),
+    ('teams:register', {}, 'player', 'get', 6),
+    ('teams:join', {}, 'player', 'get', 6),
+    ('teams:team_detail', {'team_id': 'team'}, 'player', 'get', 19),
+    ('teams:leave', {'team_id': 'team'}, 'player', 'get', 6),
+]
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class QueryBudgetTests(TestCase):
+    """
+    Cada URL ejecuta una cantidad acotada de queries que no crece con los datos:
+    se mide con un CTF chico y otro grande, con el cache vacío (peor caso).
+    """
+
+    SMALL = {'teams': 10, 'members': 2, 'categories': 3, 'challenges_per_category': 3}
+    LARGE = {'teams': 200, 'members': 4, 'categories': 6, 'challenges_per_category': 5}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', password='pass')
+        CTFConfig.clear_cache()
+        CTFConfig.get_config()
+
+    def iter_url_names(self, patterns=None, namespace=''):
+        for pattern in get_resolver().url_patterns if patterns is None else patterns:
+            if isinstance(pattern, URLResolver):
+                inner = f'{namespace}{pattern.namespace}:' if pattern.namespace else namespace
+                yield from self.iter_url_names(pattern.url_patterns, inner)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                yield f'{namespace}{pattern.name}'
+
+    def measure(self, subjects, name, params, user, method):
+        """Queries de un request con el cache vacío; los cambios del request se deshacen"""
+        url = reverse(name, kwargs={key: subjects[value].pk for key, value in params.items()})
+        client = Client()
+        if user is not None:
+            client.force_login(subjects[user] if user != 'admin' else self.admin)
+
+        cache.clear()
+        CTFConfig.clear_cache()
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                if method == 'post':
+                    response = client.post(url, {'flag': 'flag{nope}'})
+                else:
+                    response = client.get(url)
+            transaction.set_rollback(True)
+
+        self.assertLess(response.status_code, 500, url)
+        return [query['sql'] for query in queries.captured_queries]
+
+    def growing_queries(self, small, large):
+        """Queries (normalizadas) que se repiten más veces con más datos"""
+        def normalize(sql):
+            return re.sub(r"'[^']*'|\b[0-9a-f]{32}\b|\b\d+\b", '?', sql)
+        small_counts = Counter(normalize(sql) for sql in small)
+        large_counts = Counter(normalize(sql) for sql in large)
+        return [f'{count}x (antes {small_counts[sql]}x) {sql}' for sql, count in large_counts.items()
+                if count > small_counts[sql]]
+
+    def test_every_url_has_a_budget(self):
+        budgeted = {name for name, *_ in QUERY_BUDGETS}
+        missing = sorted(set(self.iter_url_names()) - budgeted)
+        self.assertEqual(missing, [], 'URLs sin presupuesto de queries en QUERY_BUDGETS')
+
+    def test_query_counts_do_not_grow_with_data(self):
+        subjects = {'admin': self.admin}
+        subjects.update(build_ctf('small', **self.SMALL))
+        small = {spec[0]: self.measure(subjects, *spec[:4]) for spec in QUERY_BUDGETS}
+
+        subjects.update(build_ctf('large', **self.LARGE))
+        for name, params, user, method, budget in QUERY_BUDGETS:
+            with self.subTest(url=name):
+                large = self.measure(subjects, name, params, user, method)
+                growing = '\n'.join(self.growing_queries(small[name], large))
+                self.assertEqual(len(large), len(small[name]),
+                                 f'{name}: {len(small[name])} -> {len(large)} queries\n{growing}')
+                self.assertLessEqual(len(large), budget, f'{name}: {len(large)} > {budget}\n' + '\n'.join(large))
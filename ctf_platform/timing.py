@@ -0,0 +1,211 @@
+"""
+Instrumentación por request (opt-in con ``REQUEST_TIMING=True``).
+
+``RequestTimingMiddleware`` mide en cada request el tiempo total, la cantidad y
+el tiempo de queries, los hits y misses del cache y el tiempo de render de
+templates. Lo publica en el header ``Server-Timing`` (visible en la pestaña de red
+del navegador) y lo acumula en histogramas por ruta con las últimas
+``REQUEST_TIMING_WINDOW`` muestras, consultables en ``/api/request-timing/`` (staff).
+
+Las mediciones del request en curso viven en un ``ContextVar``: bajo ASGI cada
+request tiene su propio contexto aunque comparta hilo con otros. El cache y los
+templates se instrumentan una sola vez por proceso envolviendo sus métodos; sin un
+request medido en el contexto los envoltorios solo delegan. Con la instrumentación
+desactivada el middleware se descarta al iniciar (``MiddlewareNotUsed``) y no se
+envuelve nada.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+_current = ContextVar('request_timings', default=None)
+_instrumented = False
+_instrument_lock = threading.Lock()
+# Centinela de ``cache.get``: distingue un miss de un valor guardado igual a ``default``
+_MISSING = object()
+
+
+class RequestTimings:
+    """Mediciones de un request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_time = 0.0
+        self.template_time = 0.0
+        self._template_depth = 0
+        self._cache_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """``execute_wrapper`` de las conexiones durante el request"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def _timed_cache_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        timings = _current.get()
+        if timings is None or timings._cache_depth:
+            return get(self, key, default, version)
+        start = time.perf_counter()
+        value = get(self, key, _MISSING, version)
+        timings.cache_time += time.perf_counter() - start
+        if value is _MISSING:
+            timings.cache_misses += 1
+            return default
+        timings.cache_hits += 1
+        return value
+    return wrapper
+
+
+def _timed_cache_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(self, keys, version=None):
+        timings = _current.get()
+        if timings is None:
+            return get_many(self, keys, version)
+        keys = list(keys)
+        # BaseCache.get_many llama a get por cada clave: no contarlas dos veces
+        timings._cache_depth += 1
+        start = time.perf_counter()
+        try:
+            values = get_many(self, keys, version)
+        finally:
+            timings.cache_time += time.perf_counter() - start
+            timings._cache_depth -= 1
+        timings.cache_hits += len(values)
+        timings.cache_misses += len(keys) - len(values)
+        return values
+    return wrapper
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, context):
+        timings = _current.get()
+        # Los {% include %} y {% extends %} renderizan templates anidados: solo se mide el externo
+        if timings is None or timings._template_depth:
+            return render(self, context)
+        timings._template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            timings.template_time += time.perf_counter() - start
+            timings._template_depth -= 1
+    return wrapper
+
+
+def instrument():
+    """Envuelve ``get``/``get_many`` de los backends de cache configurados y el render de templates"""
+    global _instrumented
+    with _instrument_lock:
+        if _instrumented:
+            return
+        for backend_class in {type(caches[alias]) for alias in settings.CACHES}:
+            backend_class.get = _timed_cache_get(backend_class.get)
+            backend_class.get_many = _timed_cache_get_many(backend_class.get_many)
+        Template.render = _timed_render(Template.render)
+        _instrumented = True
+
+
+class RouteStats:
+    """Histogramas por ruta con las últimas muestras (ventana deslizante en memoria)"""
+
+    def __init__(self, window):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._totals = defaultdict(int)
+
+    def record(self, route, total, timings):
+        with self._lock:
+            self._samples[route].append((total, timings.db_time, timings.queries, timings.template_time))
+            self._totals[route] += 1
+
+    def summary(self):
+        """Por ruta: requests totales y percentiles (ms) de la ventana"""
+        with self._lock:
+            samples = {route: list(values) for route, values in self._samples.items()}
+            totals = dict(self._totals)
+
+        def percentile(values, fraction):
+            return values[min(int(len(values) * fraction), len(values) - 1)]
+
+        result = {}
+        for route, values in sorted(samples.items()):
+            wall = sorted(sample[0] * 1000 for sample in values)
+            db = sorted(sample[1] * 1000 for sample in values)
+            result[route] = {
+                'requests': totals[route],
+                'window': len(values),
+                'p50_ms': round(percentile(wall, 0.50), 2),
+                'p95_ms': round(percentile(wall, 0.95), 2),
+                'p99_ms': round(percentile(wall, 0.99), 2),
+                'max_ms': round(wall[-1], 2),
+                'db_p95_ms': round(percentile(db, 0.95), 2),
+                'queries_avg': round(sum(sample[2] for sample in values) / len(values), 1),
+                'template_avg_ms': round(sum(sample[3] for sample in values) * 1000 / len(values), 2),
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+route_stats = RouteStats(getattr(settings, 'REQUEST_TIMING_WINDOW', 1000))
+
+
+def server_timing_header(total, timings):
+    """Valor del header ``Server-Timing`` (duraciones en milisegundos)"""
+    return ', '.join([
+        f'total;dur={total * 1000:.1f}',
+        f'db;dur={timings.db_time * 1000:.1f};desc="{timings.queries} queries"',
+        f'cache;dur={timings.cache_time * 1000:.1f};desc="{timings.cache_hits} hits {timings.cache_misses} misses"',
+        f'tpl;dur={timings.template_time * 1000:.1f}',
+    ])
+
+
+class RequestTimingMiddleware:
+    """Mide cada request y agrega el header ``Server-Timing`` (ver el docstring del módulo)"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        instrument()
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - start
+
+        match = request.resolver_match
+        route_stats.record(match.view_name if match else 'sin ruta', total, timings)
+        response['Server-Timing'] = server_timing_header(total, timings)
+        return response
@@ -0,0 +1,127 @@
+"""
+Trazas por etapa del hot path (submit y su evento en el worker).
+
+Una traza agrupa los spans de una operación bajo un ``trace_id`` corto. Los spans
+se abren con ``span('nombre')`` en cualquier punto del código: si no hay una traza
+en curso en el contexto no registran nada, así que las funciones compartidas (por
+ejemplo ``commit_submission`` desde ``replay_ctf`` o los tests) no pagan nada.
+
+``submit_flag`` devuelve el ``trace_id`` en la respuesta (JSON y header
+``X-Trace-Id``); el evento del worker continúa la traza con el mismo id y lo lleva
+hasta el evento WebSocket del display. Al terminar, cada span alimenta el
+histograma de etapas de ``ctf_platform.metrics`` y, si la traza superó
+``TRACE_SLOW_THRESHOLD_MS``, se registra el desglose en el log ``ctf_platform.tracing``.
+"""
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from django.conf import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('trace', default=None)
+
+
+class Trace:
+    """Spans de una operación: (nombre, profundidad, inicio relativo, duración) en segundos"""
+
+    def __init__(self, name, trace_id=None, metric=None):
+        self.name = name
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.metric = metric
+        self.spans = []
+        self.total = None
+        self._started = time.perf_counter()
+        self._depth = 0
+
+    def ordered_spans(self):
+        """Spans en orden de inicio (los anidados se cierran y registran antes que su padre)"""
+        return sorted(self.spans, key=lambda span: (span[2], span[1]))
+
+    def breakdown(self):
+        """Desglose legible: una línea por span, indentada según el anidamiento"""
+        lines = [f'{self.name} trace={self.trace_id} total={self.total * 1000:.1f}ms']
+        for name, depth, offset, duration in self.ordered_spans():
+            lines.append(f'{"  " * (depth + 1)}{name}: {duration * 1000:.1f}ms (+{offset * 1000:.1f}ms)')
+        return '\n'.join(lines)
+
+    def as_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'total_ms': round(self.total * 1000, 2),
+            'spans': [
+                {'name': name, 'depth': depth, 'offset_ms': round(offset * 1000, 2),
+                 'duration_ms': round(duration * 1000, 2)}
+                for name, depth, offset, duration in self.ordered_spans()
+            ],
+        }
+
+    def finish(self):
+        self.total = time.perf_counter() - self._started
+        if self.metric:
+            # Corre tras el commit: un span sin etapa declarada en la métrica se omite
+            # (con aviso) en vez de convertir en error una operación ya confirmada
+            stages = metrics.METRICS[self.metric].labels['stage']
+            for name, _depth, _offset, duration in self.spans:
+                if name in stages:
+                    metrics.observe(self.metric, duration, stage=name)
+                else:
+                    logger.warning('Span "%s" sin etapa declarada en %s; no se registra', name, self.metric)
+            metrics.observe(self.metric, self.total, stage='total')
+
+        threshold = getattr(settings, 'TRACE_SLOW_THRESHOLD_MS', 250)
+        if threshold and self.total * 1000 >= threshold:
+            logger.warning('Operación lenta (umbral %sms)\n%s', threshold, self.breakdown())
+
+
+@contextmanager
+def start_trace(name, trace_id=None, metric=None):
+    """Abre una traza en el contexto actual y la cierra (métricas y log de lentas) al salir"""
+    trace = Trace(name, trace_id=trace_id, metric=metric)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+        trace.finish()
+
+
+@contextmanager
+def span(name):
+    """Mide el bloque como un span de la traza en curso (no hace nada sin traza)"""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    depth = trace._depth
+    trace._depth += 1
+    try:
+        yield
+    finally:
+        trace._depth = depth
+        trace.spans.append((name, depth, start - trace._started, time.perf_counter() - start))
+
+
+def current_trace_id():
+    trace = _current.get()
+    return trace.trace_id if trace else None
+
+
+def traced(name, metric=None):
+    """Decorador de vistas: traza el request completo y agrega el header ``X-Trace-Id``"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with start_trace(name, metric=metric) as trace:
+                response = view(request, *args, **kwargs)
+            response['X-Trace-Id'] = trace.trace_id
+            return response
+        return wrapper
+    return decorator
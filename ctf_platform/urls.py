@@ -6,6 +6,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from .auth_views import login_view, logout_view, register_view, admin_dashboard
+from .views import request_timing, metrics
 
 urlpatterns = [
     path('quickstart/', include('quickstart.urls')),
@@ -14,6 +15,8 @@ urlpatterns = [
     path('logout/', logout_view, name='logout'),
     path('register/', register_view, name='register'),
     path('users/', include('users.urls')),
+    path('api/request-timing/', request_timing, name='request_timing'),
+    path('metrics', metrics, name='metrics'),
     path('', include('scoreboard.urls')),
     path('challenges/', include('challenges.urls')),
     path('teams/', include('teams.urls')),
@@ -1,8 +1,14 @@
 """
 Custom error handlers for CTF platform.
 """
+from django.contrib.auth.decorators import user_passes_test
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
 from django.shortcuts import render
 import uuid
+from .auth_views import is_admin
+from .metrics import render_metrics
+from .timing import route_stats
 
 
 def custom_400(request, exception=None):
@@ -35,3 +41,20 @@ def custom_500(request):
         'request_id': str(uuid.uuid4())[:8].upper(),
     }
     return render(request, '500.html', context, status=500)
+
+
+@user_passes_test(is_admin)
+def request_timing(request):
+    """Histogramas por ruta de RequestTimingMiddleware (vacío si REQUEST_TIMING está desactivado)"""
+    return JsonResponse({'routes': route_stats.summary()})
+
+
+def metrics(request):
+    """
+    Métricas en formato Prometheus; accesible desde METRICS_ALLOWED_IPS (el scraper
+    local) o para staff. Se responde 403 en vez de redirigir al login.
+    """
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+    if request.META.get('REMOTE_ADDR') not in allowed_ips and not is_admin(request.user):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
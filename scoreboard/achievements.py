@@ -1,16 +1,35 @@
 # Sistema de Logros para CTF
-from django.utils import timezone
+"""
+Motor de logros por eventos.
+
+Cada logro declara los eventos a los que reacciona (solve, fail, first blood,
+cambio de ranking) y una condición que se evalúa sobre los contadores
+incrementales de ``challenges.stats`` (``TeamStats``/``UserStats``) y los datos del
+propio evento. Ante un evento solo se evalúan los logros que reaccionan a él y que
+el equipo o jugador todavía no tiene: el costo por solve depende de las reglas
+disparadas, no del historial.
+"""
+from functools import cached_property
 from datetime import timedelta
+from django.db.models import Q
+from django.utils import timezone
+
+# Eventos a los que puede reaccionar un logro
+SOLVE = 'solve'
+FAIL = 'fail'
+FIRST_BLOOD = 'first_blood'
+RANK_CHANGE = 'rank_change'
 
 class AchievementDefinition:
     """Definición de un logro"""
-    def __init__(self, code, name, description, icon, category, check_func):
+    def __init__(self, code, name, description, icon, category, events, check):
         self.code = code
         self.name = name
         self.description = description
         self.icon = icon
         self.category = category  # 'team' o 'individual'
-        self.check_func = check_func
+        self.events = frozenset(events)
+        self.check = check  # check(ctx: AchievementContext) -> bool
 
 # Definiciones de logros
 ACHIEVEMENTS = {
@@ -21,7 +40,8 @@ ACHIEVEMENTS = {
         description='¡Sangre fresca! Sé el primer equipo en resolver cualquier challenge del CTF. La velocidad y la astucia son tu mejor arma.',
         icon='🩸',
         category='team',
-        check_func=lambda team, user=None: team.first_bloods.exists()
+        events=[FIRST_BLOOD],
+        check=lambda ctx: True
     ),
     'speed_demon': AchievementDefinition(
         code='speed_demon',
@@ -29,10 +49,8 @@ ACHIEVEMENTS = {
         description='Velocidad supersónica. Resuelve un challenge en menos de 5 minutos desde el inicio del CTF. ¿Quién necesita tiempo para pensar?',
         icon='⚡',
         category='team',
-        check_func=lambda team, user=None: team.submissions.filter(
-            is_correct=True,
-            submitted_at__lte=timezone.now() - timedelta(minutes=5)
-        ).exists()
+        events=[SOLVE],
+        check=lambda ctx: check_speed(ctx)
     ),
     'night_owl': AchievementDefinition(
         code='night_owl',
@@ -40,11 +58,8 @@ ACHIEVEMENTS = {
         description='El búho nocturno nunca duerme. Resuelve un challenge entre las 2:00 AM y 6:00 AM. El café es opcional, la dedicación no.',
         icon='🦉',
         category='team',
-        check_func=lambda team, user=None: team.submissions.filter(
-            is_correct=True,
-            submitted_at__hour__gte=2,
-            submitted_at__hour__lt=6
-        ).exists()
+        events=[SOLVE],
+        check=lambda ctx: 2 <= ctx.local_time.hour < 6
     ),
     'perfectionist': AchievementDefinition(
         code='perfectionist',
@@ -52,10 +67,8 @@ ACHIEVEMENTS = {
         description='Perfección absoluta. Resuelve 5 challenges sin un solo intento fallido. Cero errores, solo victorias. ¿Primera vez o simplemente genio?',
         icon='💯',
         category='team',
-        check_func=lambda team, user=None: (
-            team.submissions.filter(is_correct=True).count() >= 5 and
-            team.submissions.filter(is_correct=False).count() == 0
-        )
+        events=[SOLVE],
+        check=lambda ctx: ctx.team_stats.solved_count >= 5 and ctx.team_stats.failed_count == 0
     ),
     'jack_of_all_trades': AchievementDefinition(
         code='jack_of_all_trades',
@@ -63,7 +76,8 @@ ACHIEVEMENTS = {
         description='Versatilidad máxima. Demuestra tu dominio resolviendo al menos un challenge de cada categoría disponible. Web, crypto, pwn... ¡lo que sea!',
         icon='🎭',
         category='team',
-        check_func=lambda team, user=None: check_all_categories(team)
+        events=[SOLVE],
+        check=lambda ctx: 0 < ctx.category_total <= ctx.team_stats.solved_category_count
     ),
     'blood_thirsty': AchievementDefinition(
         code='blood_thirsty',
@@ -71,7 +85,8 @@ ACHIEVEMENTS = {
         description='Sed de sangre insaciable. Consigue 3 o más first bloods. Siempre primeros, siempre hambrientos, siempre dominantes.',
         icon='🔴',
         category='team',
-        check_func=lambda team, user=None: team.first_bloods.count() >= 3
+        events=[FIRST_BLOOD],
+        check=lambda ctx: ctx.team.first_blood_count >= 3
     ),
     'unstoppable': AchievementDefinition(
         code='unstoppable',
@@ -79,7 +94,8 @@ ACHIEVEMENTS = {
         description='Imparable como un cohete. Resuelve 3 challenges consecutivos en menos de 30 minutos. La velocidad se encuentra con la precisión.',
         icon='🚀',
         category='team',
-        check_func=lambda team, user=None: check_solving_streak(team)
+        events=[SOLVE],
+        check=lambda ctx: check_solving_streak(ctx.team_stats)
     ),
     'half_way': AchievementDefinition(
         code='half_way',
@@ -87,7 +103,8 @@ ACHIEVEMENTS = {
         description='Punto medio alcanzado. Has resuelto el 50% de todos los challenges disponibles. La meta está más cerca, pero el camino continúa.',
         icon='📊',
         category='team',
-        check_func=lambda team, user=None: check_half_challenges(team)
+        events=[SOLVE],
+        check=lambda ctx: 0 < ctx.challenge_total <= ctx.team_stats.solved_count * 2
     ),
     'completionist': AchievementDefinition(
         code='completionist',
@@ -95,7 +112,8 @@ ACHIEVEMENTS = {
         description='¡La corona es tuya! Has conquistado TODOS los challenges del CTF. Nada se interpone en tu camino. Leyenda absoluta.',
         icon='👑',
         category='team',
-        check_func=lambda team, user=None: check_all_challenges(team)
+        events=[SOLVE],
+        check=lambda ctx: 0 < ctx.challenge_total <= ctx.team_stats.solved_count
     ),
     'comeback_kid': AchievementDefinition(
         code='comeback_kid',
@@ -103,7 +121,8 @@ ACHIEVEMENTS = {
         description='¡El regreso épico! Escala 5 posiciones o más en el ranking del CTF. Nunca subestimes a un equipo decidido.',
         icon='📈',
         category='team',
-        check_func=lambda team, user=None: False  # Se verifica manualmente en views
+        events=[RANK_CHANGE],
+        check=lambda ctx: ctx.old_rank - ctx.new_rank >= 5
     ),
     
     # Logros Individuales
@@ -113,7 +132,8 @@ ACHIEVEMENTS = {
         description='Guerrero solitario. Resuelve 10 challenges personalmente. Tu equipo te necesita, pero tú solo te necesitas a ti mismo.',
         icon='⚔️',
         category='individual',
-        check_func=lambda team, user: user.submissions.filter(is_correct=True).count() >= 10
+        events=[SOLVE],
+        check=lambda ctx: ctx.user_stats.solved_count >= 10
     ),
     'early_bird': AchievementDefinition(
         code='early_bird',
@@ -121,7 +141,8 @@ ACHIEVEMENTS = {
         description='El madrugador captura el gusano. Sé el primer jugador en resolver cualquier challenge. Primera sangre, gloria individual.',
         icon='🐦',
         category='individual',
-        check_func=lambda team, user: user.first_bloods.exists()
+        events=[FIRST_BLOOD],
+        check=lambda ctx: True
     ),
     'persistent': AchievementDefinition(
         code='persistent',
@@ -129,7 +150,8 @@ ACHIEVEMENTS = {
         description='La persistencia vence la resistencia. Resuelve un challenge después de 10 intentos fallidos. Nunca te rindas, nunca te detengas.',
         icon='💪',
         category='individual',
-        check_func=lambda team, user: check_persistence(user)
+        events=[SOLVE],
+        check=lambda ctx: ctx.user_stats.max_failures_before_solve >= 10
     ),
     'sharpshooter': AchievementDefinition(
         code='sharpshooter',
@@ -137,114 +159,124 @@ ACHIEVEMENTS = {
         description='Precisión quirúrgica. Resuelve 3 challenges con 100% de precisión sin ningún error. Cada disparo cuenta, cada flag es perfecta.',
         icon='🎯',
         category='individual',
-        check_func=lambda team, user: check_accuracy(user)
+        events=[SOLVE],
+        check=lambda ctx: ctx.user_stats.first_try_solve_count >= 3
     ),
 }
 
-def check_all_categories(team):
-    """Verifica si el equipo resolvió challenges de todas las categorías"""
-    from challenges.models import Category
-    total_categories = Category.objects.count()
-    if total_categories == 0:
-        return False
+# Logros por evento, en el orden de ACHIEVEMENTS
+RULES_BY_EVENT = {
+    event: [rule for rule in ACHIEVEMENTS.values() if event in rule.events]
+    for event in (SOLVE, FAIL, FIRST_BLOOD, RANK_CHANGE)
+}
+
+class AchievementContext:
+    """
+    Datos de un evento para evaluar los logros. Todo lo que requiere una query se
+    carga la primera vez que una regla lo pide, así que las reglas ya obtenidas no
+    cuestan nada.
+    """
+    def __init__(self, team, user=None, submission=None, old_rank=None, new_rank=None):
+        self.team = team
+        self.user = user
+        self.submission = submission
+        self.old_rank = old_rank
+        self.new_rank = new_rank
     
-    solved_categories = team.submissions.filter(
-        is_correct=True
-    ).values('challenge__category').distinct().count()
+    @cached_property
+    def team_stats(self):
+        from challenges.models import TeamStats
+        return TeamStats.objects.filter(pk=self.team.pk).first() or TeamStats(team=self.team)
     
-    return solved_categories >= total_categories
-
-def check_solving_streak(team):
-    """Verifica si resolvió 3 challenges seguidos en menos de 30 minutos"""
-    submissions = team.submissions.filter(is_correct=True).order_by('submitted_at')[:3]
+    @cached_property
+    def user_stats(self):
+        from challenges.models import UserStats
+        return UserStats.objects.filter(pk=self.user.pk).first() or UserStats(user=self.user)
     
-    if submissions.count() < 3:
-        return False
+    @cached_property
+    def category_total(self):
+        from challenges.models import Category
+        return Category.objects.count()
     
-    first = submissions[0].submitted_at
-    third = submissions[2].submitted_at
+    @cached_property
+    def challenge_total(self):
+        from challenges.models import Challenge
+        return Challenge.objects.count()
     
-    return (third - first).total_seconds() <= 1800  # 30 minutos
+    @cached_property
+    def local_time(self):
+        """Hora del solve en la zona horaria del proyecto (TIME_ZONE, America/Santiago), como el lookup ``__hour``"""
+        return timezone.localtime(self.submission.submitted_at)
 
-def check_half_challenges(team):
-    """Verifica si resolvió al menos el 50% de los challenges"""
-    from challenges.models import Challenge
-    total_challenges = Challenge.objects.count()
-    if total_challenges == 0:
+def check_speed(ctx):
+    """Verifica si el solve llegó en los primeros 5 minutos del CTF"""
+    from .models import CTFConfig
+    start_time = CTFConfig.get_config().start_time
+    if not start_time:
         return False
-    
-    solved = team.submissions.filter(is_correct=True).values('challenge').distinct().count()
-    return solved >= (total_challenges / 2)
+    return timedelta(0) <= ctx.submission.submitted_at - start_time <= timedelta(minutes=5)
 
-def check_all_challenges(team):
-    """Verifica si resolvió todos los challenges"""
-    from challenges.models import Challenge
-    total_challenges = Challenge.objects.count()
-    if total_challenges == 0:
+def check_solving_streak(stats):
+    """Verifica si los primeros 3 solves del equipo entraron en menos de 30 minutos"""
+    if not stats.third_solve_at:
         return False
-    
-    solved = team.submissions.filter(is_correct=True).values('challenge').distinct().count()
-    return solved >= total_challenges
+    return (stats.third_solve_at - stats.first_solve_at).total_seconds() <= 1800  # 30 minutos
 
-def check_persistence(user):
-    """Verifica si resolvió después de 10 intentos fallidos"""
-    from challenges.models import Submission
-    
-    # Buscar challenges donde tuvo 10+ fallos antes de acertar
-    user_challenges = user.submissions.values('challenge').distinct()
-    
-    for challenge_dict in user_challenges:
-        challenge_id = challenge_dict['challenge']
-        submissions = user.submissions.filter(
-            challenge_id=challenge_id
-        ).order_by('submitted_at')
-        
-        failed_count = 0
-        for sub in submissions:
-            if not sub.is_correct:
-                failed_count += 1
-            else:
-                if failed_count >= 10:
-                    return True
-                break
-    
-    return False
+def earned_codes(team, user=None):
+    """Códigos ya obtenidos por el equipo y el jugador, en una query"""
+    from .models import Achievement
+    condition = Q(team=team, category='team')
+    if user:
+        condition |= Q(user=user, category='individual')
+    return set(Achievement.objects.filter(condition).values_list('code', flat=True))
 
-def check_accuracy(user):
-    """Verifica si tiene 3 challenges resueltos sin errores"""
-    from challenges.models import Submission
-    
-    # Obtener challenges resueltos
-    solved_challenges = user.submissions.filter(is_correct=True).values_list('challenge_id', flat=True)
-    
-    perfect_count = 0
-    for challenge_id in solved_challenges:
-        # Verificar si solo tiene 1 submission (la correcta) para este challenge
-        total_attempts = user.submissions.filter(challenge_id=challenge_id).count()
-        if total_attempts == 1:
-            perfect_count += 1
-            if perfect_count >= 3:
-                return True
-    
-    return False
+def check_achievements(ctx, events, earned=frozenset()):
+    """
+    Evalúa los logros que reaccionan a ``events`` y que no están en ``earned``.
+    Retorna los códigos conseguidos, en el orden de ACHIEVEMENTS
+    """
+    codes = []
+    for code, achievement in ACHIEVEMENTS.items():
+        if code in earned or not achievement.events & set(events):
+            continue
+        if achievement.category == 'individual' and ctx.user is None:
+            continue
+        if achievement.check(ctx):
+            codes.append(code)
+    return codes
 
-def check_achievements(team, user=None):
+def award_achievements(team, user=None, events=(SOLVE,), **details):
     """
-    Verifica qué logros ha conseguido un equipo o usuario
-    Retorna una lista de códigos de logros conseguidos
+    Evalúa y guarda los logros de un evento (``details``: submission, old_rank, new_rank).
+    Retorna los logros individuales nuevos para las notificaciones del display
     """
-    earned = []
+    from .models import Achievement
     
-    for code, achievement in ACHIEVEMENTS.items():
-        try:
-            if achievement.check_func(team, user):
-                earned.append(code)
-        except Exception as e:
-            # Si hay error en la verificación, simplemente no otorgar el logro
-            print(f"Error checking achievement {code}: {e}")
+    if not any(RULES_BY_EVENT.get(event) for event in events):
+        return []
+    
+    ctx = AchievementContext(team, user, **details)
+    new_achievements = []
+    for code in check_achievements(ctx, events, earned_codes(team, user)):
+        achievement = ACHIEVEMENTS[code]
+        if achievement.category == 'team':
+            # Los logros de equipo se guardan pero no se notifican en el display
+            Achievement.objects.get_or_create(code=code, team=team, defaults={'category': 'team'})
             continue
+        
+        _, created = Achievement.objects.get_or_create(code=code, user=user, defaults={'category': 'individual'})
+        if created:
+            new_achievements.append({
+                'type': 'individual',
+                'code': code,
+                'name': achievement.name,
+                'icon': achievement.icon,
+                'user': user.username,
+                'team': team.name,
+                'color': team.color,
+            })
     
-    return earned
+    return new_achievements
 
 def get_achievement_info(code):
     """Obtiene la información de un logro por su código"""
@@ -5,3 +5,6 @@ class ScoreboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'scoreboard'
     verbose_name = 'Scoreboard'
+
+    def ready(self):
+        from . import signals  # noqa: F401
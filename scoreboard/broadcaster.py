@@ -0,0 +1,118 @@
+"""
+Broadcaster del display con agrupación por ventana de tiempo.
+
+Una ráfaga de solves (por ejemplo 30 en el mismo segundo) no debe provocar 30
+reconstrucciones del snapshot y 30 ``group_send`` casi idénticos. El primer
+evento abre una ventana de ``SCOREBOARD_DISPLAY_COALESCE_WINDOW`` segundos; los
+eventos que llegan durante la ventana se acumulan y al cerrarse se publica un
+solo delta con todos ellos, de modo que el display pueda animar cada solve,
+first blood y logro por separado.
+
+Los contadores (solicitudes, broadcasts, eventos y recomputaciones evitadas) se
+guardan en el cache para poder consultarlos desde cualquier proceso.
+"""
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from ctf_platform import metrics
+from .display import publish_display_update
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY_PREFIX = 'scoreboard:display:metrics:'
+METRIC_NAMES = ('requests', 'broadcasts', 'events', 'recomputations_avoided')
+
+
+def _incr_metric(name, delta=1):
+    key = METRICS_KEY_PREFIX + name
+    if not cache.add(key, delta, timeout=None):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            cache.set(key, delta, timeout=None)
+
+
+def get_broadcast_metrics():
+    """Contadores acumulados del broadcaster del display"""
+    values = cache.get_many([METRICS_KEY_PREFIX + name for name in METRIC_NAMES])
+    return {name: values.get(METRICS_KEY_PREFIX + name, 0) for name in METRIC_NAMES}
+
+
+def reset_broadcast_metrics():
+    """Reinicia los contadores del broadcaster"""
+    cache.delete_many([METRICS_KEY_PREFIX + name for name in METRIC_NAMES])
+
+
+class CoalescingBroadcaster:
+    """Agrupa las actualizaciones del display en un solo broadcast por ventana"""
+
+    def __init__(self, window=None):
+        self._window = window
+        self._lock = threading.Lock()
+        self._pending_events = []
+        self._pending_requests = 0
+        self._timer = None
+
+    @property
+    def window(self):
+        """Duración de la ventana en segundos (0 publica de inmediato)"""
+        if self._window is not None:
+            return self._window
+        return getattr(settings, 'SCOREBOARD_DISPLAY_COALESCE_WINDOW', 0.5)
+
+    def schedule(self, events=None):
+        """Encola una actualización del display con sus eventos para animar"""
+        with self._lock:
+            self._pending_events.extend(events or [])
+            self._pending_requests += 1
+            _incr_metric('requests')
+
+            if self.window > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.window, self._flush_from_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return None
+
+        return self.flush()
+
+    def flush(self):
+        """Publica de inmediato las actualizaciones pendientes como un solo delta"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            events, self._pending_events = self._pending_events, []
+            requests, self._pending_requests = self._pending_requests, 0
+
+        if not requests:
+            return None
+
+        message = publish_display_update(events=events)
+
+        now = time.time()
+        for event in events:
+            if event.get('committed_at'):
+                metrics.observe('ctf_solve_broadcast_delay_seconds', now - event['committed_at'])
+
+        _incr_metric('broadcasts')
+        _incr_metric('events', len(events))
+        if requests > 1:
+            _incr_metric('recomputations_avoided', requests - 1)
+        logger.debug('Display: %s actualizaciones agrupadas en un broadcast (%s eventos)', requests, len(events))
+        return message
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('No se pudo publicar la actualización del display')
+        finally:
+            # El timer corre en su propio hilo: cerrar sus conexiones a la base de datos
+            connections.close_all()
+
+
+broadcaster = CoalescingBroadcaster()
@@ -0,0 +1,161 @@
+"""
+Protocolo snapshot + deltas del display público.
+
+Los clientes del display se suscriben por WebSocket y reciben un snapshot
+completo con número de secuencia (``display_snapshot``). Luego cada broadcast
+envía solo las diferencias (``display_delta``): equipos con cambios de puntaje o
+ranking, puntos nuevos o actualizados del timeline y entradas nuevas de los
+feeds. Si un cliente detecta un salto en la secuencia pide un ``resync`` y
+recibe un snapshot nuevo. La secuencia es un contador atómico del cache
+(``cache.incr``), compartido por todos los procesos que publican.
+"""
+import time
+from django.core.cache import cache
+from ctf_platform import metrics
+from .frames import group_send_frame
+from .snapshot import get_snapshot
+
+DISPLAY_GROUP = 'scoreboard-display'
+DISPLAY_STATE_KEY = 'scoreboard:display:state'
+DISPLAY_SEQ_KEY = 'scoreboard:display:seq'
+
+
+def build_display_payload(snapshot):
+    """Convierte el snapshot del scoreboard al formato JSON del display"""
+    teams = [
+        {
+            'id': str(team['id']),
+            'rank': team['rank'],
+            'name': team['name'],
+            'score': team['total_score'],
+            'color': team['color'],
+            'solved': team['solved_count'],
+            'first_bloods': team['first_bloods_count'],
+        }
+        for team in snapshot.teams
+    ]
+
+    recent_submissions = [
+        {
+            'team': sub['team']['name'],
+            'team_color': sub['team']['color'],
+            'user_name': sub['user_name'],
+            'challenge': sub['challenge']['title'],
+            'points': sub['challenge']['points'],
+            'time': sub['submitted_at'].strftime('%H:%M:%S'),
+            'submitted_at': sub['submitted_at'].isoformat(),
+        }
+        for sub in snapshot.recent_submissions
+    ]
+
+    first_bloods = [
+        {
+            'team': fb['team']['name'],
+            'team_color': fb['team']['color'],
+            'user_name': fb['user_name'],
+            'challenge': fb['challenge']['title'],
+            'points': fb['challenge']['points'],
+            'bonus_points': fb['bonus_points'],
+            'time': fb['achieved_at'].strftime('%H:%M:%S'),
+            'achieved_at': fb['achieved_at'].isoformat(),
+        }
+        for fb in snapshot.first_bloods
+    ]
+
+    return {
+        'teams': teams,
+        'recent_submissions': recent_submissions,
+        'first_bloods': first_bloods,
+        'timeline': snapshot.timeline.flat(include_start=True),
+    }
+
+
+def _new_feed_entries(old_feed, new_feed, key):
+    """Entradas del feed nuevo que no estaban en el anterior (el feed está ordenado del más reciente)"""
+    known = {(entry['team'], entry['challenge'], entry[key]) for entry in old_feed}
+    return [entry for entry in new_feed if (entry['team'], entry['challenge'], entry[key]) not in known]
+
+
+def diff_display_payload(old, new):
+    """Calcula el delta entre dos payloads del display"""
+    old_teams = {team['id']: team for team in old['teams']}
+    new_ids = {team['id'] for team in new['teams']}
+    teams = [team for team in new['teams'] if old_teams.get(team['id']) != team]
+    removed_teams = [team_id for team_id in old_teams if team_id not in new_ids]
+
+    old_points = {(point['team'], point['time']): point['score'] for point in old['timeline']}
+    known_teams = {point['team'] for point in old['timeline']}
+    timeline = [
+        point for point in new['timeline']
+        if old_points.get((point['team'], point['time'])) != point['score']
+        # Sin inicio configurado el punto inicial usa la hora actual: no reenviarlo a equipos conocidos
+        and not (point['score'] == 0 and point['team'] in known_teams)
+    ]
+
+    return {
+        'teams': teams,
+        'removed_teams': removed_teams,
+        'timeline': timeline,
+        'recent_submissions': _new_feed_entries(old['recent_submissions'], new['recent_submissions'], 'submitted_at'),
+        'first_bloods': _new_feed_entries(old['first_bloods'], new['first_bloods'], 'achieved_at'),
+    }
+
+
+def get_display_state():
+    """Último estado publicado del display ({seq, payload}); lo inicializa si no existe"""
+    state = cache.get(DISPLAY_STATE_KEY)
+    if state is None:
+        state = {'seq': cache.get(DISPLAY_SEQ_KEY, 0), 'payload': build_display_payload(get_snapshot())}
+        cache.set(DISPLAY_STATE_KEY, state, timeout=None)
+    return state
+
+
+def _next_seq(previous):
+    """Siguiente número de secuencia; dos procesos que publican a la vez nunca obtienen el mismo"""
+    try:
+        return cache.incr(DISPLAY_SEQ_KEY)
+    except ValueError:
+        # Sin contador (cache reiniciado): continuar desde el último estado publicado
+        cache.add(DISPLAY_SEQ_KEY, previous['seq'] if previous else 0, timeout=None)
+        return cache.incr(DISPLAY_SEQ_KEY)
+
+
+def snapshot_message(state):
+    """Mensaje de snapshot completo para un cliente del display"""
+    return {'type': 'display_snapshot', 'seq': state['seq'], **state['payload']}
+
+
+def publish_display_update(events=None):
+    """
+    Publica el estado actual del display como delta respecto del último publicado.
+    ``events`` son los eventos (solves, first bloods, logros) que el display anima.
+    """
+    start = time.perf_counter()
+    # Tras un solve no sirve el snapshot anterior: el delta debe incluirlo
+    payload = build_display_payload(get_snapshot(fresh=True))
+    previous = cache.get(DISPLAY_STATE_KEY)
+
+    seq = _next_seq(previous)
+    state = {'seq': seq, 'payload': payload}
+    current = cache.get(DISPLAY_STATE_KEY)
+    if current is None or current['seq'] < seq:
+        # No pisar el estado de una publicación posterior de otro proceso
+        cache.set(DISPLAY_STATE_KEY, state, timeout=None)
+
+    if previous is None:
+        # Sin estado anterior no hay base para un delta: enviar snapshot completo
+        message = snapshot_message(state)
+        message['events'] = events or []
+    else:
+        message = {
+            'type': 'display_delta',
+            'seq': seq,
+            'events': events or [],
+            **diff_display_payload(previous['payload'], payload),
+        }
+
+    metrics.observe('ctf_display_build_seconds', time.perf_counter() - start)
+
+    frame = group_send_frame(DISPLAY_GROUP, message)
+    metrics.observe('ctf_display_payload_bytes', len(frame['text'].encode('utf-8')))
+    return message
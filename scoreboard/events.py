@@ -0,0 +1,182 @@
+"""
+Pipeline de eventos del scoreboard.
+
+``submit_flag`` publica un evento "solve committed" cuando la transacción del
+solve se confirma y responde de inmediato. El trabajo posterior (logros,
+cambios de ranking y broadcast al display) lo realiza un worker de Channels:
+
+    python manage.py runworker scoreboard-events
+
+Con ``SCOREBOARD_EVENTS_INLINE=True`` los eventos se procesan en el mismo
+proceso, útil en desarrollo cuando no hay un worker corriendo.
+"""
+import logging
+import time
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from ctf_platform import metrics
+from ctf_platform.tracing import current_trace_id, span, start_trace
+from teams.models import Team
+from challenges.models import Submission
+from .frames import group_send_frame
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = getattr(settings, 'SCOREBOARD_EVENTS_CHANNEL', 'scoreboard-events')
+
+
+def publish_solve(submission, is_first_blood, points, ranks):
+    """
+    Encola el evento de solve para que se procese después del commit.
+    ``ranks`` es la posición del equipo ``(antes, después)`` del solve, calculada
+    dentro de la transacción. ``committed_at`` (epoch en segundos) viaja hasta el
+    broadcast del display para medir la demora entre el commit y la llegada al
+    socket (ver ``load_test``); el ``trace_id`` del submit permite seguir el solve
+    hasta el evento WebSocket.
+    """
+    old_rank, new_rank = ranks
+    message = {
+        'type': 'solve.committed',
+        'submission_id': str(submission.id),
+        'is_first_blood': is_first_blood,
+        'points': points,
+        'old_rank': old_rank,
+        'new_rank': new_rank,
+        'trace_id': current_trace_id(),
+    }
+
+    def on_commit():
+        message['committed_at'] = time.time()
+        send_event(message)
+
+    transaction.on_commit(on_commit)
+
+
+def publish_failure(submission):
+    """
+    Encola el evento de intento fallido, solo si algún logro reacciona a fallos:
+    sin reglas de ``fail`` los intentos fallidos no generan trabajo en el worker
+    """
+    from .achievements import FAIL, RULES_BY_EVENT
+
+    if not RULES_BY_EVENT[FAIL]:
+        return
+    message = {
+        'type': 'submission.failed',
+        'submission_id': str(submission.id),
+        'trace_id': current_trace_id(),
+    }
+    transaction.on_commit(lambda: send_event(message))
+
+
+def send_event(message):
+    """Envía un evento al worker (o lo procesa en línea si está configurado así)"""
+    if getattr(settings, 'SCOREBOARD_EVENTS_INLINE', False):
+        handle_event(message)
+        return
+
+    try:
+        with metrics.timer('ctf_channel_layer_send_seconds', kind='send'):
+            async_to_sync(get_channel_layer().send)(EVENTS_CHANNEL, message)
+    except Exception:
+        # El solve ya está confirmado; un fallo del channel layer no debe romper la respuesta
+        logger.exception('No se pudo encolar el evento %s', message['type'])
+
+
+def handle_event(message):
+    """Despacha un evento a su handler según el tipo"""
+    handlers = {
+        'solve.committed': handle_solve_committed,
+        'submission.failed': handle_submission_failed,
+    }
+    handler = handlers.get(message['type'])
+    if handler:
+        handler(message)
+
+
+def team_rank(team, score):
+    """Posición que ocuparía el equipo con el puntaje indicado (orden: -total_score, name)"""
+    ahead = Team.objects.exclude(pk=team.pk).filter(
+        Q(total_score__gt=score) | Q(total_score=score, name__lt=team.name)
+    ).count()
+    return ahead + 1
+
+
+def handle_solve_committed(message):
+    """Procesa un solve confirmado: logros, cambio de ranking y broadcast"""
+    # Continúa la traza del submit (mismo trace_id) con las etapas del worker
+    with start_trace('solve.committed', trace_id=message.get('trace_id'),
+                     metric='ctf_solve_event_stage_seconds') as trace:
+        process_solve(message, trace.trace_id)
+
+
+def process_solve(message, trace_id):
+    """Etapas del evento de solve, cada una como span de la traza"""
+    from .achievements import FIRST_BLOOD, RANK_CHANGE, SOLVE, award_achievements
+    from .broadcaster import broadcaster
+
+    with span('load'):
+        try:
+            submission = Submission.objects.select_related('team', 'challenge', 'submitted_by').get(
+                pk=message['submission_id']
+            )
+        except Submission.DoesNotExist:
+            logger.warning('Submission %s ya no existe, evento descartado', message['submission_id'])
+            return
+
+    team = submission.team
+    challenge = submission.challenge
+
+    # Solo se evalúan los logros que reaccionan a estos eventos y que aún no se obtuvieron
+    events = [SOLVE, FIRST_BLOOD] if message.get('is_first_blood') else [SOLVE]
+    with span('achievements'):
+        new_achievements = award_achievements(team, submission.submitted_by, events, submission=submission)
+
+    # Detectar si el equipo subió posiciones con este solve: las posiciones vienen
+    # del commit, el puntaje actual ya puede incluir solves posteriores
+    with span('rank'):
+        old_rank, new_rank = message['old_rank'], message['new_rank']
+        if new_rank < old_rank:
+            notify_rank_change(team, old_rank, new_rank, trace_id=trace_id)
+            award_achievements(team, events=[RANK_CHANGE], old_rank=old_rank, new_rank=new_rank)
+
+    # El broadcast se agrupa con los demás solves de la misma ventana
+    with span('broadcast'):
+        broadcaster.schedule(events=[{
+            'event_type': 'flag_solved',
+            'team': team.name,
+            'challenge': challenge.title,
+            'points': challenge.points,
+            'color': team.color,
+            'is_first_blood': message.get('is_first_blood', False),
+            'new_achievements': new_achievements,
+            'committed_at': message.get('committed_at'),
+            'trace_id': trace_id,
+        }])
+
+
+def handle_submission_failed(message):
+    """Evalúa los logros que reaccionan a intentos fallidos"""
+    from .achievements import FAIL, award_achievements
+
+    try:
+        submission = Submission.objects.select_related('team', 'submitted_by').get(pk=message['submission_id'])
+    except Submission.DoesNotExist:
+        return
+    with start_trace('submission.failed', trace_id=message.get('trace_id')):
+        award_achievements(submission.team, submission.submitted_by, [FAIL], submission=submission)
+
+
+def notify_rank_change(team, old_rank, new_rank, trace_id=None):
+    """Notifica al display que un equipo subió en el ranking"""
+    group_send_frame('scoreboard', {
+        'type': 'rank_change',
+        'message': f'{team.name} sube del puesto #{old_rank} al #{new_rank}',
+        'team': team.name,
+        'old_rank': old_rank,
+        'new_rank': new_rank,
+        'trace_id': trace_id,
+    })
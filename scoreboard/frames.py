@@ -0,0 +1,45 @@
+"""
+Frames WebSocket pre-codificados.
+
+Los broadcasts al scoreboard se serializan una sola vez en el proceso que los
+envía y viajan por el channel layer como texto listo para enviar
+(``{'type': 'broadcast.frame', 'text': ...}``). Cada ``ScoreboardConsumer`` solo
+reenvía ese texto a su socket, sin volver a codificar el payload por conexión.
+
+Se usa ``orjson`` si está instalado y, si no, ``json`` con separadores
+compactos; ambos producen el mismo JSON para los payloads del scoreboard
+(solo tipos nativos de JSON).
+"""
+import json
+import time
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from ctf_platform import metrics
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+FRAME_MESSAGE_TYPE = 'broadcast.frame'
+
+
+def encode_frame(payload):
+    """Codifica un payload a texto JSON compacto"""
+    if orjson is not None:
+        return orjson.dumps(payload).decode('utf-8')
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+
+
+def frame_message(payload):
+    """Mensaje del channel layer que lleva el payload ya codificado"""
+    return {'type': FRAME_MESSAGE_TYPE, 'text': encode_frame(payload)}
+
+
+def group_send_frame(group, payload):
+    """Codifica el payload una vez y lo envía a todos los sockets del grupo; devuelve el mensaje enviado"""
+    message = frame_message(payload)
+    start = time.perf_counter()
+    async_to_sync(get_channel_layer().group_send)(group, message)
+    metrics.observe('ctf_channel_layer_send_seconds', time.perf_counter() - start, kind='group_send')
+    return message
@@ -0,0 +1,286 @@
+"""
+Clientes asyncio para ``load_test``: HTTP/1.1 con keep-alive y cookies, y WebSocket.
+
+Usan solo la biblioteca estándar para poder abrir cientos de conexiones desde un
+único proceso contra un servidor local (Daphne) sin dependencias adicionales.
+Cubren lo que usa la plataforma: respuestas con ``Content-Length`` o
+``chunked``, cookies de sesión y CSRF, y frames de texto WebSocket (el cliente
+enmascara lo que envía y responde los ping).
+"""
+import asyncio
+import base64
+import hashlib
+import os
+import struct
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+WS_CONTINUATION = 0x0
+WS_TEXT = 0x1
+WS_BINARY = 0x2
+WS_CLOSE = 0x8
+WS_PING = 0x9
+WS_PONG = 0xA
+
+
+class ProtocolError(Exception):
+    """El servidor respondió algo que el cliente no esperaba"""
+
+
+def percentile(values, fraction):
+    """Percentil de una lista ya ordenada (0 si está vacía)"""
+    if not values:
+        return 0
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class OperationStats:
+    """Latencias (segundos) y errores de un tipo de operación"""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+
+    def ok(self, latency):
+        self.latencies.append(latency)
+
+    def error(self):
+        self.errors += 1
+
+    @property
+    def total(self):
+        return len(self.latencies) + self.errors
+
+    @property
+    def error_rate(self):
+        return self.errors / self.total if self.total else 0
+
+    def summary(self):
+        """Cantidad, errores y percentiles p50/p95/p99/máx en milisegundos"""
+        latencies = sorted(self.latencies)
+        return {
+            'count': self.total,
+            'errors': self.errors,
+            'error_rate': self.error_rate,
+            'p50': percentile(latencies, 0.50) * 1000,
+            'p95': percentile(latencies, 0.95) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+            'max': (latencies[-1] if latencies else 0) * 1000,
+        }
+
+
+async def read_headers(reader):
+    """Lee la línea de estado y los headers; retorna (status, {nombre: [valores]})"""
+    status_line = await reader.readuntil(b'\r\n')
+    parts = status_line.decode('latin-1').split(' ', 2)
+    if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+        raise ProtocolError(f'Línea de estado inválida: {status_line!r}')
+
+    headers = {}
+    while True:
+        line = await reader.readuntil(b'\r\n')
+        if line == b'\r\n':
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers.setdefault(name.strip().lower(), []).append(value.strip())
+    return int(parts[1]), headers
+
+
+class HttpClient:
+    """
+    Cliente HTTP/1.1 de un jugador: una conexión keep-alive y sus cookies.
+    Si el servidor cerró la conexión reutilizada, reintenta una vez con una nueva.
+    """
+
+    def __init__(self, base_url, timeout=30):
+        url = urlsplit(base_url)
+        if url.scheme != 'http':
+            raise ValueError('Solo se soporta http://')
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.timeout = timeout
+        self.cookies = {}
+        self.reader = self.writer = None
+
+    @property
+    def host_header(self):
+        return self.host if self.port == 80 else f'{self.host}:{self.port}'
+
+    async def request(self, method, path, data=None, headers=None):
+        """Envía un request; ``data`` (dict) se codifica como formulario. Retorna (status, headers, body)"""
+        body = urlencode(data).encode() if data is not None else b''
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {self.host_header}',
+            'Connection: keep-alive',
+            f'Content-Length: {len(body)}',
+        ]
+        if data is not None:
+            lines.append('Content-Type: application/x-www-form-urlencoded')
+        if self.cookies:
+            lines.append('Cookie: ' + '; '.join(f'{name}={value}' for name, value in self.cookies.items()))
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        raw = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+        reused = self.writer is not None
+        try:
+            return await asyncio.wait_for(self._send(raw, method), self.timeout)
+        except (asyncio.IncompleteReadError, ConnectionResetError, BrokenPipeError):
+            self.close()
+            if not reused:
+                raise
+        return await asyncio.wait_for(self._send(raw, method), self.timeout)
+
+    async def _send(self, raw, method):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(raw)
+        await self.writer.drain()
+
+        status, headers = await read_headers(self.reader)
+        body = await self._read_body(method, status, headers)
+        for value in headers.get('set-cookie', []):
+            self._store_cookie(value)
+        if 'close' in ','.join(headers.get('connection', [])).lower():
+            self.close()
+        return status, headers, body
+
+    async def _read_body(self, method, status, headers):
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            return b''
+        if 'chunked' in ','.join(headers.get('transfer-encoding', [])).lower():
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if size == 0:
+                    # Trailers opcionales hasta la línea vacía
+                    while await self.reader.readuntil(b'\r\n') != b'\r\n':
+                        pass
+                    return b''.join(chunks)
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+        if 'content-length' in headers:
+            return await self.reader.readexactly(int(headers['content-length'][0]))
+        # Sin largo declarado el cuerpo termina al cerrarse la conexión
+        body = await self.reader.read()
+        self.close()
+        return body
+
+    def _store_cookie(self, header):
+        for name, morsel in SimpleCookie(header).items():
+            if morsel.value and morsel['max-age'] not in ('0', 0):
+                self.cookies[name] = morsel.value
+            else:
+                self.cookies.pop(name, None)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def encode_ws_frame(opcode, payload, mask_key=None):
+    """Frame WebSocket final (FIN); los clientes deben enmascarar con ``mask_key`` (4 bytes)"""
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask_key is not None else 0
+    length = len(payload)
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126)
+        header += struct.pack('!H', length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack('!Q', length)
+
+    if mask_key is None:
+        return bytes(header) + payload
+    masked = bytes(byte ^ mask_key[idx % 4] for idx, byte in enumerate(payload))
+    return bytes(header) + mask_key + masked
+
+
+async def read_ws_frame(reader):
+    """Lee un frame; retorna (fin, opcode, payload) ya desenmascarado"""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack('!H', await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack('!Q', await reader.readexactly(8))
+    mask_key = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask_key is not None:
+        payload = bytes(byte ^ mask_key[idx % 4] for idx, byte in enumerate(payload))
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+class WebSocketClient:
+    """Cliente WebSocket de texto sobre una conexión propia"""
+
+    def __init__(self, base_url, timeout=30):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.origin = f'http://{url.netloc}'
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def connect(self, path, cookies=None):
+        """Handshake HTTP Upgrade; ``Origin`` es el del servidor (AllowedHostsOriginValidator)"""
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        key = base64.b64encode(os.urandom(16)).decode()
+        lines = [
+            f'GET {path} HTTP/1.1',
+            f'Host: {self.origin[len("http://"):]}',
+            'Upgrade: websocket',
+            'Connection: Upgrade',
+            f'Sec-WebSocket-Key: {key}',
+            'Sec-WebSocket-Version: 13',
+            f'Origin: {self.origin}',
+        ]
+        if cookies:
+            lines.append('Cookie: ' + '; '.join(f'{name}={value}' for name, value in cookies.items()))
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await self.writer.drain()
+
+        status, headers = await asyncio.wait_for(read_headers(self.reader), self.timeout)
+        if status != 101:
+            raise ProtocolError(f'Handshake rechazado con status {status}')
+        expected = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        if headers.get('sec-websocket-accept', [''])[0] != expected:
+            raise ProtocolError('Sec-WebSocket-Accept inválido')
+
+    async def send_text(self, text):
+        self.writer.write(encode_ws_frame(WS_TEXT, text.encode('utf-8'), os.urandom(4)))
+        await self.writer.drain()
+
+    async def receive(self):
+        """Siguiente mensaje de texto; ``None`` cuando el servidor cierra la conexión"""
+        parts = []
+        while True:
+            try:
+                fin, opcode, payload = await read_ws_frame(self.reader)
+            except (asyncio.IncompleteReadError, ConnectionResetError):
+                return None
+            if opcode == WS_PING:
+                self.writer.write(encode_ws_frame(WS_PONG, payload, os.urandom(4)))
+                continue
+            if opcode == WS_CLOSE:
+                return None
+            if opcode in (WS_TEXT, WS_BINARY, WS_CONTINUATION):
+                parts.append(payload)
+                if fin:
+                    return b''.join(parts).decode('utf-8')
+
+    def close(self):
+        if self.writer is not None:
+            try:
+                self.writer.write(encode_ws_frame(WS_CLOSE, struct.pack('!H', 1000), os.urandom(4)))
+            except (ConnectionError, RuntimeError):
+                pass
+            self.writer.close()
+        self.reader = self.writer = None
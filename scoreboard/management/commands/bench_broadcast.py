@@ -0,0 +1,76 @@
+import json
+import time
+from django.core.management.base import BaseCommand
+from scoreboard import frames
+
+
+class Command(BaseCommand):
+    help = 'Compara el tiempo de CPU por evento al codificar broadcasts por consumer vs una sola vez'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumers', default='10,100,1000',
+                            help='Cantidades de consumers simulados, separadas por coma')
+        parser.add_argument('--events', type=int, default=20, help='Eventos por medición')
+        parser.add_argument('--teams', type=int, default=200, help='Equipos en el payload simulado')
+
+    def handle(self, *args, **options):
+        consumer_counts = [int(value) for value in options['consumers'].split(',')]
+        payload = self.build_payload(options['teams'])
+        events = options['events']
+
+        encoder = 'orjson' if frames.orjson is not None else 'json'
+        self.stdout.write(
+            f'Payload de {len(frames.encode_frame(payload))} bytes, {events} eventos, encoder: {encoder}'
+        )
+        self.stdout.write(f'{"consumers":>10} {"por consumer (ms)":>18} {"pre-codificado (ms)":>20} {"speedup":>8}')
+
+        for count in consumer_counts:
+            per_consumer = self.measure(lambda: self.encode_per_consumer(payload, count), events)
+            pre_encoded = self.measure(lambda: self.encode_once(payload, count), events)
+            speedup = per_consumer / pre_encoded if pre_encoded else float('inf')
+            self.stdout.write(f'{count:>10} {per_consumer:>18.3f} {pre_encoded:>20.3f} {speedup:>7.1f}x')
+
+    def build_payload(self, team_count):
+        """Delta del display con todos los equipos cambiados (peor caso)"""
+        teams = [
+            {'id': f'{idx:08d}-0000-0000-0000-000000000000', 'rank': idx + 1, 'name': f'Equipo {idx}',
+             'score': 5000 - idx * 10, 'color': '#00FF41', 'solved': 10, 'first_bloods': 1}
+            for idx in range(team_count)
+        ]
+        timeline = [
+            {'team': f'Equipo {idx}', 'time': '2025-01-01T12:00:00-03:00', 'score': 5000 - idx * 10}
+            for idx in range(team_count)
+        ]
+        return {
+            'type': 'display_delta',
+            'seq': 1,
+            'events': [{'event_type': 'flag_solved', 'team': 'Equipo 0', 'challenge': 'SQLi',
+                        'points': 100, 'color': '#00FF41', 'is_first_blood': True, 'new_achievements': []}],
+            'teams': teams,
+            'removed_teams': [],
+            'timeline': timeline,
+            'recent_submissions': [],
+            'first_bloods': [],
+        }
+
+    def encode_per_consumer(self, payload, consumer_count):
+        """Comportamiento anterior: cada consumer arma su dict y llama a json.dumps"""
+        sent = []
+        for _ in range(consumer_count):
+            sent.append(json.dumps(dict(payload)))
+        return sent
+
+    def encode_once(self, payload, consumer_count):
+        """El emisor codifica una vez y cada consumer reenvía el texto"""
+        message = frames.frame_message(payload)
+        sent = []
+        for _ in range(consumer_count):
+            sent.append(message['text'])
+        return sent
+
+    def measure(self, func, events):
+        """Tiempo de CPU promedio por evento en milisegundos"""
+        start = time.process_time()
+        for _ in range(events):
+            func()
+        return (time.process_time() - start) * 1000 / events
@@ -0,0 +1,111 @@
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Mide requests por segundo de /api/scoreboard/ contra un servidor en ejecución (ej. Daphne)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/scoreboard/', help='URL a consultar')
+        parser.add_argument('--clients', type=int, default=20, help='Clientes concurrentes (keep-alive)')
+        parser.add_argument('--duration', type=float, default=10, help='Segundos de medición')
+        parser.add_argument('--warmup', type=float, default=2, help='Segundos de calentamiento previos')
+        parser.add_argument('--anonymous', action='store_true',
+                            help='Sin sesión: el snapshot cacheado responde sin tocar la base')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http':
+            raise CommandError('Solo se soporta http://')
+
+        headers = {}
+        session = None
+        if not options['anonymous']:
+            # Cada request autenticado lee la sesión y el usuario: así se mide el costo de la conexión
+            session = self.create_session()
+            headers['Cookie'] = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+        self.stdout.write(
+            f"{options['clients']} clientes, {options['duration']:.0f} s contra {options['url']} "
+            f"({'anónimo' if options['anonymous'] else 'con sesión'}), base: {connection.vendor}"
+        )
+        try:
+            self.run_clients(url, headers, options['clients'], options['warmup'])
+            ok, errors, latencies, elapsed = self.run_clients(
+                url, headers, options['clients'], options['duration']
+            )
+        finally:
+            if session is not None:
+                session.delete()
+
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] if latencies else 0
+        p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+        self.stdout.write(f'{"requests":>9} {"errores":>8} {"req/s":>9} {"p50 (ms)":>9} {"p95 (ms)":>9}')
+        self.stdout.write(
+            f'{ok:>9} {errors:>8} {ok / elapsed:>9.1f} {p50 * 1000:>9.1f} {p95 * 1000:>9.1f}'
+        )
+
+    def create_session(self):
+        """Sesión de un usuario de benchmark, guardada en la base como la de un jugador real"""
+        user, created = User.objects.get_or_create(username='bench-scoreboard')
+        if created:
+            user.set_unusable_password()
+            user.save()
+
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session
+
+    def run_clients(self, url, headers, client_count, duration):
+        counts = {'ok': 0, 'errors': 0}
+        latencies = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+        path = url.path or '/'
+
+        def client():
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+            local_latencies = []
+            ok = errors = 0
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    conn.request('GET', path, headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                except (OSError, http.client.HTTPException):
+                    errors += 1
+                    conn.close()
+                    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+                    continue
+                if response.status == 200:
+                    ok += 1
+                    local_latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+            conn.close()
+            with lock:
+                counts['ok'] += ok
+                counts['errors'] += errors
+                latencies.extend(local_latencies)
+
+        threads = [threading.Thread(target=client) for _ in range(client_count)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return counts['ok'], counts['errors'], latencies, time.perf_counter() - start
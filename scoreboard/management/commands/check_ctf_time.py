@@ -1,8 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 from scoreboard.models import CTFConfig
+from scoreboard.frames import group_send_frame
 from datetime import timedelta
 
 
@@ -44,8 +43,6 @@ class Command(BaseCommand):
     
     def send_time_warning(self, minutes_left):
         """Enviar advertencia de tiempo por WebSocket"""
-        channel_layer = get_channel_layer()
-        
         if minutes_left >= 60:
             message = f'⏰ ¡Atención! Quedan {minutes_left // 60} hora(s) para que finalice el CTF'
         elif minutes_left > 1:
@@ -53,23 +50,15 @@ class Command(BaseCommand):
         else:
             message = '⏰ ¡ÚLTIMO MINUTO! El CTF está por finalizar'
         
-        async_to_sync(channel_layer.group_send)(
-            'scoreboard',
-            {
-                'type': 'ctf_time_warning',
-                'message': message,
-                'minutes_left': minutes_left,
-            }
-        )
+        group_send_frame('scoreboard', {
+            'type': 'ctf_time_warning',
+            'message': message,
+            'minutes_left': minutes_left,
+        })
     
     def send_ctf_ended_notification(self):
         """Enviar notificación de CTF finalizado"""
-        channel_layer = get_channel_layer()
-        
-        async_to_sync(channel_layer.group_send)(
-            'scoreboard',
-            {
-                'type': 'ctf_ended',
-                'message': '🏁 ¡El CTF ha finalizado! Ya no se aceptan más submissions.',
-            }
-        )
+        group_send_frame('scoreboard', {
+            'type': 'ctf_ended',
+            'message': '🏁 ¡El CTF ha finalizado! Ya no se aceptan más submissions.',
+        })
@@ -0,0 +1,289 @@
+"""
+Prueba de carga de punta a punta contra un servidor en ejecución (Daphne + Redis).
+
+Reproduce el inicio y el cierre de un CTF con escenarios que corren a la vez:
+
+- ``login``: todos los jugadores inician sesión al mismo tiempo (formulario con CSRF).
+- ``submit``: cada jugador envía flags; ``--correct-ratio`` de ellas son correctas.
+- ``scoreboard``: espectadores consultando ``/api/scoreboard/`` periódicamente.
+- ``websockets``: sockets del dashboard y del display público abiertos todo el tiempo.
+
+Los jugadores, challenges y flags se leen de la base configurada (la misma que usa
+el servidor), por ejemplo los generados con ``generate_ctf``. Cada evento del
+display trae ``committed_at`` (ver ``scoreboard.events.publish_solve``), así que la
+demora de fan-out es la hora de llegada al socket menos la del commit; el cliente y
+el servidor deben correr en la misma máquina para compartir el reloj.
+"""
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from challenges.models import Challenge
+from scoreboard.loadtest import HttpClient, OperationStats, ProtocolError, WebSocketClient, percentile
+
+User = get_user_model()
+
+SCENARIOS = ('login', 'submit', 'scoreboard', 'websockets')
+CLIENT_ERRORS = (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ProtocolError, ValueError)
+
+
+class Command(BaseCommand):
+    help = 'Prueba de carga HTTP + WebSocket (login, submits, espectadores y sockets) contra un servidor local'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='URL base del servidor')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help=f'Escenarios separados por coma: {", ".join(SCENARIOS)}')
+        parser.add_argument('--players', type=int, default=200, help='Jugadores que inician sesión y envían flags')
+        parser.add_argument('--prefix', default='gen',
+                            help='Prefijo de los usuarios a usar (los de generate_ctf son <prefix>_<equipo>_<miembro>)')
+        parser.add_argument('--password', default='ctf', help='Contraseña de los jugadores')
+        parser.add_argument('--ramp', type=float, default=0,
+                            help='Segundos en que se reparten los inicios de sesión (0 = todos a la vez)')
+        parser.add_argument('--submits', type=int, default=10, help='Flags que envía cada jugador')
+        parser.add_argument('--correct-ratio', type=float, default=0.2, help='Fracción de flags correctas')
+        parser.add_argument('--think-time', type=float, default=0, help='Segundos entre flags de un jugador')
+        parser.add_argument('--spectators', type=int, default=20, help='Clientes consultando /api/scoreboard/')
+        parser.add_argument('--poll-interval', type=float, default=1, help='Segundos entre consultas de un espectador')
+        parser.add_argument('--listeners', type=int, default=100, help='Sockets del dashboard')
+        parser.add_argument('--displays', type=int, default=10,
+                            help='Sockets suscritos al display público (miden el fan-out)')
+        parser.add_argument('--duration', type=float, default=30,
+                            help='Segundos de prueba si no se corre el escenario submit')
+        parser.add_argument('--drain', type=float, default=3,
+                            help='Segundos que se siguen escuchando los sockets al terminar los submits')
+        parser.add_argument('--timeout', type=float, default=30, help='Timeout por request (segundos)')
+        parser.add_argument('--seed', type=int, default=None, help='Semilla para elegir challenges y flags')
+
+    def handle(self, *args, **options):
+        scenarios = {name.strip() for name in options['scenarios'].split(',') if name.strip()}
+        unknown = scenarios - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Escenarios desconocidos: {", ".join(sorted(unknown))}')
+        if not 0 <= options['correct_ratio'] <= 1:
+            raise CommandError('--correct-ratio debe estar entre 0 y 1')
+
+        self.options = options
+        self.scenarios = scenarios
+        self.rng = random.Random(options['seed'])
+        self.stats = {name: OperationStats() for name in ('login', 'submit', 'scoreboard', 'ws_connect')}
+        self.outcomes = Counter()
+        self.fanout = []
+        self.ws_messages = 0
+        self.ws_bytes = 0
+        self.ws_dropped = 0
+        self.display_sockets = 0
+
+        # Todo el acceso a la base ocurre antes del loop de asyncio
+        self.players = []
+        self.challenges = []
+        if scenarios & {'login', 'submit'}:
+            self.players = list(
+                User.objects.filter(username__startswith=f'{options["prefix"]}_', is_active=True,
+                                    teams__isnull=False)
+                .order_by('username').values_list('username', flat=True).distinct()[:options['players']]
+            )
+            if not self.players:
+                raise CommandError(
+                    f'No hay jugadores con equipo y prefijo "{options["prefix"]}_": usar generate_ctf o --prefix'
+                )
+        if 'submit' in scenarios:
+            self.challenges = list(Challenge.objects.filter(is_active=True).values_list('id', 'flag'))
+            if not self.challenges:
+                raise CommandError('No hay challenges activos')
+
+        self.stdout.write(
+            f'{options["url"]}: {len(self.players)} jugadores, {options["submits"] if "submit" in scenarios else 0} '
+            f'flags c/u ({options["correct_ratio"]:.0%} correctas), {options["spectators"] if "scoreboard" in scenarios else 0} '
+            f'espectadores, {options["listeners"] if "websockets" in scenarios else 0} sockets de dashboard y '
+            f'{options["displays"] if "websockets" in scenarios else 0} de display'
+        )
+        elapsed = asyncio.run(self.run())
+        self.report(elapsed)
+
+    async def run(self):
+        options = self.options
+        stop = asyncio.Event()
+        background = []
+
+        if 'websockets' in self.scenarios:
+            # Los sockets se conectan antes de la ráfaga, como un display abierto desde antes del inicio
+            sockets = await asyncio.gather(
+                *[self.open_socket(display=False) for _ in range(options['listeners'])],
+                *[self.open_socket(display=True) for _ in range(options['displays'])],
+            )
+            background += [asyncio.create_task(self.listen(client, display))
+                           for client, display in sockets if client is not None]
+            self.display_sockets = sum(1 for client, display in sockets if client is not None and display)
+        if 'scoreboard' in self.scenarios:
+            background += [asyncio.create_task(self.spectate(stop)) for _ in range(options['spectators'])]
+
+        start = time.perf_counter()
+        if self.players:
+            await asyncio.gather(*[self.play(idx, username) for idx, username in enumerate(self.players)])
+            await asyncio.sleep(options['drain'])
+        else:
+            await asyncio.sleep(options['duration'])
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        return elapsed
+
+    async def timed(self, stats, coro):
+        """Ejecuta un request y registra su latencia; retorna la respuesta o ``None`` si falló"""
+        start = time.perf_counter()
+        try:
+            response = await coro
+        except CLIENT_ERRORS:
+            stats.error()
+            return None
+        stats.ok(time.perf_counter() - start)
+        return response
+
+    async def play(self, idx, username):
+        """Un jugador: inicia sesión y (si corresponde) envía sus flags"""
+        options = self.options
+        if options['ramp'] and len(self.players) > 1:
+            await asyncio.sleep(options['ramp'] * idx / (len(self.players) - 1))
+
+        client = HttpClient(options['url'], timeout=options['timeout'])
+        try:
+            if not await self.login(client, username) or 'submit' not in self.scenarios:
+                return
+            for submit_idx in range(options['submits']):
+                if submit_idx and options['think_time']:
+                    await asyncio.sleep(options['think_time'])
+                await self.submit(client)
+        finally:
+            client.close()
+
+    async def login(self, client, username):
+        """GET del formulario (cookie CSRF) y POST de credenciales; el éxito es un redirect con sesión"""
+        async def flow():
+            await client.request('GET', '/login/')
+            response = await client.request('POST', '/login/', data={
+                'username': username,
+                'password': self.options['password'],
+                'csrfmiddlewaretoken': client.cookies.get(settings.CSRF_COOKIE_NAME, ''),
+            })
+            if response[0] != 302 or settings.SESSION_COOKIE_NAME not in client.cookies:
+                raise ProtocolError(f'Login de {username} rechazado (status {response[0]})')
+            return response
+
+        return await self.timed(self.stats['login'], flow()) is not None
+
+    async def submit(self, client):
+        """Envía una flag a un challenge al azar; el resultado se clasifica por status y respuesta"""
+        challenge_id, flag = self.rng.choice(self.challenges)
+        if self.rng.random() >= self.options['correct_ratio']:
+            flag = f'flag{{wrong_{self.rng.getrandbits(32):08x}}}'
+
+        stats = self.stats['submit']
+        response = await self.timed(stats, client.request(
+            'POST', f'/challenges/{challenge_id}/submit/', data={'flag': flag},
+            headers={'X-CSRFToken': client.cookies.get(settings.CSRF_COOKIE_NAME, '')},
+        ))
+        if response is None:
+            self.outcomes['error'] += 1
+            return
+
+        status, _, body = response
+        if status == 200 and body.startswith(b'{'):
+            self.outcomes['correct' if json.loads(body).get('success') else 'wrong'] += 1
+        elif status == 400:
+            self.outcomes['already_solved'] += 1
+        elif status == 403:
+            self.outcomes['ctf_ended'] += 1
+        else:
+            # Un 5xx (o un redirect al login) cuenta como error aunque haya respondido
+            stats.latencies.pop()
+            stats.error()
+            self.outcomes[f'http_{status}'] += 1
+
+    async def spectate(self, stop):
+        """Un espectador anónimo consultando el scoreboard hasta que termine la prueba"""
+        client = HttpClient(self.options['url'], timeout=self.options['timeout'])
+        stats = self.stats['scoreboard']
+        try:
+            while not stop.is_set():
+                response = await self.timed(stats, client.request('GET', '/api/scoreboard/'))
+                if response is not None and response[0] != 200:
+                    stats.latencies.pop()
+                    stats.error()
+                await asyncio.sleep(self.options['poll_interval'])
+        finally:
+            client.close()
+
+    async def open_socket(self, display):
+        """Conecta un socket (y lo suscribe al display si corresponde); retorna (cliente, display)"""
+        client = WebSocketClient(self.options['url'], timeout=self.options['timeout'])
+
+        async def connect():
+            await client.connect('/ws/scoreboard/')
+            if display:
+                await client.send_text(json.dumps({'type': 'subscribe_display'}))
+
+        if await self.timed(self.stats['ws_connect'], connect()) is None:
+            client.close()
+            return None, display
+        return client, display
+
+    async def listen(self, client, display):
+        """Recibe hasta que se cancela; en el display mide commit -> socket de cada evento"""
+        try:
+            while True:
+                text = await client.receive()
+                received_at = time.time()
+                if text is None:
+                    self.ws_dropped += 1
+                    return
+                self.ws_messages += 1
+                self.ws_bytes += len(text.encode('utf-8'))
+                if not display:
+                    continue
+                for event in json.loads(text).get('events', []):
+                    if event.get('committed_at'):
+                        self.fanout.append(received_at - event['committed_at'])
+        finally:
+            client.close()
+
+    def report(self, elapsed):
+        self.stdout.write(f'\nDuración: {elapsed:.1f} s')
+        self.stdout.write(
+            f'{"operación":>11} {"total":>7} {"errores":>8} {"error %":>8} {"ops/s":>8} '
+            f'{"p50 (ms)":>9} {"p95 (ms)":>9} {"p99 (ms)":>9} {"máx (ms)":>9}'
+        )
+        for name, stats in self.stats.items():
+            if not stats.total:
+                continue
+            summary = stats.summary()
+            self.stdout.write(
+                f'{name:>11} {summary["count"]:>7} {summary["errors"]:>8} {summary["error_rate"]:>8.1%} '
+                f'{summary["count"] / elapsed:>8.1f} {summary["p50"]:>9.1f} {summary["p95"]:>9.1f} '
+                f'{summary["p99"]:>9.1f} {summary["max"]:>9.1f}'
+            )
+
+        if self.outcomes:
+            self.stdout.write('\nResultado de los submits: ' + ', '.join(
+                f'{name}={count}' for name, count in self.outcomes.most_common()
+            ))
+
+        if 'websockets' in self.scenarios:
+            self.stdout.write(
+                f'\nSockets: {self.ws_messages} mensajes recibidos ({self.ws_bytes / 1024:.0f} KB), '
+                f'{self.ws_dropped} cerrados por el servidor'
+            )
+            expected = self.outcomes['correct'] * self.display_sockets
+            delays = sorted(self.fanout)
+            self.stdout.write(
+                f'Fan-out commit -> socket del display: {len(delays)} entregas de {expected} esperadas, '
+                f'p50 {percentile(delays, 0.50) * 1000:.0f} ms, p95 {percentile(delays, 0.95) * 1000:.0f} ms, '
+                f'p99 {percentile(delays, 0.99) * 1000:.0f} ms, máx {(delays[-1] if delays else 0) * 1000:.0f} ms'
+            )
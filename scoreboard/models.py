@@ -1,9 +1,31 @@
+import copy
+import time
+from functools import lru_cache
+import pytz
+from django.conf import settings
+from django.core.cache import cache
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Cache en memoria del proceso para la configuración del CTF (ver CTFConfig.get_config).
+# Se reemplaza la tupla completa (config, vencimiento, versión, próxima verificación)
+# en una sola asignación
+_config_cache = [(None, 0, None, 0)]
+
+# Versión de la configuración en el cache compartido: cada guardado la incrementa y
+# los demás procesos descartan su copia al verificarla (a lo sumo cada
+# CTF_CONFIG_VERSION_CHECK_INTERVAL segundos, no en cada lectura)
+CTF_CONFIG_VERSION_KEY = 'scoreboard:ctf_config:version'
+
+
+@lru_cache(maxsize=32)
+def _resolve_timezone(name):
+    return pytz.timezone(name)
+
+
 class CTFConfig(models.Model):
     """Configuración global del CTF"""
     name = models.CharField(max_length=200, default="Mi CTF", verbose_name="Nombre del CTF")
@@ -21,10 +43,54 @@ class CTFConfig(models.Model):
         return f"CTF Config - {'Activo' if self.is_active else 'Inactivo'}"
     
     @classmethod
-    def get_config(cls):
-        """Obtener o crear la configuración"""
-        config, created = cls.objects.get_or_create(pk=1)
+    def _cached_config(cls):
+        """Instancia compartida del cache del proceso; no debe modificarse"""
+        config, expires_at, version, check_at = _config_cache[0]
+        now = time.monotonic()
+        if config is not None and now < check_at:
+            return config
+        
+        # Una lectura del cache compartido por intervalo, no una por lectura de la
+        # configuración (el filtro de zona horaria la lee por cada fecha)
+        current_version = cache.get(CTF_CONFIG_VERSION_KEY, 0)
+        if config is None or now >= expires_at or version != current_version:
+            config, created = cls.objects.get_or_create(pk=1)
+            expires_at = now + getattr(settings, 'CTF_CONFIG_CACHE_TTL', 30)
+        check_at = min(expires_at, now + getattr(settings, 'CTF_CONFIG_VERSION_CHECK_INTERVAL', 1))
+        _config_cache[0] = (config, expires_at, current_version, check_at)
         return config
+    
+    @classmethod
+    def get_config(cls):
+        """
+        Obtener o crear la configuración.
+        Se cachea en memoria del proceso por CTF_CONFIG_CACHE_TTL segundos; los
+        demás procesos la descartan en CTF_CONFIG_VERSION_CHECK_INTERVAL segundos
+        cuando cambia la versión del cache compartido (ver invalidate_cache).
+        Retorna una copia que se puede modificar y guardar.
+        """
+        return copy.copy(cls._cached_config())
+    
+    @classmethod
+    def get_timezone(cls):
+        """Zona horaria configurada (objeto pytz cacheado por nombre)"""
+        return _resolve_timezone(cls._cached_config().timezone)
+    
+    @classmethod
+    def clear_cache(cls):
+        """Descarta la configuración cacheada en este proceso"""
+        _config_cache[0] = (None, 0, None, 0)
+    
+    @classmethod
+    def invalidate_cache(cls):
+        """Descarta la configuración cacheada en todos los procesos (incrementa la versión compartida)"""
+        cls.clear_cache()
+        cache.add(CTF_CONFIG_VERSION_KEY, 0, timeout=None)
+        try:
+            cache.incr(CTF_CONFIG_VERSION_KEY)
+        except ValueError:
+            # La clave se desalojó entre add e incr
+            cache.set(CTF_CONFIG_VERSION_KEY, 1, timeout=None)
 
 
 class Achievement(models.Model):
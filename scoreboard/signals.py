@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from teams.models import Team
+from challenges.models import Challenge, Submission, FirstBlood
+from .models import CTFConfig
+from .snapshot import invalidate_snapshot
+
+def invalidate_snapshot_on_commit():
+    """Invalidar el snapshot cuando la transacción se confirma (no antes)"""
+    transaction.on_commit(invalidate_snapshot)
+
+@receiver([post_save, post_delete], sender=Submission)
+def submission_changed(sender, instance, **kwargs):
+    """Solo los solves afectan el scoreboard"""
+    if instance.is_correct:
+        invalidate_snapshot_on_commit()
+
+@receiver([post_save, post_delete], sender=FirstBlood)
+@receiver([post_save, post_delete], sender=Team)
+@receiver([post_save, post_delete], sender=Challenge)
+@receiver([post_save, post_delete], sender=CTFConfig)
+def scoreboard_data_changed(sender, **kwargs):
+    """First bloods, equipos, challenges y configuración invalidan el snapshot"""
+    invalidate_snapshot_on_commit()
+
+@receiver([post_save, post_delete], sender=CTFConfig)
+def ctf_config_changed(sender, **kwargs):
+    """Refrescar la configuración cacheada en este proceso y, al confirmarse, en el resto"""
+    CTFConfig.clear_cache()
+    transaction.on_commit(CTFConfig.invalidate_cache)
@@ -0,0 +1,163 @@
+"""
+Snapshot materializado del scoreboard.
+
+El ranking, los conteos de solves y first bloods, la actividad reciente y el
+timeline se calculan una sola vez y se guardan en el cache de Django. Las vistas
+del scoreboard solo leen el snapshot; se reconstruye cuando un solve, first
+blood, edición de equipo/challenge o cambio de configuración lo invalida (ver
+``scoreboard.signals``).
+"""
+import time
+from bisect import bisect_left
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+import pytz
+from teams.models import Team
+from challenges.models import Submission, FirstBlood
+from .models import CTFConfig
+from .timeline import ScoreTimeline
+
+SNAPSHOT_CACHE_KEY = 'scoreboard:snapshot'
+SNAPSHOT_VERSION_KEY = 'scoreboard:snapshot:version'
+SNAPSHOT_LOCK_KEY = 'scoreboard:snapshot:lock'
+
+FEED_SIZE = 10
+
+# Ventana de la actividad reciente del dashboard (ver ScoreboardSnapshot.solves_since)
+RECENT_WINDOW = timedelta(hours=24)
+
+
+class ScoreboardSnapshot:
+    """Ranking, conteos, actividad reciente y timeline del scoreboard en un momento dado"""
+
+    def __init__(self, teams, recent_submissions, first_bloods, total_solves, timeline, version=0,
+                 recent_solve_times=()):
+        self.teams = teams
+        self.recent_submissions = recent_submissions
+        self.first_bloods = first_bloods
+        self.total_solves = total_solves
+        self.timeline = timeline
+        self.version = version
+        # Fechas ordenadas de los solves de las últimas RECENT_WINDOW al construirlo
+        self.recent_solve_times = list(recent_solve_times)
+        self.built_at = timezone.now()
+
+    def solves_since(self, since):
+        """Cantidad de solves desde ``since`` (dentro de RECENT_WINDOW), sin consultar la base"""
+        return len(self.recent_solve_times) - bisect_left(self.recent_solve_times, since)
+
+    @classmethod
+    def build(cls, version=0):
+        """Construye el snapshot con un número constante de queries"""
+        teams = list(Team.objects.all().order_by('-total_score', 'name'))
+
+        rows = []
+        for idx, team in enumerate(teams, 1):
+            rows.append({
+                'id': team.id,
+                'rank': idx,
+                'name': team.name,
+                'color': team.color,
+                'total_score': team.total_score,
+                'solved_count': team.solved_count,
+                'first_bloods_count': team.first_blood_count,
+            })
+
+        recent_submissions = [
+            {
+                'team': {'name': sub.team.name, 'color': sub.team.color},
+                'challenge': {'title': sub.challenge.title, 'points': sub.challenge.points},
+                'user_name': sub.submitted_by.username if sub.submitted_by else 'Unknown',
+                'submitted_at': sub.submitted_at,
+            }
+            for sub in Submission.objects.filter(is_correct=True).select_related(
+                'team', 'challenge', 'submitted_by'
+            ).order_by('-submitted_at')[:FEED_SIZE]
+        ]
+
+        first_bloods = [
+            {
+                'team': {'name': fb.team.name, 'color': fb.team.color},
+                'challenge': {'title': fb.challenge.title, 'points': fb.challenge.points},
+                'user_name': fb.achieved_by.username if fb.achieved_by else 'Unknown',
+                'bonus_points': fb.bonus_points,
+                'achieved_at': fb.achieved_at,
+            }
+            for fb in FirstBlood.objects.select_related(
+                'team', 'challenge', 'achieved_by'
+            ).order_by('-achieved_at')[:FEED_SIZE]
+        ]
+
+        # Los contadores de los equipos ya cargados, sin contar las submissions
+        total_solves = sum(team.solved_count for team in teams)
+
+        # Actividad reciente del dashboard: cualquier solve nuevo invalida el snapshot,
+        # así que el conteo se hace en memoria al leerlo
+        recent_solve_times = Submission.objects.filter(
+            is_correct=True, submitted_at__gte=timezone.now() - RECENT_WINDOW
+        ).order_by('submitted_at').values_list('submitted_at', flat=True)
+
+        # Timeline en la zona horaria de Santiago, con inicio en el comienzo del CTF
+        ctf_config = CTFConfig.get_config()
+        timeline = ScoreTimeline(
+            teams=teams,
+            start_time=ctf_config.start_time,
+            tz=pytz.timezone('America/Santiago'),
+        )
+
+        return cls(rows, recent_submissions, first_bloods, total_solves, timeline, version=version,
+                   recent_solve_times=recent_solve_times)
+
+
+def _build_and_store(version):
+    snapshot = ScoreboardSnapshot.build(version=version)
+    cache.set(SNAPSHOT_CACHE_KEY, snapshot, timeout=getattr(settings, 'SCOREBOARD_SNAPSHOT_TTL', 300))
+    return snapshot
+
+
+def get_snapshot(fresh=False):
+    """
+    Retorna el snapshot vigente desde el cache, reconstruyéndolo si fue invalidado.
+    Mientras un proceso lo reconstruye, el resto sigue sirviendo la versión anterior.
+
+    Con ``fresh=True`` (el broadcaster del display, tras un solve) nunca se sirve
+    una versión anterior: se espera hasta ``SCOREBOARD_SNAPSHOT_LOCK_WAIT``
+    segundos a que el otro proceso termine y, si no alcanza, se reconstruye sin
+    el lock. Un delta publicado sin el último solve de una ráfaga no se corrige
+    hasta el próximo solve.
+    """
+    deadline = time.monotonic() + getattr(settings, 'SCOREBOARD_SNAPSHOT_LOCK_WAIT', 2)
+    while True:
+        version = cache.get(SNAPSHOT_VERSION_KEY, 0)
+        snapshot = cache.get(SNAPSHOT_CACHE_KEY)
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        acquired = cache.add(SNAPSHOT_LOCK_KEY, True, timeout=10)
+        # Sin snapshot no hay nada que servir: se construye aunque otro tenga el lock
+        if acquired or snapshot is None:
+            break
+
+        # Otro proceso está reconstruyendo
+        if not fresh:
+            return snapshot
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(0.05)
+
+    try:
+        return _build_and_store(version)
+    finally:
+        # Solo quien tomó el lock lo libera
+        if acquired:
+            cache.delete(SNAPSHOT_LOCK_KEY)
+
+
+def invalidate_snapshot():
+    """Marca el snapshot como obsoleto; la próxima lectura lo reconstruye"""
+    try:
+        cache.incr(SNAPSHOT_VERSION_KEY)
+    except ValueError:
+        cache.set(SNAPSHOT_VERSION_KEY, 1, timeout=None)
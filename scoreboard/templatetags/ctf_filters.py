@@ -1,6 +1,5 @@
 from django import template
 from django.utils import timezone
-import pytz
 from scoreboard.models import CTFConfig
 
 register = template.Library()
@@ -11,9 +10,8 @@ def to_ctf_timezone(value):
     if not value:
         return value
     
-    config = CTFConfig.get_config()
     try:
-        tz = pytz.timezone(config.timezone)
+        tz = CTFConfig.get_timezone()
         if timezone.is_aware(value):
             return value.astimezone(tz)
         else:
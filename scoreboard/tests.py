@@ -1,2 +1,677 @@
-# Archivo de inicialización de la app scoreboard
-default_app_config = 'scoreboard.apps.ScoreboardConfig'
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import connection
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from teams.models import Team
+from challenges.models import Category, Challenge, Submission, ScoreEntry
+from .models import CTF_CONFIG_VERSION_KEY, Achievement, CTFConfig
+from .events import EVENTS_CHANNEL, handle_solve_committed
+from .achievements import ACHIEVEMENTS, FIRST_BLOOD, SOLVE, AchievementContext, award_achievements, check_achievements
+from .timeline import ScoreTimeline
+from .snapshot import SNAPSHOT_LOCK_KEY, get_snapshot, invalidate_snapshot
+from .display import DISPLAY_GROUP, DISPLAY_SEQ_KEY, diff_display_payload, get_display_state, publish_display_update
+from .broadcaster import CoalescingBroadcaster, get_broadcast_metrics
+from .frames import encode_frame
+from .consumers import ScoreboardConsumer
+from .loadtest import OperationStats, WS_TEXT, encode_ws_frame, read_ws_frame
+
+User = get_user_model()
+
+IN_MEMORY_CHANNEL_LAYERS = {
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'},
+}
+
+
+class ScoreboardTestMixin:
+    """Datos base: una categoría, un challenge y equipos con un miembro cada uno"""
+
+    def setUp(self):
+        cache.clear()
+        CTFConfig.clear_cache()
+        self.channel_layer = get_channel_layer()
+        async_to_sync(self.channel_layer.flush)()
+        self.category = Category.objects.create(name='Web')
+        self.challenge = Challenge.objects.create(
+            title='SQLi', description='-', category=self.category, points=100, flag='flag{ok}'
+        )
+        self.team, self.user = self.create_team('Alpha', 'alice')
+
+    def create_team(self, name, username, score=0):
+        team = Team.objects.create(name=name, total_score=score)
+        user = User.objects.create_user(username=username, password='pass')
+        team.members.add(user)
+        return team, user
+
+    def submit(self, user, challenge, flag):
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('challenges:submit', args=[challenge.id]), {'flag': flag})
+
+    def join_scoreboard_group(self, group='scoreboard'):
+        channel = async_to_sync(self.channel_layer.new_channel)()
+        async_to_sync(self.channel_layer.group_add)(group, channel)
+        return channel
+
+    def receive(self, channel):
+        return async_to_sync(self.channel_layer.receive)(channel)
+
+    def receive_frame(self, channel):
+        """Recibe un broadcast pre-codificado y retorna el payload que llega al socket"""
+        message = self.receive(channel)
+        self.assertEqual(message['type'], 'broadcast.frame')
+        return json.loads(message['text'])
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, SCOREBOARD_DISPLAY_COALESCE_WINDOW=0)
+class SolveEventPipelineTests(ScoreboardTestMixin, TestCase):
+    """El submit solo confirma el solve y deja el resto al worker"""
+
+    def test_submit_publishes_event_without_post_solve_work(self):
+        response = self.submit(self.user, self.challenge, 'flag{ok}')
+
+        self.assertTrue(response.json()['success'])
+        self.assertFalse(Achievement.objects.exists())
+
+        message = self.receive(EVENTS_CHANNEL)
+        submission = Submission.objects.get(team=self.team, is_correct=True)
+        self.assertEqual(message['type'], 'solve.committed')
+        self.assertEqual(message['submission_id'], str(submission.id))
+        self.assertTrue(message['is_first_blood'])
+        self.assertEqual(message['points'], 150)
+        self.assertEqual((message['old_rank'], message['new_rank']), (1, 1))
+        self.assertLessEqual(message['committed_at'], time.time())
+
+    def test_wrong_flag_publishes_nothing(self):
+        self.submit(self.user, self.challenge, 'flag{nope}')
+
+        self.assertNotIn(EVENTS_CHANNEL, self.channel_layer.channels)
+
+    def test_worker_awards_achievements_and_broadcasts(self):
+        self.submit(self.user, self.challenge, 'flag{ok}')
+        message = self.receive(EVENTS_CHANNEL)
+        listener = self.join_scoreboard_group(DISPLAY_GROUP)
+
+        handle_solve_committed(message)
+
+        self.assertTrue(Achievement.objects.filter(team=self.team, code='first_blood').exists())
+        self.assertTrue(Achievement.objects.filter(user=self.user, code='early_bird').exists())
+
+        event = self.receive_frame(listener)
+        self.assertIn(event['type'], ('display_snapshot', 'display_delta'))
+        self.assertEqual(event['events'][0]['team'], 'Alpha')
+        self.assertTrue(event['events'][0]['is_first_blood'])
+        self.assertEqual(
+            [a['code'] for a in event['events'][0]['new_achievements']],
+            ['early_bird'],
+        )
+        self.assertEqual(event['events'][0]['committed_at'], message['committed_at'])
+
+    def test_trace_id_follows_solve_to_display_event(self):
+        response = self.submit(self.user, self.challenge, 'flag{ok}')
+        message = self.receive(EVENTS_CHANNEL)
+        listener = self.join_scoreboard_group(DISPLAY_GROUP)
+
+        handle_solve_committed(message)
+
+        trace_id = response.json()['trace_id']
+        self.assertEqual(response['X-Trace-Id'], trace_id)
+        self.assertEqual(message['trace_id'], trace_id)
+        self.assertEqual(self.receive_frame(listener)['events'][0]['trace_id'], trace_id)
+
+    def test_worker_notifies_rank_climb(self):
+        for idx in range(5):
+            self.create_team(f'Rival {idx}', f'rival{idx}', score=120)
+
+        self.submit(self.user, self.challenge, 'flag{ok}')
+        message = self.receive(EVENTS_CHANNEL)
+        listener = self.join_scoreboard_group()
+
+        handle_solve_committed(message)
+
+        event = self.receive_frame(listener)
+        self.assertEqual(event['type'], 'rank_change')
+        self.assertEqual((event['old_rank'], event['new_rank']), (6, 1))
+        self.assertTrue(Achievement.objects.filter(team=self.team, code='comeback_kid').exists())
+
+    def test_rank_change_uses_ranks_from_commit(self):
+        rivals = [self.create_team(f'Rival {idx}', f'rival{idx}', score=120)[0] for idx in range(5)]
+
+        self.submit(self.user, self.challenge, 'flag{ok}')
+        message = self.receive(EVENTS_CHANNEL)
+        # Otro solve supera a Alpha antes de que el worker procese el evento
+        Team.objects.filter(pk=rivals[0].pk).update(total_score=400)
+        listener = self.join_scoreboard_group()
+
+        handle_solve_committed(message)
+
+        event = self.receive_frame(listener)
+        self.assertEqual(event['type'], 'rank_change')
+        self.assertEqual((event['old_rank'], event['new_rank']), (6, 1))
+
+    def test_worker_ignores_deleted_submission(self):
+        self.submit(self.user, self.challenge, 'flag{ok}')
+        message = self.receive(EVENTS_CHANNEL)
+        Submission.objects.all().delete()
+
+        handle_solve_committed(message)
+
+        self.assertFalse(Achievement.objects.exists())
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class AchievementEngineTests(ScoreboardTestMixin, TestCase):
+    """Los logros se evalúan por evento sobre los contadores incrementales"""
+
+    def create_challenges(self, count):
+        return [
+            Challenge.objects.create(title=f'C{idx}', description='-', category=self.category,
+                                     points=100, flag=f'flag{{c{idx}}}')
+            for idx in range(count)
+        ]
+
+    def test_earned_rules_are_not_evaluated(self):
+        Achievement.objects.create(code='first_blood', team=self.team, category='team')
+        Achievement.objects.create(code='early_bird', user=self.user, category='individual')
+        self.submit(self.user, self.challenge, 'flag{ok}')
+        submission = Submission.objects.get(team=self.team)
+
+        # Solo la query de los logros obtenidos: no se carga ningún contador
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                award_achievements(self.team, self.user, [FIRST_BLOOD], submission=submission), []
+            )
+
+    def test_sharpshooter_counts_first_try_solves(self):
+        challenges = self.create_challenges(3)
+        self.submit(self.user, challenges[0], 'flag{nope}')
+        for challenge in challenges:
+            self.submit(self.user, challenge, challenge.flag)
+
+        ctx = AchievementContext(self.team, self.user, submission=Submission.objects.filter(is_correct=True).last())
+        self.assertNotIn('sharpshooter', check_achievements(ctx, [SOLVE]))
+
+        self.submit(self.user, self.challenge, 'flag{ok}')
+        ctx = AchievementContext(self.team, self.user, submission=Submission.objects.filter(is_correct=True).last())
+        self.assertIn('sharpshooter', check_achievements(ctx, [SOLVE]))
+
+    def test_persistent_after_ten_failures_on_one_challenge(self):
+        for idx in range(10):
+            self.submit(self.user, self.challenge, f'flag{{no{idx}}}')
+        self.submit(self.user, self.challenge, 'flag{ok}')
+
+        submission = Submission.objects.get(is_correct=True)
+        codes = [a['code'] for a in award_achievements(self.team, self.user, [SOLVE], submission=submission)]
+        self.assertIn('persistent', codes)
+
+
+    def test_night_owl_uses_project_timezone(self):
+        CTFConfig.objects.create(pk=1, timezone='Asia/Tokyo')
+        CTFConfig.clear_cache()
+        self.submit(self.user, self.challenge, 'flag{ok}')
+        submission = Submission.objects.get(is_correct=True)
+        # 03:00 en Santiago (06:00 UTC, 15:00 en Tokio)
+        Submission.objects.filter(pk=submission.pk).update(submitted_at=datetime(2025, 1, 1, 6, 0, tzinfo=dt_timezone.utc))
+        submission.refresh_from_db()
+
+        ctx = AchievementContext(self.team, self.user, submission=submission)
+        self.assertIn('night_owl', check_achievements(ctx, [SOLVE]))
+
+class ScoreTimelineTests(TestCase):
+    """Timeline acumulado construido desde el ledger en queries constantes"""
+
+    START = datetime(2025, 1, 1, 12, 0, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        category = Category.objects.create(name='Web')
+        self.challenges = [
+            Challenge.objects.create(
+                title=f'Challenge {idx}', description='-', category=category, points=100, flag='flag'
+            )
+            for idx in range(3)
+        ]
+
+    def create_teams(self, count):
+        teams = Team.objects.bulk_create([
+            Team(name=f'Team {idx:05d}', invite_code=f'T{idx:07d}') for idx in range(count)
+        ])
+        entries = []
+        for idx, team in enumerate(teams):
+            for offset, challenge in enumerate(self.challenges):
+                entries.append(ScoreEntry(
+                    team=team, challenge=challenge, kind='solve', points=100,
+                    created_at=self.START + timedelta(minutes=idx % 60 + offset * 5),
+                ))
+        ScoreEntry.objects.bulk_create(entries)
+        return teams
+
+    def test_series_is_cumulative_and_bucketed_by_minute(self):
+        team = Team.objects.create(name='Alpha')
+        ScoreEntry.objects.bulk_create([
+            ScoreEntry(team=team, challenge=self.challenges[0], kind='solve', points=100,
+                       created_at=self.START + timedelta(seconds=10)),
+            ScoreEntry(team=team, challenge=self.challenges[0], kind='first_blood', points=50,
+                       created_at=self.START + timedelta(seconds=20)),
+            ScoreEntry(team=team, challenge=self.challenges[1], kind='solve', points=100,
+                       created_at=self.START + timedelta(minutes=3)),
+        ])
+
+        timeline = ScoreTimeline(start_time=self.START, tz=dt_timezone.utc)
+
+        self.assertEqual([point['score'] for point in timeline.flat()], [150, 250])
+        data = timeline.by_team()['Alpha']['data']
+        self.assertEqual([point['score'] for point in data], [0, 150, 250])
+        self.assertEqual(data[1]['time'], self.START.isoformat())
+
+    def test_flat_with_start_point(self):
+        Team.objects.create(name='Alpha')
+
+        timeline = ScoreTimeline(start_time=self.START, tz=dt_timezone.utc).flat(include_start=True)
+
+        self.assertEqual(timeline, [{'team': 'Alpha', 'time': self.START.isoformat(), 'score': 0}])
+
+    def test_query_count_is_flat_from_10_to_2000_teams(self):
+        """Benchmark: el número de queries no depende de la cantidad de equipos"""
+        query_counts = {}
+        for count in (10, 2000):
+            Team.objects.all().delete()
+            self.create_teams(count)
+
+            with CaptureQueriesContext(connection) as queries:
+                timeline = ScoreTimeline(start_time=self.START)
+                timeline.flat(include_start=True)
+                timeline.by_team()
+
+            self.assertEqual(len(timeline.teams), count)
+            query_counts[count] = len(queries)
+
+        self.assertEqual(query_counts[10], query_counts[2000])
+        self.assertLessEqual(query_counts[2000], 2)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ScoreboardSnapshotTests(ScoreboardTestMixin, TestCase):
+    """El snapshot se lee del cache y se reconstruye solo al invalidarse"""
+
+    def test_second_read_is_served_from_cache(self):
+        get_snapshot()
+
+        with self.assertNumQueries(0):
+            snapshot = get_snapshot()
+
+        self.assertEqual([team['name'] for team in snapshot.teams], ['Alpha'])
+
+    def test_solve_invalidates_snapshot(self):
+        rival, rival_user = self.create_team('Beta', 'bob')
+        self.assertEqual(get_snapshot().teams[0]['name'], 'Alpha')
+
+        self.submit(rival_user, self.challenge, 'flag{ok}')
+
+        snapshot = get_snapshot()
+        self.assertEqual(snapshot.teams[0]['name'], 'Beta')
+        self.assertEqual(snapshot.teams[0]['total_score'], 150)
+        self.assertEqual(snapshot.teams[0]['solved_count'], 1)
+        self.assertEqual(snapshot.teams[0]['first_bloods_count'], 1)
+        self.assertEqual(snapshot.total_solves, 1)
+        self.assertEqual(snapshot.recent_submissions[0]['user_name'], 'bob')
+
+    def test_wrong_flag_keeps_snapshot(self):
+        before = get_snapshot()
+
+        self.submit(self.user, self.challenge, 'flag{nope}')
+
+        self.assertEqual(get_snapshot().version, before.version)
+
+    @override_settings(SCOREBOARD_SNAPSHOT_LOCK_WAIT=0.1)
+    def test_fresh_read_does_not_serve_stale_snapshot_while_locked(self):
+        rival, rival_user = self.create_team('Beta', 'bob')
+        get_snapshot()
+        # Otro proceso tomó el lock de reconstrucción y no lo suelta
+        cache.add(SNAPSHOT_LOCK_KEY, True, timeout=10)
+
+        self.submit(rival_user, self.challenge, 'flag{ok}')
+
+        self.assertEqual(get_snapshot().teams[0]['name'], 'Alpha')
+        self.assertEqual(get_snapshot(fresh=True).teams[0]['name'], 'Beta')
+
+    def test_rebuild_does_not_release_lock_held_by_another_process(self):
+        # Arranque en frío: otro proceso tomó el lock y todavía no guardó el snapshot
+        cache.add(SNAPSHOT_LOCK_KEY, True, timeout=10)
+
+        self.assertEqual(get_snapshot().teams[0]['name'], 'Alpha')
+        self.assertTrue(cache.get(SNAPSHOT_LOCK_KEY))
+
+        invalidate_snapshot()
+        with override_settings(SCOREBOARD_SNAPSHOT_LOCK_WAIT=0):
+            get_snapshot(fresh=True)
+        self.assertTrue(cache.get(SNAPSHOT_LOCK_KEY))
+
+    def test_team_edit_invalidates_snapshot(self):
+        get_snapshot()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team.color = '#123456'
+            self.team.save()
+
+        self.assertEqual(get_snapshot().teams[0]['color'], '#123456')
+
+    def test_dashboard_recent_activity_comes_from_snapshot(self):
+        self.submit(self.user, self.challenge, 'flag{ok}')
+        Submission.objects.filter(is_correct=True).update(submitted_at=timezone.now() - timedelta(hours=2))
+        invalidate_snapshot()
+
+        snapshot = get_snapshot()
+        self.assertEqual(snapshot.solves_since(timezone.now() - timedelta(hours=3)), 1)
+        self.assertEqual(snapshot.solves_since(timezone.now() - timedelta(hours=1)), 0)
+
+        response = self.client.get(reverse('scoreboard:dashboard'))
+        self.assertEqual(response.context['recent_count'], 1)
+
+    def test_scoreboard_api_reads_snapshot(self):
+        self.submit(self.user, self.challenge, 'flag{ok}')
+
+        response = self.client.get(reverse('scoreboard:api_scoreboard'))
+
+        self.assertEqual(response.json()['scoreboard'], [{
+            'rank': 1, 'name': 'Alpha', 'score': 150, 'color': self.team.color,
+            'solved': 1, 'first_bloods': 1,
+        }])
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class DisplayDeltaTests(ScoreboardTestMixin, TestCase):
+    """El display recibe un snapshot inicial y luego solo las diferencias"""
+
+    def solve(self, user):
+        self.submit(user, self.challenge, 'flag{ok}')
+        invalidate_snapshot()
+
+    def test_first_publish_without_state_sends_snapshot(self):
+        listener = self.join_scoreboard_group(DISPLAY_GROUP)
+
+        message = publish_display_update()
+
+        self.assertEqual(message['type'], 'display_snapshot')
+        self.assertEqual(message['seq'], 1)
+        self.assertEqual(self.receive_frame(listener)['teams'][0]['name'], 'Alpha')
+
+    def test_delta_contains_only_changed_teams_and_new_entries(self):
+        rival, rival_user = self.create_team('Beta', 'bob')
+        get_display_state()
+        listener = self.join_scoreboard_group(DISPLAY_GROUP)
+
+        self.solve(rival_user)
+        message = publish_display_update()
+
+        self.assertEqual(message['type'], 'display_delta')
+        self.assertEqual(message['seq'], 1)
+        # Beta sube al primer lugar y Alpha baja al segundo
+        self.assertEqual(
+            [(team['name'], team['rank'], team['score']) for team in message['teams']],
+            [('Beta', 1, 150), ('Alpha', 2, 0)],
+        )
+        self.assertEqual(message['removed_teams'], [])
+        self.assertEqual([entry['team'] for entry in message['recent_submissions']], ['Beta'])
+        self.assertEqual([entry['team'] for entry in message['first_bloods']], ['Beta'])
+        self.assertEqual([point['score'] for point in message['timeline']], [150])
+        self.assertEqual(self.receive_frame(listener)['seq'], 1)
+
+    def test_unchanged_state_sends_empty_delta(self):
+        get_display_state()
+
+        message = publish_display_update()
+
+        self.assertEqual(message['teams'], [])
+        self.assertEqual(message['timeline'], [])
+        self.assertEqual(message['recent_submissions'], [])
+
+    def test_removed_team_is_reported(self):
+        old = {'teams': [{'id': '1', 'rank': 1}], 'timeline': [], 'recent_submissions': [], 'first_bloods': []}
+        new = {'teams': [], 'timeline': [], 'recent_submissions': [], 'first_bloods': []}
+
+        self.assertEqual(diff_display_payload(old, new)['removed_teams'], ['1'])
+
+    def test_state_tracks_last_published_sequence(self):
+        get_display_state()
+        publish_display_update()
+        publish_display_update()
+
+        state = get_display_state()
+
+        self.assertEqual(state['seq'], 2)
+        self.assertEqual(state['payload']['teams'][0]['name'], 'Alpha')
+
+    def test_sequence_is_shared_between_publishers(self):
+        get_display_state()
+        # Otro proceso publicó con el mismo estado anterior: tomó la secuencia 1
+        cache.set(DISPLAY_SEQ_KEY, 1, timeout=None)
+
+        message = publish_display_update()
+
+        self.assertEqual(message['seq'], 2)
+        self.assertEqual(get_display_state()['seq'], 2)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class CoalescingBroadcasterTests(ScoreboardTestMixin, TestCase):
+    """Una ráfaga de solves se publica como un solo broadcast con todos sus eventos"""
+
+    def event(self, idx, is_first_blood=False):
+        return {'event_type': 'flag_solved', 'team': f'Team {idx}', 'is_first_blood': is_first_blood}
+
+    def test_burst_is_merged_into_one_broadcast(self):
+        broadcaster = CoalescingBroadcaster(window=60)
+        get_display_state()
+        listener = self.join_scoreboard_group(DISPLAY_GROUP)
+
+        for idx in range(30):
+            self.assertIsNone(broadcaster.schedule(events=[self.event(idx, is_first_blood=idx == 0)]))
+        self.assertNotIn(listener, self.channel_layer.channels)
+
+        broadcaster.flush()
+
+        message = self.receive_frame(listener)
+        self.assertEqual(message['seq'], 1)
+        self.assertEqual(len(message['events']), 30)
+        self.assertTrue(message['events'][0]['is_first_blood'])
+        self.assertNotIn(listener, self.channel_layer.channels)
+        self.assertEqual(get_broadcast_metrics(), {
+            'requests': 30, 'broadcasts': 1, 'events': 30, 'recomputations_avoided': 29,
+        })
+
+    def test_flush_without_pending_updates_does_nothing(self):
+        self.assertIsNone(CoalescingBroadcaster(window=60).flush())
+        self.assertEqual(get_broadcast_metrics()['broadcasts'], 0)
+
+    def test_zero_window_publishes_immediately(self):
+        broadcaster = CoalescingBroadcaster(window=0)
+
+        message = broadcaster.schedule(events=[self.event(1)])
+
+        self.assertEqual(message['events'], [self.event(1)])
+        self.assertEqual(get_broadcast_metrics()['recomputations_avoided'], 0)
+
+    def test_metrics_endpoint_requires_staff(self):
+        url = reverse('scoreboard:api_display_metrics')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get(url).json()['broadcaster']['broadcasts'], 0)
+
+
+class BroadcastFrameTests(TestCase):
+    """Los broadcasts viajan codificados una vez y el consumer los reenvía tal cual"""
+
+    def test_frame_is_compact_json(self):
+        frame = encode_frame({'type': 'rank_change', 'team': 'Ñandú 🚩', 'new_rank': 1})
+
+        self.assertEqual(frame, '{"type":"rank_change","team":"Ñandú 🚩","new_rank":1}')
+
+    @override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+    def test_admin_test_event_is_sent_as_frame(self):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)('scoreboard', channel)
+        self.client.force_login(User.objects.create_superuser(username='admin', password='pass'))
+        url = reverse('admin_panel:broadcast_test_event')
+
+        response = self.client.post(url, {'type': 'notification', 'message': 'Hola'}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        message = async_to_sync(layer.receive)(channel)
+        self.assertEqual(message['type'], 'broadcast.frame')
+        self.assertEqual(json.loads(message['text']), {'type': 'notification', 'notification_type': 'info', 'message': 'Hola'})
+        self.assertEqual(self.client.post(url, {'type': 'otro'}, content_type='application/json').status_code, 400)
+
+    def test_consumer_forwards_text_without_reencoding(self):
+        sent = []
+        consumer = ScoreboardConsumer()
+
+        async def send(text_data=None, bytes_data=None, close=False):
+            sent.append(text_data)
+
+        consumer.send = send
+        frame = encode_frame({'type': 'display_delta', 'seq': 3})
+        async_to_sync(consumer.broadcast_frame)({'type': 'broadcast.frame', 'text': frame})
+
+        self.assertEqual(sent, [frame])
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class CTFConfigCacheTests(ScoreboardTestMixin, TestCase):
+    """La configuración del CTF se lee de memoria y se refresca al guardarse"""
+
+    def setUp(self):
+        super().setUp()
+        CTFConfig.objects.create(pk=1, name='Arena', timezone='America/Santiago')
+        CTFConfig.clear_cache()
+
+    def test_repeated_reads_hit_the_database_once(self):
+        with self.assertNumQueries(1):
+            for _ in range(5):
+                config = CTFConfig.get_config()
+            CTFConfig.get_timezone()
+
+        self.assertEqual(config.name, 'Arena')
+
+    def test_returned_config_is_a_copy(self):
+        config = CTFConfig.get_config()
+        config.name = 'Otro'
+
+        self.assertEqual(CTFConfig.get_config().name, 'Arena')
+
+    @override_settings(CTF_CONFIG_CACHE_TTL=0)
+    def test_expired_cache_is_reloaded(self):
+        with self.assertNumQueries(2):
+            CTFConfig.get_config()
+            CTFConfig.get_config()
+
+    def test_save_refreshes_cache_and_bumps_shared_version(self):
+        config = CTFConfig.get_config()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            config.name = 'Arena Finals'
+            config.save()
+
+        self.assertEqual(CTFConfig.get_config().name, 'Arena Finals')
+        self.assertEqual(cache.get(CTF_CONFIG_VERSION_KEY), 1)
+
+    @override_settings(CTF_CONFIG_VERSION_CHECK_INTERVAL=0)
+    def test_shared_version_change_clears_process_cache(self):
+        CTFConfig.get_config()
+        CTFConfig.objects.filter(pk=1).update(name='Cambiado')
+        # Otro proceso guardó la configuración: este la descarta aunque no tenga sockets conectados
+        cache.set(CTF_CONFIG_VERSION_KEY, 7, timeout=None)
+
+        self.assertEqual(CTFConfig.get_config().name, 'Cambiado')
+
+    def test_version_is_checked_once_per_interval(self):
+        CTFConfig.get_config()
+
+        with mock.patch('scoreboard.models.cache') as shared_cache:
+            for _ in range(100):
+                CTFConfig.get_timezone()
+
+        shared_cache.get.assert_not_called()
+
+    def test_timezone_filter_does_not_query_per_timestamp(self):
+        template = Template('{% load ctf_filters %}{% for value in values %}{{ value|to_ctf_timezone|date:"H:i" }} {% endfor %}')
+        values = [datetime(2025, 1, 1, 15, 0, tzinfo=dt_timezone.utc)] * 100
+
+        with self.assertNumQueries(1):
+            rendered = template.render(Context({'values': values}))
+
+        self.assertEqual(rendered.split()[0], '12:00')
+
+
+class LoadTestClientTests(SimpleTestCase):
+    """Piezas del cliente de ``load_test`` que no necesitan un servidor"""
+
+    def read_frame(self, data):
+        async def read():
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            reader.feed_eof()
+            return await read_ws_frame(reader)
+        return asyncio.run(read())
+
+    def test_masked_frames_round_trip_for_every_length_encoding(self):
+        for size in (5, 300, 70000):
+            payload = b'x' * size
+            frame = encode_ws_frame(WS_TEXT, payload, b'\x01\x02\x03\x04')
+
+            self.assertNotIn(payload, frame)
+            self.assertEqual(self.read_frame(frame), (True, WS_TEXT, payload))
+
+    def test_stats_percentiles_and_error_rate(self):
+        stats = OperationStats()
+        for ms in range(1, 101):
+            stats.ok(ms / 1000)
+        for _ in range(25):
+            stats.error()
+
+        summary = stats.summary()
+        self.assertEqual((summary['count'], summary['errors']), (125, 25))
+        self.assertAlmostEqual(summary['error_rate'], 0.2)
+        self.assertAlmostEqual(summary['p50'], 51)
+        self.assertAlmostEqual(summary['p99'], 100)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class AchievementsListTests(ScoreboardTestMixin, TestCase):
+    """La lista de logros no hace una query por logro conseguido"""
+
+    def get_page(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('scoreboard:achievements'))
+        return response, len(queries)
+
+    def test_queries_do_not_grow_with_earned_achievements(self):
+        self.client.force_login(self.user)
+        # El primer request calienta los caches (plataforma inicializada, configuración)
+        self.get_page()
+        _, baseline = self.get_page()
+
+        for code, achievement in ACHIEVEMENTS.items():
+            if achievement.category == 'team':
+                Achievement.objects.create(code=code, team=self.team, category='team')
+            else:
+                Achievement.objects.create(code=code, user=self.user, category='individual')
+        response, count = self.get_page()
+
+        self.assertEqual(count, baseline)
+        self.assertEqual(response.context['earned_team'], response.context['total_team'])
+        self.assertEqual(response.context['earned_individual'], response.context['total_individual'])
+        self.assertTrue(all(a['earned_at'] for a in response.context['team_achievements']))
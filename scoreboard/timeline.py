@@ -0,0 +1,89 @@
+"""
+Motor de timeline del scoreboard.
+
+Construye la serie acumulada de puntaje de todos los equipos en un número
+constante de queries: una para los equipos (si no se entregan) y otra para el
+ledger de puntajes (``ScoreEntry``), que ya es un flujo ordenado en el tiempo de
+solves y bonus de first blood. Los eventos del mismo minuto se agrupan en un
+solo punto.
+"""
+from django.utils import timezone
+from teams.models import Team
+from challenges.models import ScoreEntry
+
+
+class ScoreTimeline:
+    """Series acumuladas de puntaje por equipo, agrupadas por minuto"""
+
+    def __init__(self, teams=None, start_time=None, tz=None):
+        self.tz = tz or timezone.get_current_timezone()
+        self.start_time = start_time
+        if teams is None:
+            teams = Team.objects.all().order_by('-total_score', 'name')
+        self.teams = list(teams)
+        self.series = self._build()
+
+    def _build(self):
+        """Recorre el ledger una sola vez y arma los puntos (minuto, puntaje) de cada equipo"""
+        series = {team.id: [] for team in self.teams}
+        cumulative = dict.fromkeys(series, 0)
+
+        rows = ScoreEntry.objects.order_by('created_at').values_list('team_id', 'points', 'created_at')
+
+        for team_id, points, created_at in rows:
+            if team_id not in series:
+                continue
+            cumulative[team_id] += points
+            minute = created_at.astimezone(self.tz).replace(second=0, microsecond=0)
+
+            points_list = series[team_id]
+            if points_list and points_list[-1][0] == minute:
+                # Varios eventos en el mismo minuto: actualizar el último punto
+                points_list[-1] = (minute, cumulative[team_id])
+            else:
+                points_list.append((minute, cumulative[team_id]))
+
+        return series
+
+    def _start_point(self):
+        start_time = self.start_time or timezone.now()
+        return start_time.astimezone(self.tz)
+
+    def flat(self, include_start=False):
+        """Lista de puntos {team, time, score} ordenada por tiempo (formato de Chart.js del display)"""
+        timeline = []
+        start = self._start_point() if include_start else None
+
+        for team in self.teams:
+            if start:
+                timeline.append({'team': team.name, 'time': start.isoformat(), 'score': 0})
+            for minute, score in self.series[team.id]:
+                timeline.append({'team': team.name, 'time': minute.isoformat(), 'score': score})
+
+        timeline.sort(key=lambda point: point['time'])
+        return timeline
+
+    def by_team(self):
+        """Diccionario {equipo: {color, data}} con punto inicial en el inicio del CTF"""
+        start = self._start_point()
+        timeline = {}
+
+        for team in self.teams:
+            data = [{
+                'time': start.isoformat(),
+                'label': start.strftime('%d/%m %H:%M'),
+                'score': 0,
+            }]
+            for minute, score in self.series[team.id]:
+                data.append({
+                    'time': minute.isoformat(),
+                    'label': minute.strftime('%d/%m %H:%M'),
+                    'score': score,
+                })
+
+            timeline[team.name] = {
+                'color': team.color,
+                'data': data,
+            }
+
+        return timeline
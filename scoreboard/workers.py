@@ -0,0 +1,13 @@
+from channels.consumer import SyncConsumer
+from .events import handle_solve_committed, handle_submission_failed
+
+class ScoreboardEventConsumer(SyncConsumer):
+    """Worker que procesa los eventos del scoreboard fuera del request HTTP"""
+    
+    def solve_committed(self, message):
+        """Logros, cambios de ranking y broadcast tras un solve confirmado"""
+        handle_solve_committed(message)
+    
+    def submission_failed(self, message):
+        """Logros que reaccionan a intentos fallidos"""
+        handle_submission_failed(message)
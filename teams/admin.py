@@ -3,8 +3,8 @@ from .models import Team
 
 @admin.register(Team)
 class TeamAdmin(admin.ModelAdmin):
-    list_display = ('name', 'total_score', 'created_at')
+    list_display = ('name', 'total_score', 'solved_count', 'first_blood_count', 'last_solve_at', 'created_at')
     search_fields = ('name',)
     list_filter = ('created_at',)
     filter_horizontal = ('members',)
-    readonly_fields = ('total_score', 'created_at')
+    readonly_fields = ('total_score', 'solved_count', 'first_blood_count', 'last_solve_at', 'created_at')
@@ -1,24 +1,36 @@
 from django.core.management.base import BaseCommand
-from teams.models import Team
+from challenges.scoring import reconcile_scores
 
 class Command(BaseCommand):
-    help = 'Recalcula los puntajes de todos los equipos'
+    help = 'Audita los puntajes de los equipos contra el ledger y las submissions, y corrige las diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Solo reportar inconsistencias, sin corregirlas',
+        )
 
     def handle(self, *args, **options):
-        teams = Team.objects.all()
-        
-        self.stdout.write(self.style.WARNING(f'Recalculando puntajes de {teams.count()} equipos...'))
-        
-        for team in teams:
-            old_score = team.total_score
-            team.update_score()
-            new_score = team.total_score
-            
-            if old_score != new_score:
+        fix = not options['check']
+
+        self.stdout.write(self.style.WARNING('Reconciliando puntajes con el ledger...'))
+
+        discrepancies = reconcile_scores(fix=fix)
+
+        for item in discrepancies:
+            team = item['team']
+            detail = f"guardado={item['stored']} ledger={item['ledger']} esperado={item['expected']}"
+            if fix:
                 self.stdout.write(
-                    self.style.SUCCESS(f'✓ {team.name}: {old_score} → {new_score} puntos')
+                    self.style.SUCCESS(f"✓ {team.name}: {detail} → {item['expected']} puntos")
                 )
             else:
-                self.stdout.write(f'  {team.name}: {new_score} puntos (sin cambios)')
-        
-        self.stdout.write(self.style.SUCCESS('\n¡Puntajes recalculados exitosamente!'))
+                self.stdout.write(self.style.ERROR(f"✗ {team.name}: {detail}"))
+
+        if not discrepancies:
+            self.stdout.write(self.style.SUCCESS('\n¡Todos los puntajes son consistentes!'))
+        elif fix:
+            self.stdout.write(self.style.SUCCESS(f'\n¡{len(discrepancies)} equipos corregidos exitosamente!'))
+        else:
+            self.stdout.write(self.style.ERROR(f'\n{len(discrepancies)} equipos con puntajes inconsistentes'))
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0002_team_invite_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='first_blood_count',
+            field=models.IntegerField(default=0, verbose_name='First bloods'),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='last_solve_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Último solve'),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='solved_count',
+            field=models.IntegerField(default=0, verbose_name='Challenges resueltos'),
+        ),
+    ]
@@ -14,6 +14,10 @@ class Team(models.Model):
     avatar = models.ImageField(upload_to='team_avatars/', null=True, blank=True, verbose_name="Avatar")
     total_score = models.IntegerField(default=0, verbose_name="Puntuación total")
     invite_code = models.CharField(max_length=8, unique=True, blank=True, verbose_name="Código de invitación")
+    # Contadores mantenidos en la transacción del solve (ver challenges.scoring.record_solve)
+    solved_count = models.IntegerField(default=0, verbose_name="Challenges resueltos")
+    first_blood_count = models.IntegerField(default=0, verbose_name="First bloods")
+    last_solve_at = models.DateTimeField(null=True, blank=True, verbose_name="Último solve")
     
     def save(self, *args, **kwargs):
         """Generar código de invitación si no existe"""
@@ -39,13 +43,11 @@ class Team(models.Model):
     
     def get_solved_challenges_count(self):
         """Retorna el número de challenges resueltos por el equipo"""
-        from challenges.models import Submission
-        return Submission.objects.filter(team=self, is_correct=True).values('challenge').distinct().count()
+        return self.solved_count
     
     def get_first_bloods_count(self):
         """Retorna el número de first bloods conseguidos por el equipo"""
-        from challenges.models import FirstBlood
-        return FirstBlood.objects.filter(team=self).count()
+        return self.first_blood_count
     
     @property
     def score(self):
@@ -53,31 +55,11 @@ class Team(models.Model):
         return self.total_score
     
     def update_score(self):
-        """Actualiza la puntuación total del equipo sumando los puntos de todos sus miembros"""
-        from challenges.models import Submission, FirstBlood
+        """
+        Recalcula la puntuación total desde cero a partir de Submission y FirstBlood.
+        Es una herramienta de auditoría: el flujo normal suma los puntos de forma
+        incremental a través del ledger (ver challenges.scoring).
+        """
+        from challenges.scoring import rebuild_ledger
         
-        total_points = 0
-        
-        # Sumar puntos de cada miembro del equipo
-        for member in self.members.all():
-            # Puntos de challenges resueltos por el miembro
-            member_challenge_points = Submission.objects.filter(
-                team=self,
-                submitted_by=member,
-                is_correct=True
-            ).aggregate(
-                total=models.Sum('challenge__points')
-            )['total'] or 0
-            
-            # Puntos bonus de first bloods del miembro
-            member_fb_points = FirstBlood.objects.filter(
-                team=self,
-                achieved_by=member
-            ).aggregate(
-                total=models.Sum('bonus_points')
-            )['total'] or 0
-            
-            total_points += member_challenge_points + member_fb_points
-        
-        self.total_score = total_points
-        self.save()
+        return rebuild_ledger(self)
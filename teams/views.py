@@ -1,6 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Count
+from collections import Counter, defaultdict
+from django.db.models import Count, Q
 from .models import Team
 from challenges.models import Challenge, Submission, FirstBlood
 from scoreboard.models import Achievement
@@ -31,12 +32,12 @@ def team_list(request):
             return redirect('teams:team_detail', team_id=user_team.id)
     
     # Si no tiene equipo, mostrar lista de equipos
-    teams = Team.objects.all().order_by('-total_score')
+    teams = Team.objects.annotate(member_count=Count('members')).order_by('-total_score')
     return render(request, 'teams/list.html', {'teams': teams})
 
 def all_teams_list(request):
     """Vista para ver todos los equipos"""
-    teams = Team.objects.all().order_by('-total_score')
+    teams = Team.objects.annotate(member_count=Count('members')).order_by('-total_score')
     
     # Obtener el equipo del usuario si lo tiene
     user_team = None
@@ -56,7 +57,7 @@ def team_detail(request, team_id):
     solved_challenges = Submission.objects.filter(
         team=team,
         is_correct=True
-    ).select_related('challenge', 'challenge__category').order_by('-submitted_at')
+    ).select_related('challenge', 'challenge__category', 'challenge__first_blood').order_by('-submitted_at')
     
     # Todos los intentos (correctos e incorrectos)
     all_submissions = Submission.objects.filter(
@@ -68,46 +69,54 @@ def team_detail(request, team_id):
     
     # Estadísticas
     total_challenges = Challenge.objects.count()
-    solved_count = solved_challenges.count()
-    first_bloods_count = first_bloods.count()
+    solved_count = team.solved_count
+    first_bloods_count = team.first_blood_count
     first_bloods_points = sum(fb.bonus_points for fb in first_bloods)
     
     # Última submission
-    last_submission = all_submissions.first() if all_submissions else None
-    
-    # Ranking del equipo
-    all_teams = Team.objects.all().order_by('-total_score')
-    rank = list(all_teams).index(team) + 1 if team in all_teams else 0
+    last_submission = all_submissions[0] if all_submissions else None
+    
+    # Ranking del equipo: equipos por delante con el mismo orden que el scoreboard
+    rank = Team.objects.filter(
+        Q(total_score__gt=team.total_score) | Q(total_score=team.total_score, name__lt=team.name)
+    ).count() + 1
+    
+    # Solves, first bloods y logros agrupados por miembro (sin queries por miembro)
+    submissions_by_member = defaultdict(list)
+    for submission in solved_challenges:
+        submissions_by_member[submission.submitted_by_id].append(submission)
+    first_bloods_by_member = defaultdict(list)
+    for first_blood in first_bloods:
+        first_bloods_by_member[first_blood.achieved_by_id].append(first_blood)
+    members = list(team.members.all())
+    achievements_by_member = defaultdict(list)
+    for achievement in Achievement.objects.filter(
+        user__in=members,
+        category='individual'
+    ).order_by('-earned_at'):
+        # Añadir información del logro
+        achievement.info = achievement.get_info()
+        achievements_by_member[achievement.user_id].append(achievement)
     
     # Estadísticas por miembro
     member_stats = []
-    for member in team.members.all():
+    for member in members:
         # Submissions correctos del miembro
-        member_submissions = solved_challenges.filter(submitted_by=member)
+        member_submissions = submissions_by_member[member.id]
         member_points = sum(sub.challenge.points for sub in member_submissions)
         
         # First bloods del miembro
-        member_first_bloods = first_bloods.filter(achieved_by=member)
+        member_first_bloods = first_bloods_by_member[member.id]
         member_fb_points = sum(fb.bonus_points for fb in member_first_bloods)
         
-        # Logros individuales del miembro
-        member_achievements = Achievement.objects.filter(
-            user=member,
-            category='individual'
-        ).order_by('-earned_at')
-        
-        # Añadir información del logro
-        for achievement in member_achievements:
-            achievement.info = achievement.get_info()
-        
         member_stats.append({
             'user': member,
-            'submissions_count': member_submissions.count(),
+            'submissions_count': len(member_submissions),
             'points': member_points,
-            'first_bloods_count': member_first_bloods.count(),
+            'first_bloods_count': len(member_first_bloods),
             'first_bloods_points': member_fb_points,
             'total_points': member_points + member_fb_points,
-            'achievements': member_achievements,
+            'achievements': achievements_by_member[member.id],
         })
     
     # Ordenar miembros por puntos totales
@@ -115,12 +124,13 @@ def team_detail(request, team_id):
     
     # Progreso por categoría
     from challenges.models import Category
-    categories = Category.objects.all()
+    categories = Category.objects.annotate(total=Count('challenges'))
+    solved_by_category = Counter(submission.challenge.category_id for submission in solved_challenges)
     category_stats = []
     
     for category in categories:
-        total = Challenge.objects.filter(category=category).count()
-        solved = solved_challenges.filter(challenge__category=category).count()
+        total = category.total
+        solved = solved_by_category[category.id]
         category_stats.append({
             'name': category.name,
             'icon': category.icon,
@@ -141,7 +151,7 @@ def team_detail(request, team_id):
     # Verificar si el usuario puede ver el código de invitación
     can_view_invite_code = (
         request.user.is_authenticated and 
-        (request.user in team.members.all() or request.user.is_staff or request.user.is_superuser)
+        (request.user in members or request.user.is_staff or request.user.is_superuser)
     )
     
     context = {